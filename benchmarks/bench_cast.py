@@ -0,0 +1,101 @@
+"""Benchmark: ép kiểu/làm sạch vector hóa so với cách cũ (apply theo từng dòng).
+
+Chạy: python benchmarks/bench_cast.py [số_dòng]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_config import ColumnConfig  # noqa: E402
+from csv_to_ggsheet import CsvToGoogleSheetsApp  # noqa: E402
+
+
+def legacy_cast_and_handle_null(app, df):
+    """Bản cũ của _cast_and_handle_null, giữ lại để đối chiếu kết quả."""
+    df = df.fillna("NULL")
+    for col, dtype in ColumnConfig.DTYPES.items():
+        try:
+            if dtype == str:
+                df[col] = df[col].astype(str).replace("nan", "NULL")
+                df[col] = df[col].apply(app._clean_value)
+            elif dtype == int:
+                df[col] = df[col].apply(lambda x: int(x) if x != "NULL" else "NULL")
+        except Exception as e:
+            print(f"Lỗi khi ép kiểu cột {col}: {e}")
+            df[col] = "NULL"
+    return df
+
+
+def make_frame(rows, seed=0):
+    """Dữ liệu giả giống file CSV của crawl_tiktok.py (có ô trống, xuống dòng, dấu nháy)."""
+    rng = np.random.default_rng(seed)
+    channels = np.array([f"kenh_{i}" for i in range(30)])
+    df = pd.DataFrame({
+        'Kênh': channels[rng.integers(0, len(channels), rows)],
+        'Author': channels[rng.integers(0, len(channels), rows)],
+        'Followers': rng.integers(0, 10_000_000, rows),
+        'Text': np.where(rng.random(rows) < 0.3, 'mô tả "hay"\nxem ngay', 'video #fyp'),
+        'Likes': rng.integers(0, 1_000_000, rows),
+        'Shares': rng.integers(0, 50_000, rows),
+        'Comments': rng.integers(0, 20_000, rows),
+        'Collects': rng.integers(0, 20_000, rows),
+        'Duration(s)': rng.integers(5, 600, rows),
+        'Ngày tạo kênh': '01/01/2020',
+        'Ngày đăng': '15/07/2025',
+        'Hashtags': 'fyp, xuhuong',
+        'URL Video': [f"https://www.tiktok.com/@kenh/video/{i}" for i in range(rows)],
+        'Views': rng.integers(0, 100_000_000, rows),
+        'followerCount': rng.integers(0, 10_000_000, rows),
+        'isAd': np.where(rng.random(rows) < 0.05, True, False),
+        'heartCount': rng.integers(0, 500_000_000, rows),
+        'videoCount': rng.integers(0, 5_000, rows),
+        'isADVirtual': np.where(rng.random(rows) < 0.05, 'true', 'false'),
+    })[ColumnConfig.COLUMNS]
+    # Ô trống như khi gộp file thiếu cột / dữ liệu lỗi
+    for col in ('Likes', 'Text', 'Hashtags', 'Views'):
+        df.loc[rng.random(rows) < 0.02, col] = np.nan
+    return df
+
+
+def measure(fn, df):
+    """Đo thời gian và đỉnh bộ nhớ (tracemalloc chạy riêng vì làm chậm đáng kể)."""
+    start = time.perf_counter()
+    out = fn(df)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    app = CsvToGoogleSheetsApp()
+    df = make_frame(rows)
+
+    old, old_time, old_peak = measure(lambda d: legacy_cast_and_handle_null(app, d), df)
+    # So với đúng khung được upload: ép kiểu rồi _fill_null về giá trị như cách cũ
+    new, new_time, new_peak = measure(lambda d: app._fill_null(app._cast_and_handle_null(d)), df)
+
+    same = new.values.tolist() == old.values.tolist()
+    old_mem = old.memory_usage(deep=True).sum()
+    new_mem = new.memory_usage(deep=True).sum()
+    print(f"Số dòng: {rows:,}")
+    print(f"Cũ:  {old_time:8.2f}s  peak {old_peak / 2**20:8.1f} MiB  kết quả {old_mem / 2**20:8.1f} MiB")
+    print(f"Mới: {new_time:8.2f}s  peak {new_peak / 2**20:8.1f} MiB  kết quả {new_mem / 2**20:8.1f} MiB")
+    print(f"Nhanh hơn {old_time / new_time:.1f}x; mới/cũ: bộ nhớ kết quả {new_mem / old_mem:.2f}x, "
+          f"peak {new_peak / old_peak:.2f}x")
+    print(f"Kết quả giống nhau: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
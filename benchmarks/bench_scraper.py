@@ -0,0 +1,208 @@
+"""Benchmark end-to-end crawl_tiktok.py trên fixture server cục bộ (không cần mạng).
+
+Đo video/giây, phân vị độ trễ của từng giai đoạn và bộ nhớ đỉnh; kết quả lưu
+thành JSON để so sánh giữa các lần chạy.
+
+Chạy: python benchmarks/bench_scraper.py --channels 2 --videos 60 --latency-ms 50 --lean
+      python benchmarks/bench_scraper.py --workers 4 --baseline benchmarks/results/<cũ>.json
+      python benchmarks/bench_scraper.py --pipeline --listers 1 --workers 3
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crawl_tiktok import CSVExporter, TikTokPipeline, TikTokScraper, TikTokScraperPool  # noqa: E402
+from fixture_server import FixtureData, FixtureServer  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Phương thức của TikTokScraper -> tên giai đoạn trong báo cáo
+PHASES = {
+    'set_cookies': 'login',
+    '_list_channel': 'list_channel',
+    '_wait_for_page': 'wait_for_page',
+    '_scroll_page': 'scroll',
+    '_extract_video_details': 'video_page',
+    'scrape_videos_http': 'http_batch',
+}
+
+
+def instrument(timings):
+    """Bọc các phương thức trong PHASES để ghi thời gian mỗi lần gọi (mọi worker)."""
+    lock = threading.Lock()
+
+    def wrap(phase, method):
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                with lock:
+                    timings.setdefault(phase, []).append(time.perf_counter() - start)
+        return timed
+
+    originals = {name: getattr(TikTokScraper, name) for name in PHASES}
+    for name, phase in PHASES.items():
+        setattr(TikTokScraper, name, wrap(phase, originals[name]))
+    return originals
+
+
+def percentile(values, q):
+    # Nearest-rank trên danh sách đã sắp xếp
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'total_s': round(sum(values), 4),
+        'p50_s': round(percentile(values, 50), 4),
+        'p90_s': round(percentile(values, 90), 4),
+        'p99_s': round(percentile(values, 99), 4),
+        'max_s': round(max(values), 4),
+    }
+
+
+def peak_rss_mb():
+    """Bộ nhớ đỉnh của tiến trình Python và của các tiến trình con đã kết thúc (chromedriver)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None, None
+    scale = 2 ** 20 if sys.platform == 'darwin' else 2 ** 10
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+
+def run(args):
+    data = FixtureData(args.channels, args.videos, args.batch_size, args.page_kb)
+    scraper_kwargs = {
+        'page_timeout': args.page_timeout,
+        'scroll_idle_timeout': args.scroll_idle,
+        'fetch_backend': args.fetch,
+        'lean': args.lean,
+        'profile_only': args.profile_only,
+    }
+    timings = {}
+    instrument(timings)
+
+    with FixtureServer(data, args.latency_ms / 1000) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        print(f"Fixture server: {server.base_url}")
+        scraper_kwargs['base_url'] = server.base_url
+        sink = CSVExporter(os.path.join(tmp, 'bench.csv')).open()
+        # Thời điểm bản ghi đầu tiên được ghi ra file
+        first_record = []
+        write = sink.write
+
+        def timed_write(record):
+            if not first_record:
+                first_record.append(time.perf_counter() - start)
+            write(record)
+        sink.write = timed_write
+        start = time.perf_counter()
+        if args.pipeline:
+            TikTokPipeline([], listers=args.listers, extractors=args.workers,
+                           **scraper_kwargs).scrape_channels(data.channels, sink=sink)
+        elif args.workers > 1:
+            TikTokScraperPool([], workers=args.workers, **scraper_kwargs).scrape_channels(data.channels, sink=sink)
+        else:
+            scraper = TikTokScraper([], **scraper_kwargs)
+            try:
+                scraper.set_cookies()
+                scraper.scrape_channels(data.channels, sink=sink)
+            finally:
+                scraper.quit()
+        elapsed = time.perf_counter() - start
+        sink.close()
+        requests = dict(server.requests)
+
+    own_mb, children_mb = peak_rss_mb()
+    videos = sink.rows_written
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': dict(vars(args), baseline=None, output=None),
+        'videos': videos,
+        'expected_videos': args.channels * args.videos,
+        'elapsed_s': round(elapsed, 3),
+        'first_record_s': round(first_record[0], 3) if first_record else None,
+        'videos_per_sec': round(videos / elapsed, 3) if elapsed else None,
+        'phases': {phase: summarize(values) for phase, values in timings.items()},
+        'server_requests': requests,
+        'peak_rss_mb': {'python': own_mb, 'children': children_mb},
+    }
+
+
+def compare(result, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nSo với {baseline_path} ({baseline.get('timestamp')}):")
+    old, new = baseline.get('videos_per_sec'), result['videos_per_sec']
+    if old and new:
+        print(f"  video/giây: {old} -> {new} ({new / old:.2f}x)")
+    old, new = baseline.get('first_record_s'), result.get('first_record_s')
+    if old and new:
+        print(f"  bản ghi đầu tiên: {old:.2f}s -> {new:.2f}s")
+    for phase, stats in result['phases'].items():
+        before = baseline.get('phases', {}).get(phase)
+        if before and before.get('p50_s'):
+            print(f"  {phase:<14} p50 {before['p50_s']:.3f}s -> {stats['p50_s']:.3f}s, "
+                  f"p90 {before['p90_s']:.3f}s -> {stats['p90_s']:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--videos', type=int, default=30, help='số video mỗi kênh')
+    parser.add_argument('--batch-size', type=int, default=30, help='số video mỗi lần tải danh sách')
+    parser.add_argument('--page-kb', type=int, default=0, help='KB dữ liệu độn thêm vào mỗi trang')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='độ trễ chèn vào mỗi request')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--pipeline', action='store_true', help='chạy dây chuyền TikTokPipeline')
+    parser.add_argument('--listers', type=int, default=1, help='số trình duyệt liệt kê kênh (--pipeline)')
+    parser.add_argument('--fetch', choices=['selenium', 'http'], default='selenium')
+    parser.add_argument('--lean', action='store_true', help='Chrome headless, chặn media')
+    parser.add_argument('--profile-only', action='store_true')
+    parser.add_argument('--page-timeout', type=float, default=15)
+    parser.add_argument('--scroll-idle', type=float, default=4)
+    parser.add_argument('--output', help='file JSON kết quả (mặc định benchmarks/results/<thời gian>.json)')
+    parser.add_argument('--baseline', help='file JSON của lần chạy trước để so sánh')
+    args = parser.parse_args()
+
+    result = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"scraper-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"\nVideo: {result['videos']}/{result['expected_videos']} trong {result['elapsed_s']:.2f}s "
+          f"({result['videos_per_sec']} video/giây), bản ghi đầu tiên sau {result['first_record_s']}s")
+    for phase, stats in result['phases'].items():
+        print(f"  {phase:<14} n={stats['count']:<5} p50 {stats['p50_s']:.3f}s  "
+              f"p90 {stats['p90_s']:.3f}s  p99 {stats['p99_s']:.3f}s  max {stats['max_s']:.3f}s")
+    print(f"  Bộ nhớ đỉnh: Python {result['peak_rss_mb']['python']} MB, "
+          f"tiến trình con {result['peak_rss_mb']['children']} MB")
+    print(f"Đã lưu kết quả: {output}")
+    if args.baseline:
+        compare(result, args.baseline)
+    if result['videos'] < result['expected_videos']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
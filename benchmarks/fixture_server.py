@@ -0,0 +1,273 @@
+"""Server HTTP cục bộ giả lập trang kênh và trang video TikTok để benchmark offline.
+
+Trang có cùng thuộc tính data-e2e và JSON rehydration mà crawl_tiktok.py đọc:
+- /@<kênh>: số follower/tim/video, lô video đầu tiên; cuộn tới cuối thì trang
+  gọi /api/post/item_list/ để tải lô tiếp theo (giống TikTok).
+- /@<kênh>/video/<id>: các phần tử data-e2e và script __UNIVERSAL_DATA_FOR_REHYDRATION__.
+
+Chạy riêng: python benchmarks/fixture_server.py [--channels 2 --videos 60 --port 8765]
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_PROFILE_RE = re.compile(r'^/@([^/]+)/?$')
+_VIDEO_RE = re.compile(r'^/@([^/]+)/video/(\d+)/?$')
+
+# Mốc thời gian cố định để các lần chạy sinh cùng một dữ liệu
+BASE_TS = 1_750_000_000
+
+_PROFILE_JS = """
+var channel = %(channel)s, cursor = %(cursor)d, hasMore = %(has_more)s, loading = false;
+function render(item) {
+    var div = document.createElement('div');
+    div.setAttribute('data-e2e', 'user-post-item');
+    div.style.height = '320px';
+    div.innerHTML = '<a href="/@' + channel + '/video/' + item.id + '">' + item.desc + '</a>' +
+        '<strong data-e2e="video-views">' + item.stats.playCount + '</strong>';
+    document.getElementById('posts').appendChild(div);
+}
+function loadMore() {
+    if (loading || !hasMore) { return; }
+    loading = true;
+    fetch('/api/post/item_list/?uniqueId=' + channel + '&cursor=' + cursor)
+        .then(function (r) { return r.json(); })
+        .then(function (data) {
+            data.itemList.forEach(render);
+            cursor = data.cursor; hasMore = data.hasMore; loading = false;
+        });
+}
+new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) { loadMore(); }
+}).observe(document.getElementById('sentinel'));
+window.addEventListener('scroll', function () {
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 400) { loadMore(); }
+});
+"""
+
+
+def _short(n):
+    # Hiển thị kiểu TikTok để đi qua _parse_number: 12.3K, 1.5M
+    if n >= 1_000_000:
+        return f"{n / 1_000_000:.1f}M"
+    if n >= 10_000:
+        return f"{n / 1_000:.1f}K"
+    return str(n)
+
+
+def _json_script(data):
+    return json.dumps(data, ensure_ascii=False).replace('</', '<\\/')
+
+
+class FixtureData:
+    """Sinh dữ liệu kênh/video tất định từ tên kênh và số thứ tự video."""
+
+    def __init__(self, channels=2, videos=60, batch_size=30, page_kb=0):
+        self.channels = [f"bench{i}" for i in range(channels)]
+        self.videos = videos
+        self.batch_size = max(1, batch_size)
+        self.padding = 'x' * (page_kb * 1024)
+
+    def channel_stats(self, channel):
+        idx = self.channels.index(channel)
+        return {
+            'followerCount': 12_345 * (idx + 1),
+            'heartCount': 987_654 * (idx + 1),
+            'videoCount': self.videos,
+        }
+
+    def item(self, channel, index):
+        """Video thứ `index` (0 là mới nhất); id mang createTime ở 32 bit cao như id thật."""
+        idx = self.channels.index(channel)
+        create_time = BASE_TS - index * 3600 - idx
+        return {
+            'id': str((create_time << 32) | (idx << 16) | index),
+            'desc': f"Video {index} của {channel} #bench #fixture",
+            'createTime': create_time,
+            'author': {'uniqueId': channel, 'createTime': BASE_TS - 400 * 86400},
+            'authorStats': self.channel_stats(channel),
+            'stats': {
+                'playCount': 1_000 + index * 37,
+                'diggCount': 100 + index * 7,
+                'shareCount': index * 3,
+                'commentCount': index * 5,
+                'collectCount': index * 2,
+            },
+            'video': {'duration': 15 + index % 45},
+            'textExtra': [{'hashtagName': 'bench'}, {'hashtagName': 'fixture'}],
+            'isAd': False,
+            'isADVirtual': False,
+        }
+
+    def find(self, channel, video_id):
+        index = int(video_id) & 0xFFFF
+        if channel not in self.channels or index >= self.videos:
+            return None
+        item = self.item(channel, index)
+        return item if item['id'] == video_id else None
+
+    def batch(self, channel, cursor):
+        end = min(cursor + self.batch_size, self.videos)
+        return [self.item(channel, i) for i in range(cursor, end)], end, end < self.videos
+
+    def profile_page(self, channel):
+        stats = self.channel_stats(channel)
+        items, cursor, has_more = self.batch(channel, 0)
+        posts = ''.join(
+            f'<div data-e2e="user-post-item" style="height:320px">'
+            f'<a href="/@{channel}/video/{it["id"]}">{it["desc"]}</a>'
+            f'<strong data-e2e="video-views">{_short(it["stats"]["playCount"])}</strong></div>'
+            for it in items
+        )
+        script = _PROFILE_JS % {
+            'channel': json.dumps(channel), 'cursor': cursor, 'has_more': json.dumps(has_more)
+        }
+        return (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{channel}</title></head><body>'
+            f'<h1>{channel}</h1>'
+            f'<strong data-e2e="followers-count">{_short(stats["followerCount"])}</strong>'
+            f'<strong data-e2e="heart-count">{_short(stats["heartCount"])}</strong>'
+            f'<strong data-e2e="video-count">{stats["videoCount"]}</strong>'
+            f'<div id="posts">{posts}</div><div id="sentinel" style="height:10px"></div>'
+            f'<!-- {self.padding} --><script>{script}</script></body></html>'
+        )
+
+    def video_page(self, item):
+        payload = {'__DEFAULT_SCOPE__': {'webapp.video-detail': {'itemInfo': {'itemStruct': item}}}}
+        stats = item['stats']
+        tags = ''.join(
+            f'<a href="/tag/{t["hashtagName"]}"><strong>#{t["hashtagName"]}</strong></a>'
+            for t in item['textExtra']
+        )
+        duration = item['video']['duration']
+        return (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{item["id"]}</title>'
+            f'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+            f'{_json_script(payload)}</script></head><body>'
+            f'<span data-e2e="browse-username">{item["author"]["uniqueId"]}</span>'
+            f'<h1 data-e2e="browse-video-desc">{item["desc"].split(" #")[0]} {tags}</h1>'
+            f'<strong data-e2e="like-count">{_short(stats["diggCount"])}</strong>'
+            f'<strong data-e2e="comment-count">{_short(stats["commentCount"])}</strong>'
+            f'<strong data-e2e="undefined-count">{_short(stats["collectCount"])}</strong>'
+            f'<strong data-e2e="share-count">{_short(stats["shareCount"])}</strong>'
+            f'<div class="css-1cuqcrm-DivSeekBarTimeContainer">00:00/00:{duration:02d}</div>'
+            f'<!-- {self.padding} --></body></html>'
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'TikTokFixture/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        if fixture.latency:
+            time.sleep(fixture.latency)
+        url = urlparse(self.path)
+        data = fixture.data
+        kind = 'other'
+        if url.path.startswith('/api/post/item_list'):
+            kind = 'item_list'
+            query = parse_qs(url.query)
+            channel = query.get('uniqueId', [''])[0]
+            if channel not in data.channels:
+                return self._send(404, '{}', 'application/json')
+            items, cursor, has_more = data.batch(channel, int(query.get('cursor', ['0'])[0]))
+            body = json.dumps({'itemList': items, 'cursor': cursor, 'hasMore': has_more})
+            self._send(200, body, 'application/json')
+        elif _VIDEO_RE.match(url.path):
+            kind = 'video'
+            channel, video_id = _VIDEO_RE.match(url.path).groups()
+            item = data.find(channel, video_id)
+            if item is None:
+                return self._send(404, 'not found')
+            self._send(200, data.video_page(item))
+        elif _PROFILE_RE.match(url.path):
+            kind = 'profile'
+            channel = _PROFILE_RE.match(url.path).group(1)
+            if channel not in data.channels:
+                return self._send(404, 'not found')
+            self._send(200, data.profile_page(channel))
+        else:
+            self._send(200, '<!DOCTYPE html><html><body>fixture</body></html>')
+        fixture.count(kind)
+
+
+class FixtureServer:
+    """Chạy FixtureData trên 127.0.0.1 trong một thread nền; dùng như context manager.
+
+    `latency` (giây) được chèn vào mỗi request để mô phỏng độ trễ mạng.
+    """
+
+    def __init__(self, data=None, latency=0.0, host='127.0.0.1', port=0):
+        self.data = data or FixtureData()
+        self.latency = latency
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fixture = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--videos', type=int, default=60, help='số video mỗi kênh')
+    parser.add_argument('--batch-size', type=int, default=30, help='số video mỗi lần tải danh sách')
+    parser.add_argument('--page-kb', type=int, default=0, help='KB dữ liệu độn thêm vào mỗi trang')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    data = FixtureData(args.channels, args.videos, args.batch_size, args.page_kb)
+    server = FixtureServer(data, args.latency_ms / 1000, port=args.port)
+    print(f"Fixture server: {server.base_url} (kênh: {', '.join(data.channels)})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Cấu hình cột dùng chung cho crawl_tiktok.py và csv_to_ggsheet.py."""
+from video_record import COLUMN_TYPES, CSV_COLUMNS
+
+
+class ColumnConfig:
+    """Cấu hình cột và kiểu dữ liệu; kiểu lấy từ lược đồ cột của video_record.py."""
+    # Cột đưa lên Google Sheets, cố định theo thứ tự cột CSV cho mọi đường tải lên
+    # (gộp file CSV/Parquet và đẩy dần khi crawl); cột mới chỉ thêm vào cuối COLUMNS của video_record.py
+    COLUMNS = list(CSV_COLUMNS)
+    DTYPES = {col: COLUMN_TYPES[col] for col in COLUMNS}
+
+    # Cột ít giá trị khác nhau: lưu dạng category để tiết kiệm bộ nhớ
+    CATEGORY_COLUMNS = ['Kênh', 'isAd']
+
+    # Cột phân vùng của dataset Parquet (thư mục channel=<kênh>/scrape_date=<ngày>)
+    PARTITION_COLUMNS = ['channel', 'scrape_date']
+
+    @classmethod
+    def dtype_of(cls, column: str) -> type:
+        return COLUMN_TYPES.get(column, str)
+
+    @classmethod
+    def arrow_schema(cls, columns):
+        """Schema Arrow cố định cho các cột, dựa trên DTYPES."""
+        import pyarrow as pa
+        arrow_types = {int: pa.int64(), str: pa.string()}
+        return pa.schema([(col, arrow_types[cls.dtype_of(col)]) for col in columns])
@@ -0,0 +1,107 @@
+"""Đọc và kiểm tra cookie do save_cookie.py lưu, chuyển sang dạng nạp được qua CDP."""
+import os
+import pickle
+import time
+from datetime import datetime
+
+
+class CookieStore:
+    """File cookie (danh sách dict của Selenium) kèm kiểm tra hạn dùng trước khi crawl.
+
+    Cookie trong `required` phải có và còn hạn; cookie sắp hết hạn trong
+    `margin_seconds` chỉ được cảnh báo.
+    """
+
+    def __init__(self, path='tiktok_cookie.pkl', required=('sessionid',), margin_seconds=24 * 3600):
+        self.path = path
+        self.required = tuple(required)
+        self.margin_seconds = margin_seconds
+        self.cookies = None
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                self.cookies = pickle.load(f)
+            print(f"Đã tải cookie thành công từ '{self.path}'.")
+        except FileNotFoundError:
+            print(f"LỖI: Không tìm thấy file cookie '{self.path}'.")
+            print("Vui lòng chạy lại script đăng nhập để tạo file cookie trước.")
+            self.cookies = None
+        except Exception as e:
+            print(f"Lỗi khi đọc file cookie: {e}")
+            self.cookies = None
+        return self.cookies
+
+    def save(self, cookies):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(cookies, f)
+        os.replace(tmp, self.path)
+        self.cookies = cookies
+
+    def validate(self, now=None):
+        """True nếu đủ cookie bắt buộc và chúng còn hạn; in lý do nếu không."""
+        if not self.cookies:
+            return False
+        now = time.time() if now is None else now
+        by_name = {c.get('name'): c for c in self.cookies}
+        missing = [name for name in self.required if name not in by_name]
+        if missing:
+            print(f"LỖI: File cookie thiếu {', '.join(missing)} (chưa đăng nhập?). Hãy chạy lại save_cookie.py.")
+            return False
+        expired = [
+            name for name in self.required
+            if by_name[name].get('expiry') is not None and by_name[name]['expiry'] <= now
+        ]
+        if expired:
+            print(f"LỖI: Cookie {', '.join(expired)} đã hết hạn. Hãy chạy lại save_cookie.py.")
+            return False
+        soon = [
+            c for c in self.cookies
+            if c.get('name') in self.required and c.get('expiry') is not None
+            and c['expiry'] - now < self.margin_seconds
+        ]
+        for c in soon:
+            when = datetime.fromtimestamp(c['expiry']).strftime('%d/%m/%Y %H:%M')
+            print(f"Cảnh báo: cookie {c['name']} sẽ hết hạn lúc {when}.")
+        return True
+
+    @staticmethod
+    def to_cdp(cookie, default_url=None):
+        """Chuyển cookie Selenium sang Network.CookieParam của DevTools."""
+        param = {
+            'name': cookie['name'],
+            'value': cookie['value'],
+            'path': cookie.get('path', '/'),
+            'secure': bool(cookie.get('secure', False)),
+            'httpOnly': bool(cookie.get('httpOnly', False)),
+        }
+        if cookie.get('domain'):
+            param['domain'] = cookie['domain']
+        elif default_url:
+            param['url'] = default_url
+        if cookie.get('expiry') is not None:
+            param['expires'] = cookie['expiry']
+        if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+            param['sameSite'] = cookie['sameSite']
+        return param
+
+    @staticmethod
+    def missing_from(cookies, current, now=None):
+        """Cookie trong `cookies` mà trình duyệt (`current`, từ Network.getAllCookies) chưa có hoặc đã hết hạn.
+
+        Cookie trình duyệt đang có và còn hạn được giữ nguyên dù khác giá trị: profile dùng lại
+        thường giữ bản mới hơn (msToken, ttwid, sessionid đã được TikTok làm mới) so với file cookie.
+        """
+        now = time.time() if now is None else now
+        have = {}
+        for c in current:
+            # CDP: expires <= 0 (hoặc session=True) là cookie phiên, chưa hết hạn
+            expires = c.get('expires', -1)
+            if c.get('session') or expires is None or expires <= 0 or expires > now:
+                have[(c['name'], c.get('domain'), c.get('path', '/'))] = c
+        return [
+            c for c in cookies
+            if (c['name'], c.get('domain'), c.get('path', '/')) not in have
+            and (c.get('expiry') is None or c['expiry'] > now)
+        ]
@@ -0,0 +1,197 @@
+"""Hàng đợi kênh dùng chung cho nhiều worker/máy, giao việc theo lease có hạn (SQLite)."""
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class CrawlQueue:
+    """Mỗi kênh là một job; worker nhận job kèm lease `lease_seconds` và gia hạn bằng heartbeat.
+
+    Lease hết hạn (worker chết/treo) thì job được giao lại cho worker khác. Job lỗi
+    quay về hàng đợi đến khi vượt `max_attempts` lần thì chuyển sang 'failed'.
+    File SQLite có thể đặt trên ổ dùng chung; mọi thao tác nhận job chạy trong
+    một transaction BEGIN IMMEDIATE nên hai worker không nhận trùng một job.
+    """
+
+    PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+    def __init__(self, db_path='./data/crawl_queue.db', lease_seconds=600, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # isolation_level=None: tự quản lý transaction bằng BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                channel       TEXT PRIMARY KEY,
+                state         TEXT NOT NULL,
+                attempts      INTEGER NOT NULL DEFAULT 0,
+                lease_owner   TEXT,
+                lease_expires REAL,
+                enqueued_at   REAL,
+                updated_at    REAL,
+                rows          INTEGER,
+                last_error    TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires)")
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, channels, requeue=False):
+        """Thêm kênh vào hàng đợi; requeue=True đưa cả kênh đã xong/lỗi về lại 'pending'."""
+        now = time.time()
+        channels = list(dict.fromkeys(c.strip().lstrip('@') for c in channels if c.strip()))
+
+        def run(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (channel, state, enqueued_at, updated_at) VALUES (?, ?, ?, ?)",
+                [(c, self.PENDING, now, now) for c in channels]
+            )
+            if requeue:
+                conn.executemany(
+                    "UPDATE jobs SET state = ?, attempts = 0, lease_owner = NULL, lease_expires = NULL, "
+                    "updated_at = ? WHERE channel = ? AND state IN (?, ?)",
+                    [(self.PENDING, now, c, self.DONE, self.FAILED) for c in channels]
+                )
+            return conn.total_changes - before
+        return self._transaction(run)
+
+    def claim(self, worker_id):
+        """Nhận một job (pending hoặc lease đã hết hạn); trả về tên kênh hoặc None."""
+        def run(conn):
+            now = time.time()
+            while True:
+                row = conn.execute(
+                    "SELECT channel, attempts FROM jobs WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                    "ORDER BY attempts, enqueued_at LIMIT 1",
+                    (self.PENDING, self.LEASED, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                channel, attempts = row
+                if attempts >= self.max_attempts:
+                    # Lease hết hạn quá nhiều lần (worker chết giữa chừng liên tục)
+                    conn.execute(
+                        "UPDATE jobs SET state = ?, lease_owner = NULL, updated_at = ?, "
+                        "last_error = COALESCE(last_error, 'lease hết hạn') WHERE channel = ?",
+                        (self.FAILED, now, channel)
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE channel = ?",
+                    (self.LEASED, worker_id, now + self.lease_seconds, now, channel)
+                )
+                return channel
+        return self._transaction(run)
+
+    def heartbeat(self, channel, worker_id):
+        """Gia hạn lease; False nếu job không còn thuộc worker này (đã bị giao lại)."""
+        def run(conn):
+            now = time.time()
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE channel = ? AND state = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, channel, self.LEASED, worker_id)
+            )
+            return cur.rowcount == 1
+        return self._transaction(run)
+
+    def complete(self, channel, worker_id, rows=0):
+        def run(conn):
+            cur = conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, rows = ?, "
+                "updated_at = ?, last_error = NULL WHERE channel = ? AND lease_owner = ?",
+                (self.DONE, rows, time.time(), channel, worker_id)
+            )
+            return cur.rowcount == 1
+        return self._transaction(run)
+
+    def fail(self, channel, worker_id, error=''):
+        """Trả job về hàng đợi, hoặc đánh dấu 'failed' khi đã thử đủ max_attempts lần."""
+        def run(conn):
+            cur = conn.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "lease_owner = NULL, lease_expires = NULL, updated_at = ?, last_error = ? "
+                "WHERE channel = ? AND lease_owner = ?",
+                (self.max_attempts, self.FAILED, self.PENDING, time.time(), str(error)[:500],
+                 channel, worker_id)
+            )
+            return cur.rowcount == 1
+        return self._transaction(run)
+
+    def release(self, channel, worker_id):
+        """Trả job về hàng đợi khi worker dừng giữa chừng (không tính là một lần thử)."""
+        def run(conn):
+            cur = conn.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE channel = ? AND lease_owner = ? AND state = ?",
+                (self.PENDING, time.time(), channel, worker_id, self.LEASED)
+            )
+            return cur.rowcount == 1
+        return self._transaction(run)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return {state: counts.get(state, 0) for state in (self.PENDING, self.LEASED, self.DONE, self.FAILED)}
+
+    def failed_jobs(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT channel, attempts, last_error FROM jobs WHERE state = ? ORDER BY channel",
+                (self.FAILED,)
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseKeeper:
+    """Thread nền gửi heartbeat cho job đang chạy; `lost` được bật nếu lease bị mất."""
+
+    def __init__(self, queue, channel, worker_id, interval=None):
+        self.queue = queue
+        self.channel = channel
+        self.worker_id = worker_id
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.channel, self.worker_id):
+                    print(f"  Mất lease của kênh {self.channel} (đã được giao cho worker khác).")
+                    self.lost.set()
+                    return
+            except sqlite3.Error as e:
+                print(f"  Lỗi heartbeat kênh {self.channel}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
@@ -1,93 +1,353 @@
+import argparse
+import glob
 import os
+import sys
 import time
 import re
-import pickle
+import base64
 import csv
+import json
+import queue
+from collections import deque
+import threading
+import uuid
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
+from column_config import ColumnConfig
+from cookie_store import CookieStore
+from crawl_queue import CrawlQueue, LeaseKeeper, default_worker_id
+from metrics import Metrics, ProgressLine
+from state_store import CrawlStateStore
+from video_record import CSV_COLUMNS, RecordBatch, VideoRecord
+from throttle import AdaptiveController, ThrottledError
+from hydration import (
+    EXTRACT_JS, HYDRATION_SCRIPT_IDS, convert_timestamp_to_date, parse_count, parse_duration,
+    parse_video_payload, record_from_item, video_id_timestamp
+)
 
 def load_cookies_from_file(filepath):
-    try:
-        with open(filepath, 'rb') as f:
-            cookies = pickle.load(f)
-        print(f"Đã tải cookie thành công từ '{filepath}'.")
-        return cookies
-    except FileNotFoundError:
-        print(f"LỖI: Không tìm thấy file cookie '{filepath}'.")
-        print("Vui lòng chạy lại script đăng nhập để tạo file cookie trước.")
-        return None
-    except Exception as e:
-        print(f"Lỗi khi đọc file cookie: {e}")
-        return None
+    return CookieStore(filepath).load()
+
+def controller_slots(workers, fetch_backend='selenium', http_concurrency=8):
+    """Số lượt tải đồng thời tối đa cho AdaptiveController; backend HTTP giữ một lượt cho mỗi request."""
+    if fetch_backend == 'http':
+        return max(1, workers) * max(1, int(http_concurrency))
+    return workers
 
 class TikTokScraper:
-    def __init__(self, cookies):
+    # Các phần tử cần có trước khi đọc dữ liệu của từng loại trang
+    PROFILE_SELECTORS = ('[data-e2e="followers-count"]', '[data-e2e="user-post-item"]')
+    VIDEO_SELECTORS   = ('[data-e2e="browse-username"]', '[data-e2e="like-count"]')
+
+    _PAGE_STATE_JS = """
+        var sels = arguments[0];
+        var found = sels.every(function (s) { return document.querySelector(s) !== null; });
+        return [found, document.readyState === 'complete',
+                performance.getEntriesByType('resource').length];
+    """
+    # Một lần gọi mỗi lượt cuộn: lấy các video chưa thu, đánh dấu đã thu (tùy chọn làm rỗng
+    # node để tab không phình bộ nhớ) rồi cuộn xuống cuối trang
+    _HARVEST_JS = """
+        var trim = arguments[0];
+        var items = document.querySelectorAll('[data-e2e="user-post-item"]:not([data-harvested])');
+        var out = [];
+        for (var i = 0; i < items.length; i++) {
+            var el = items[i];
+            var a = el.querySelector('a');
+            var views = el.querySelector('[data-e2e="video-views"]');
+            var pinned = el.querySelector('[data-e2e="video-card-badge"]') !== null;
+            out.push([a ? a.href : '', views ? views.textContent.trim() : '', pinned]);
+            el.setAttribute('data-harvested', '1');
+            if (trim) {
+                el.style.minHeight = el.offsetHeight + 'px';
+                el.innerHTML = '';
+            }
+        }
+        window.scrollTo(0, document.body.scrollHeight);
+        return [out, document.querySelectorAll('[data-e2e="user-post-item"]').length];
+    """
+    _COUNT_ITEMS_JS = "return document.querySelectorAll('[data-e2e=\"user-post-item\"]').length;"
+    # Nhận diện trang captcha/xác minh hoặc báo quá nhiều request
+    _BLOCK_JS = """
+        if (document.querySelector('#captcha-verify-container, .captcha_verify_container, ' +
+                                   '.captcha-verify-container, #tiktok-verify-ele')) { return 'captcha'; }
+        var text = ((document.body && document.body.innerText) || '').slice(0, 3000).toLowerCase();
+        if (text.indexOf('too many requests') >= 0 || text.indexOf('rate limit') >= 0) { return 'rate_limit'; }
+        if (text.indexOf('verify to continue') >= 0 || text.indexOf('xác minh để tiếp tục') >= 0) { return 'verify'; }
+        return null;
+    """
+
+    # Chế độ lean: chặn video, ảnh và font (chỉ cần chữ và số liệu)
+    BLOCKED_URL_PATTERNS = [
+        '*.mp4*', '*.webm*', '*.m4s*', '*.m3u8*', '*/video/tos/*', '*mime_type=video*',
+        '*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.heic*', '*.image*',
+        '*.woff*', '*.ttf*', '*.otf*',
+    ]
+
+    # API phân trang danh sách video mà trang kênh gọi khi cuộn
+    ITEM_LIST_API = '/api/post/item_list'
+
+    def __init__(self, cookies, page_timeout=15, idle_time=1.0, scroll_idle_timeout=4, poll_interval=0.25,
+                 use_hydration=True, fetch_backend='selenium', http_concurrency=8, state_store=None,
+                 lean=False, page_stats=False, profile_only=False, base_url='https://www.tiktok.com',
+                 metrics=None, profile_dir=None, profile_name='worker-1', controller=None, max_retries=2,
+                 max_videos=0, since_date=None, trim_harvested=False, archive=None, archive_html=False,
+                 snapshots=None):
         options = Options()
         options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_argument("--start-maximized")
+        if lean:
+            options.add_argument('--headless=new')
+            options.add_argument('--window-size=1920,1080')
+            options.add_argument('--autoplay-policy=user-gesture-required')
+            options.add_argument('--mute-audio')
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        else:
+            options.add_argument("--start-maximized")
         options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
         options.add_argument('--log-level=3')
+        self.profile_path = None
+        if profile_dir:
+            # Profile Chrome lưu lại giữa các lần chạy (cookie, cache); mỗi worker một thư mục
+            self.profile_path = os.path.abspath(os.path.join(profile_dir, profile_name))
+            os.makedirs(self.profile_path, exist_ok=True)
+            options.add_argument(f'--user-data-dir={self.profile_path}')
+        if page_stats or profile_only:
+            # Đọc sự kiện Network từ performance log (đếm byte / bắt phản hồi item_list)
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
         self.driver = webdriver.Chrome(options=options)
+        self.metrics = metrics or Metrics()
+        self.controller = controller or AdaptiveController(
+            max_concurrency=controller_slots(1, fetch_backend, http_concurrency), metrics=self.metrics
+        )
+        self.max_retries = max_retries
+        # Giới hạn khi cuộn kênh: số video tối đa và chỉ lấy video đăng từ ngày since_date (YYYY-MM-DD)
+        self.max_videos = max_videos
+        self.since_ts = datetime.strptime(since_date, '%Y-%m-%d').timestamp() if since_date else None
+        self.trim_harvested = trim_harvested
+        self._count_round_trips()
         self.driver.set_page_load_timeout(300)
+        if lean:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URL_PATTERNS})
+        self.lean = lean
+        self.page_stats = page_stats
+        self.page_log = []
+        self.profile_only = profile_only
+        self._capturing = False
+        self._captured_items = {}
+        self._pending_item_lists = set()
         self.cookies = cookies
+        self.base_url = base_url.rstrip('/')
+        self.page_timeout = page_timeout
+        self.idle_time = idle_time
+        self.scroll_idle_timeout = scroll_idle_timeout
+        self.poll_interval = poll_interval
+        self.use_hydration = use_hydration
+        self.fetch_backend = fetch_backend
+        self.http_concurrency = http_concurrency
+        self.state_store = state_store
+        # Lịch sử số liệu theo thời gian (SnapshotStore) cho bảng xu hướng
+        self.snapshots = snapshots
+        # Kho trang thô (PageArchive) để replay; archive_html: lưu cả HTML khi đã đọc được JSON
+        self.archive = archive
+        self.archive_html = archive_html
+        self.wait_log = []
+
+    def _count_round_trips(self):
+        # Mọi lệnh Selenium (get, find_element, execute_script, CDP...) đều đi qua driver.execute
+        execute = self.driver.execute
+
+        def counted(driver_command, params=None):
+            self.metrics.inc('webdriver_calls', command=driver_command)
+            return execute(driver_command, params)
+        self.driver.execute = counted
 
     def set_cookies(self):
-        print("Đang thiết lập cookies...")
-        self.driver.get("https://www.tiktok.com/")
-        self.driver.delete_all_cookies()
-        for cookie in self.cookies:
-            self.driver.add_cookie(cookie)
-        self.driver.refresh()
-        time.sleep(2)
+        """Nạp cookie qua CDP (không cần mở trang, refresh hay chờ).
+
+        Cookie mà profile đã có đúng giá trị thì không nạp lại, nên với profile
+        dùng lại giữa các lần chạy bước này gần như tức thì.
+        """
+        if not self.cookies:
+            return
+        with self.metrics.timer('set_cookies'):
+            current = self.driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            missing = CookieStore.missing_from(self.cookies, current)
+            if not missing:
+                print("Profile đã có đủ cookie, bỏ qua bước nạp cookie.")
+                return
+            self.driver.execute_cdp_cmd('Network.setCookies', {
+                'cookies': [CookieStore.to_cdp(c, f"{self.base_url}/") for c in missing]
+            })
+            print(f"Đã nạp {len(missing)}/{len(self.cookies)} cookie.")
 
     @staticmethod
     def _parse_number(text):
-        text = text.upper().strip()
-        if 'K' in text:
-            return int(float(text.replace('K', '')) * 1_000)
-        if 'M' in text:
-            return int(float(text.replace('M', '')) * 1_000_000)
-        if 'T' in text:
-            return int(float(text.replace('T', '')) * 1_000_000_000)
-        return int(text.replace(',', '').strip())
+        return parse_count(text)
 
     @staticmethod
     def _parse_duration(duration_str):
-        parts = duration_str.split(':')
-        if len(parts) == 2:
-            return int(parts[-1]) + int(parts[-2]) * 60
-        return int(parts[-1])
+        return parse_duration(duration_str)
 
     @staticmethod
     def _convert_timestamp_to_date(timestamp):
-        if not timestamp or timestamp == 0:
-            return ""
-        try:
-            return datetime.fromtimestamp(timestamp).strftime('%d/%m/%Y')
-        except (ValueError, TypeError):
+        return convert_timestamp_to_date(timestamp)
+
+    def _drain_performance_log(self):
+        # Lấy và xóa các sự kiện đã tích lũy trong performance log của Chrome
+        events = []
+        for entry in self.driver.get_log('performance'):
+            try:
+                events.append(json.loads(entry['message'])['message'])
+            except (KeyError, ValueError):
+                continue
+        if self._capturing:
+            self._capture_item_lists(events)
+        return events
+
+    def _capture_item_lists(self, events):
+        # Giữ lại itemList trong các phản hồi JSON của API danh sách video
+        for event in events:
+            method = event.get('method')
+            params = event.get('params', {})
+            if method == 'Network.responseReceived':
+                if self.ITEM_LIST_API in params.get('response', {}).get('url', ''):
+                    self._pending_item_lists.add(params.get('requestId'))
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self._pending_item_lists:
+                request_id = params['requestId']
+                self._pending_item_lists.discard(request_id)
+                try:
+                    body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                    text = body.get('body', '')
+                    if body.get('base64Encoded'):
+                        text = base64.b64decode(text).decode('utf-8')
+                    for item in json.loads(text).get('itemList') or []:
+                        self._captured_items.setdefault(str(item.get('id')), item)
+                except Exception as e:
+                    print(f"  Không đọc được phản hồi item_list: {e}")
+
+    @staticmethod
+    def _count_bytes(events):
+        return sum(
+            e.get('params', {}).get('encodedDataLength', 0)
+            for e in events if e.get('method') == 'Network.loadingFinished'
+        )
+
+    def _open(self, url):
+        """Mở trang; khi bật page_stats thì ghi lại thời gian tải và số byte đã tải."""
+        self.metrics.inc('pages_loaded')
+        if not self.page_stats:
+            with self.metrics.timer('page_load'):
+                self.driver.get(url)
+            return
+        # Byte tải muộn (XHR sau khi trang trước đã xong) được cộng vào trang trước
+        leftover = self._count_bytes(self._drain_performance_log())
+        if self.page_log:
+            self.page_log[-1][2] += leftover
+        start = time.monotonic()
+        self.driver.get(url)
+        elapsed = time.monotonic() - start
+        nbytes = self._count_bytes(self._drain_performance_log())
+        self.page_log.append([url, elapsed, nbytes])
+        self.metrics.observe('page_load', elapsed)
+        self.metrics.inc('bytes_downloaded', nbytes)
+        print(f"  Tải trang: {elapsed:.2f}s, {nbytes / 1024:.0f} KB")
+
+    def page_summary(self):
+        if not self.page_log:
             return ""
+        total_time = sum(p[1] for p in self.page_log)
+        total_bytes = sum(p[2] for p in self.page_log)
+        n = len(self.page_log)
+        return (f"{n} trang: trung bình {total_time / n:.2f}s và "
+                f"{total_bytes / n / 1024:.0f} KB mỗi trang, tổng {total_bytes / 2**20:.1f} MB.")
+
+    def _wait_for_page(self, selectors, timeout=None):
+        """Chờ đến khi đủ các phần tử cần thiết hoặc trang đứng yên (không tải thêm tài nguyên)."""
+        timeout = self.page_timeout if timeout is None else timeout
+        start = time.monotonic()
+        last_resources, idle_since = -1, start
+        reason = "timeout"
+        while time.monotonic() - start < timeout:
+            found, ready, resources = self.driver.execute_script(self._PAGE_STATE_JS, list(selectors))
+            now = time.monotonic()
+            if found:
+                reason = "ready"
+                break
+            if resources != last_resources:
+                last_resources, idle_since = resources, now
+            elif ready and now - idle_since >= self.idle_time:
+                reason = "idle"
+                break
+            time.sleep(self.poll_interval)
+        elapsed = time.monotonic() - start
+        self.wait_log.append((self.driver.current_url, reason, elapsed))
+        self.metrics.observe('wait_for_page', elapsed, reason=reason)
+        print(f"  Chờ trang: {elapsed:.2f}s ({reason})")
+        return reason == "ready"
+
+    def _raise_if_blocked(self):
+        # Chỉ gọi khi trang không như mong đợi, nên không tốn thêm lượt gọi với trang bình thường
+        reason = self.driver.execute_script(self._BLOCK_JS)
+        if reason:
+            self.metrics.inc('throttled', reason=reason)
+            raise ThrottledError(reason, self.driver.current_url)
+
+    def _scroll_page(self, expected_count=0):
+        """Cuộn trang kênh và thu video mới sau mỗi lượt cuộn; trả về [(url, lượt xem, ghim)].
 
-    def _scroll_page(self):
+        Dừng khi đã thấy expected_count video, khi không có video mới trong
+        scroll_idle_timeout, khi đủ max_videos, hoặc khi gặp video (không ghim)
+        đăng trước since_date; video trên trang kênh xếp từ mới đến cũ.
+        """
         print("Đang cuộn trang để tải tất cả video...")
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        attempts = 0
-        max_attempts = 20
-        while attempts < max_attempts:
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                attempts += 1
-            else:
-                attempts = 0
-            last_height = new_height
+        start = time.monotonic()
+        harvested, seen = [], set()
+        while True:
+            if self._capturing:
+                self._drain_performance_log()
+            batch, count = self.driver.execute_script(self._HARVEST_JS, self.trim_harvested)
+            cutoff = False
+            for href, views, pinned in batch:
+                if not href or href in seen:
+                    continue
+                seen.add(href)
+                if self.since_ts:
+                    created = video_id_timestamp(href)
+                    if created and created < self.since_ts:
+                        # Video ghim có thể cũ nhưng luôn nằm đầu trang: bỏ qua chứ không dừng
+                        if pinned:
+                            continue
+                        cutoff = True
+                        break
+                harvested.append((href, views, pinned))
+                if self.max_videos and len(harvested) >= self.max_videos:
+                    cutoff = True
+                    break
+            if cutoff or (expected_count and len(seen) >= expected_count):
+                break
+            # Chờ số video tăng lên; nếu quá scroll_idle_timeout mà không tăng thì dừng
+            grew_at = time.monotonic()
+            while True:
+                time.sleep(self.poll_interval)
+                new_count = self.driver.execute_script(self._COUNT_ITEMS_JS)
+                if new_count > count or time.monotonic() - grew_at >= self.scroll_idle_timeout:
+                    break
+            if new_count <= count:
+                break
+        elapsed = time.monotonic() - start
+        self.wait_log.append((self.driver.current_url, "scroll", elapsed))
+        self.metrics.observe('scroll', elapsed)
+        print(f"  Cuộn xong: thu {len(harvested)} video sau {elapsed:.2f}s" + (" (đạt giới hạn)" if cutoff else ""))
+        return harvested
 
     def _get_video_urls(self, channel_url):
-        self.driver.get(channel_url)
-        time.sleep(3)
+        self._open(channel_url)
+        if not self._wait_for_page(self.PROFILE_SELECTORS):
+            self._raise_if_blocked()
 
         # profile stats
         try:
@@ -104,15 +364,14 @@ class TikTokScraper:
             video_text = self.driver.find_element(By.CSS_SELECTOR, '[data-e2e="video-count"]').text.strip()
             video_count = self._parse_number(video_text)
         except:
-            video_count = 0
+            video_text, video_count = '', 0
+        # Số video hiển thị được làm tròn ('1.2K' có thể là 1249): chỉ dùng làm điểm dừng khi là số chính xác,
+        # nếu không thì cuộn đến khi danh sách ngừng tăng
+        expected_count = video_count if video_text.replace(',', '').isdigit() else 0
 
-        self._scroll_page()
-        elements = self.driver.find_elements(By.CSS_SELECTOR, '[data-e2e="user-post-item"]')
         video_data = []
-        for elem in elements:
+        for link, views_text, _ in self._scroll_page(expected_count):
             try:
-                link = elem.find_element(By.TAG_NAME, 'a').get_attribute('href')
-                views_text = elem.find_element(By.CSS_SELECTOR, '[data-e2e="video-views"]').text.strip()
                 views = self._parse_number(views_text)
                 video_data.append({
                     "url": link,
@@ -125,18 +384,102 @@ class TikTokScraper:
                 continue
         return video_data
 
-    def _extract_video_details(self, video_info):
-        self.driver.get(video_info['url'])
-        time.sleep(3)
+    def _list_channel(self, channel_name):
+        # Lỗi/bị chặn khi tải trang kênh: thử lại, controller tự giãn nhịp trước lần sau.
+        # Lượt liệt kê không giữ luồng tải video và không tính vào độ trễ tham chiếu
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.metrics.timer('list_channel', channel=channel_name), self.controller.slot(listing=True):
+                    return self._collect_channel(channel_name)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"  Lỗi khi tải kênh {channel_name}: {e}; thử lại ({attempt + 1}/{self.max_retries})")
+                self.metrics.inc('retries', phase='channel', channel=channel_name)
+
+    def _collect_channel(self, channel_name):
+        """Trả về (video cần mở trang chi tiết, bản ghi đã dựng sẵn).
+
+        Ở chế độ profile_only, bản ghi được dựng từ phản hồi item_list bắt được khi
+        cuộn trang kênh; chỉ video không có trong phản hồi mới cần mở trang riêng.
+        """
+        url = f"{self.base_url}/@{channel_name}"
+        if not self.profile_only:
+            return self._get_video_urls(url), []
+
+        self._drain_performance_log()  # bỏ sự kiện của trang trước
+        self._captured_items, self._pending_item_lists = {}, set()
+        self._capturing = True
+        try:
+            vids = self._get_video_urls(url)
+            self._drain_performance_log()
+        finally:
+            self._capturing = False
+
+        by_id = {}
+        for info in vids:
+            match = re.search(r'/video/(\d+)', info['url'])
+            if match:
+                by_id[match.group(1)] = info
+        profile_info = {k: v for k, v in (vids[0] if vids else {}).items() if k not in ('url', 'playCount')}
+        captured = self._captured_items
+        if self.max_videos or self.since_ts:
+            # Phản hồi API có thể chứa video ngoài giới hạn: chỉ giữ video đã thu khi cuộn
+            captured = {k: v for k, v in captured.items() if k in by_id}
+        records = []
+        for video_id, item in captured.items():
+            record = record_from_item(item, by_id.get(video_id, profile_info), item)
+            record.channel = channel_name
+            self._remember(record)
+            records.append(record)
+        missing = [info for video_id, info in by_id.items() if video_id not in captured]
+        print(f"  Lấy được {len(records)} video từ API danh sách, {len(missing)} video cần mở trang riêng.")
+        return missing, records
+
+    def _archive_page(self, video_info, content, kind, channel_name):
+        try:
+            self.archive.put(video_info['url'], content, kind, channel_name, video_info)
+        except Exception as e:
+            print(f"  Lỗi lưu trang vào kho: {e}")
+
+    def _extract_video_details(self, video_info, channel_name=''):
+        self._open(video_info['url'])
+        if self.use_hydration:
+            data = self._extract_from_hydration(video_info, channel_name)
+            if data is not None:
+                if self.archive is not None and self.archive_html:
+                    self._archive_page(video_info, self.driver.page_source, 'html', channel_name)
+                return data
+            self._raise_if_blocked()
+            print("  Không đọc được JSON của trang, chuyển sang đọc theo selector.")
+        if not self._wait_for_page(self.VIDEO_SELECTORS):
+            self._raise_if_blocked()
+        if self.archive is not None:
+            self._archive_page(video_info, self.driver.page_source, 'html', channel_name)
+        return self._extract_video_details_dom(video_info)
+
+    def _extract_from_hydration(self, video_info, channel_name=''):
+        # Một lần execute_script lấy toàn bộ trường cần thiết, số liệu là số nguyên chính xác
+        try:
+            raw = self.driver.execute_script(EXTRACT_JS, HYDRATION_SCRIPT_IDS)
+            if not raw:
+                return None
+            if self.archive is not None:
+                self._archive_page(video_info, raw, 'json', channel_name)
+            return parse_video_payload(json.loads(raw), video_info)
+        except Exception:
+            return None
+
+    def _extract_video_details_dom(self, video_info):
         html_source = self.driver.page_source
 
-        data = {
-            "webVideoUrl": video_info.get('url', ''),
-            "playCount": video_info.get('playCount', 0),
-            "followers": video_info.get('followers', 0),
-            "heartCount": video_info.get('heartCount', 0),
-            "videoCount": video_info.get('videoCount', 0)
-        }
+        data = VideoRecord(
+            webVideoUrl=video_info.get('url', ''),
+            playCount=video_info.get('playCount', 0),
+            followers=video_info.get('followers', 0),
+            heartCount=video_info.get('heartCount', 0),
+            videoCount=video_info.get('videoCount', 0)
+        )
 
         def get_count(selector):
             try:
@@ -145,107 +488,889 @@ class TikTokScraper:
             except:
                 return 0
 
-        data["author"]  = self.driver.find_element(By.CSS_SELECTOR, '[data-e2e="browse-username"]').text.strip()
-        data["text"]    = self.driver.find_element(By.CSS_SELECTOR, '[data-e2e="browse-video-desc"]').text.strip()
-        data["diggCount"]   = get_count('[data-e2e="like-count"]')
-        data["shareCount"]  = get_count('[data-e2e="share-count"]')
-        data["commentCount"]= get_count('[data-e2e="comment-count"]')
+        data.author  = self.driver.find_element(By.CSS_SELECTOR, '[data-e2e="browse-username"]').text.strip()
+        data.text    = self.driver.find_element(By.CSS_SELECTOR, '[data-e2e="browse-video-desc"]').text.strip()
+        data.diggCount    = get_count('[data-e2e="like-count"]')
+        data.shareCount   = get_count('[data-e2e="share-count"]')
+        data.commentCount = get_count('[data-e2e="comment-count"]')
 
         try:
             col = self.driver.find_elements(By.CSS_SELECTOR, '[data-e2e="undefined-count"]')
-            data["collectCount"] = self._parse_number(col[0].text.strip()) if col else 0
+            data.collectCount = self._parse_number(col[0].text.strip()) if col else 0
         except:
-            data["collectCount"] = 0
+            data.collectCount = 0
 
         try:
             dur = self.driver.find_element(
                 By.CSS_SELECTOR, 
                 '.css-1cuqcrm-DivSeekBarTimeContainer'
             ).text.split('/')[-1].strip()
-            data["duration"] = self._parse_duration(dur)
+            data.duration = self._parse_duration(dur)
         except:
-            data["duration"] = 0
+            data.duration = 0
 
         ts_list = sorted(
             int(x) for x in re.findall(r'"createTime":\s*"(\d+)"', html_source)
             if int(x) != 0
         )
-        data["Ngày tạo kênh"] = self._convert_timestamp_to_date(ts_list[0]) if ts_list else ""
-        data["Ngày đăng"]     = self._convert_timestamp_to_date(ts_list[-1]) if ts_list else ""
+        data.channelCreated = self._convert_timestamp_to_date(ts_list[0]) if ts_list else ""
+        data.postedDate     = self._convert_timestamp_to_date(ts_list[-1]) if ts_list else ""
 
-        data["hashtags"] = [
+        data.hashtags = [
             a.text.strip('# ')
             for a in self.driver.find_elements(By.CSS_SELECTOR, '[data-e2e="browse-video-desc"] a strong')
         ]
 
         m1 = re.search(r'"isAd":(true|false)', html_source)
         m2 = re.search(r'"isADVirtual":(true|false)', html_source)
-        data["isAd"]        = m1.group(1) if m1 else ""
-        data["isADVirtual"] = m2.group(1) if m2 else ""
+        data.isAd        = m1.group(1) if m1 else ""
+        data.isADVirtual = m2.group(1) if m2 else ""
 
         return data
 
-    def scrape_channels(self, channel_names):
+    def scrape_video(self, channel_name, video_info):
+        with self.metrics.timer('video_page', channel=channel_name), self.controller.slot():
+            detail = self._extract_video_details(video_info, channel_name)
+        detail.channel = channel_name
+        self._remember(detail)
+        return detail
+
+    def _remember(self, record):
+        # Chỉ bản ghi vừa cào (không phải bản ghi còn hạn lấy lại từ state store)
+        if self.state_store is not None:
+            self.state_store.save(record)
+        if self.snapshots is not None:
+            self.snapshots.add(record)
+
+    def _skip_fresh(self, channel_name, vids):
+        # Chỉ giữ video mới hoặc đã quá TTL; video còn hạn dùng lại bản ghi đã lưu
+        if self.state_store is None:
+            return vids, []
+        todo, cached = self.state_store.split(channel_name, vids)
+        print(f"  {len(cached)} video còn hạn, cần cào {len(todo)} video.")
+        return todo, cached
+
+    def scrape_videos_http(self, channel_name, vids):
+        # Trang video tải qua HTTP; video nào lỗi thì quay lại dùng trình duyệt
+        from http_fetcher import AsyncVideoFetcher
+        fetcher = AsyncVideoFetcher(
+            self.cookies, concurrency=self.http_concurrency, archive=self.archive, controller=self.controller
+        )
+        with self.metrics.timer('http_batch', channel=channel_name):
+            records = fetcher.fetch((channel_name, info) for info in vids)
+        print(f"  HTTP: {sum(r is not None for r in records)}/{len(vids)} video")
+        results = []
+        for info, record in zip(vids, records):
+            if record is None:
+                self.metrics.inc('retries', phase='http', channel=channel_name)
+                try:
+                    record = self.scrape_video(channel_name, info)
+                except Exception as e:
+                    print(f"  Lỗi chi tiết: {e}")
+                    self.metrics.inc('failures', phase='video', channel=channel_name)
+                    continue
+            else:
+                self._remember(record)
+            results.append(record)
+        return results
+
+    def scrape_channels(self, channel_names, sink=None, checkpoint=None):
+        # Có sink: mỗi bản ghi được ghi ngay ra file thay vì giữ trong bộ nhớ
         all_data = []
+
+        def emit(record):
+            if sink is None:
+                all_data.append(record)
+            else:
+                sink.write(record)
+            self.metrics.inc('records', channel=record.channel)
+            if checkpoint is not None:
+                checkpoint.mark_video(record.channel, record.webVideoUrl)
+
         for name in channel_names:
+            if checkpoint is not None and checkpoint.is_channel_done(name):
+                print(f"\n--- Bỏ qua kênh đã xong: {name} ---")
+                continue
             print(f"\n--- Đang xử lý kênh: {name} ---")
-            url = f"https://www.tiktok.com/@{name}"
             try:
-                vids = self._get_video_urls(url)
-                if not vids:
+                vids, records = self._list_channel(name)
+                if not vids and not records:
                     print(f"No videos for {name}.")
                     continue
-                for idx, info in enumerate(vids, 1):
-                    print(f"Video {idx}/{len(vids)}: {info['url']}")
-                    try:
-                        detail = self._extract_video_details(info)
-                        detail["channel"] = name
-                        all_data.append(detail)
-                    except Exception as e:
-                        print(f"  Lỗi chi tiết: {e}")
+                if checkpoint is not None:
+                    vids = checkpoint.pending_videos(name, vids)
+                    records = [r for r in records if not checkpoint.is_video_done(name, r.webVideoUrl)]
+                self.metrics.inc('videos_listed', len(vids) + len(records), channel=name)
+                for record in records:
+                    emit(record)
+                vids, cached = self._skip_fresh(name, vids)
+                for record in cached:
+                    emit(record)
+                if self.fetch_backend == 'http':
+                    for record in self.scrape_videos_http(name, vids):
+                        emit(record)
+                else:
+                    # Video lỗi được đưa về cuối hàng đợi, tối đa max_retries lần
+                    todo = deque((info, 0) for info in vids)
+                    done = 0
+                    while todo:
+                        info, attempt = todo.popleft()
+                        print(f"Video {done + 1}/{len(vids)}: {info['url']}")
+                        try:
+                            emit(self.scrape_video(name, info))
+                            done += 1
+                        except Exception as e:
+                            if attempt < self.max_retries:
+                                print(f"  Lỗi chi tiết: {e}; thử lại sau ({attempt + 1}/{self.max_retries})")
+                                self.metrics.inc('retries', phase='video', channel=name)
+                                todo.append((info, attempt + 1))
+                                continue
+                            print(f"  Lỗi chi tiết: {e}")
+                            self.metrics.inc('failures', phase='video', channel=name)
+                            done += 1
+                if checkpoint is not None:
+                    checkpoint.mark_channel(name)
             except Exception as e:
                 print(f"  Lỗi khi xử lý kênh {name}: {e}")
+                self.metrics.inc('failures', phase='channel', channel=name)
+        if self.state_store is not None:
+            print(self.state_store.summary())
+        if self.page_stats:
+            print(self.page_summary())
         return all_data
 
     def quit(self):
         self.driver.quit()
 
+class TikTokScraperPool:
+    """Chạy nhiều trình duyệt song song, cùng lấy việc từ một hàng đợi chung.
+
+    Hàng đợi chứa hai loại việc: trang kênh ("channel") và trang chi tiết video
+    ("video"). Mỗi worker có một TikTokScraper riêng đã nạp cookie.
+    """
+
+    def __init__(self, cookies, workers=4, **scraper_kwargs):
+        self.cookies = cookies
+        self.workers = max(1, int(workers))
+        self.scraper_kwargs = scraper_kwargs
+        # Mọi worker ghi chung một Metrics
+        self.metrics = scraper_kwargs.setdefault('metrics', Metrics())
+        # Một controller chung: số worker thật sự tải trang do AIMD quyết định
+        slots = controller_slots(
+            self.workers, scraper_kwargs.get('fetch_backend', 'selenium'), scraper_kwargs.get('http_concurrency', 8)
+        )
+        self.controller = scraper_kwargs.setdefault(
+            'controller', AdaptiveController(max_concurrency=slots, metrics=self.metrics)
+        )
+
+    def scrape_channels(self, channel_names, sink=None, checkpoint=None):
+        tasks = queue.Queue()
+        results = []
+        lock = threading.Lock()
+        pending = [0]
+        remaining = {}
+
+        def submit(task):
+            with lock:
+                pending[0] += 1
+            tasks.put(task)
+
+        def finish():
+            with lock:
+                pending[0] -= 1
+
+        def emit(order, record):
+            with lock:
+                if sink is None:
+                    results.append((order, record))
+                else:
+                    sink.write(record)
+                self.metrics.inc('records', channel=record.channel)
+                if checkpoint is not None:
+                    checkpoint.mark_video(record.channel, record.webVideoUrl)
+
+        def track(name, delta):
+            # Kênh xong khi mọi video của kênh đã được xử lý
+            with lock:
+                remaining[name] = remaining.get(name, 0) + delta
+                done = remaining[name] == 0
+            if done and checkpoint is not None:
+                checkpoint.mark_channel(name)
+
+        def worker(worker_id):
+            tag = f"[W{worker_id}]"
+            try:
+                kwargs = dict(self.scraper_kwargs, profile_name=f"worker-{worker_id}")
+                scraper = TikTokScraper(self.cookies, **kwargs)
+            except Exception as e:
+                print(f"{tag} Không khởi tạo được trình duyệt: {e}")
+                return
+            try:
+                scraper.set_cookies()
+                while True:
+                    try:
+                        task = tasks.get(timeout=0.5)
+                    except queue.Empty:
+                        with lock:
+                            if pending[0] == 0:
+                                return
+                        continue
+                    kind, order, name, info, attempt = task
+                    try:
+                        if kind == "channel":
+                            print(f"{tag} --- Đang xử lý kênh: {name} ---")
+                            vids, records = scraper._list_channel(name)
+                            if not vids and not records:
+                                print(f"{tag} No videos for {name}.")
+                                continue
+                            if checkpoint is not None:
+                                vids = checkpoint.pending_videos(name, vids)
+                                records = [r for r in records if not checkpoint.is_video_done(name, r.webVideoUrl)]
+                            self.metrics.inc('videos_listed', len(vids) + len(records), channel=name)
+                            for idx, record in enumerate(records):
+                                emit((order[0], -2, idx), record)
+                            vids, cached = scraper._skip_fresh(name, vids)
+                            for record in cached:
+                                emit((order[0], -1), record)
+                            if scraper.fetch_backend == 'http':
+                                details = scraper.scrape_videos_http(name, vids)
+                                for idx, record in enumerate(details):
+                                    emit((order[0], idx), record)
+                                track(name, 0)
+                                continue
+                            track(name, len(vids))
+                            for idx, vid in enumerate(vids):
+                                submit(("video", (order[0], idx), name, vid, 0))
+                        else:
+                            print(f"{tag} Video: {info['url']}")
+                            emit(order, scraper.scrape_video(name, info))
+                    except Exception as e:
+                        if kind == "video" and attempt < scraper.max_retries:
+                            # Đưa lại vào cuối hàng đợi; track +1 bù cho -1 ở finally
+                            print(f"{tag}   Lỗi chi tiết: {e}; thử lại sau ({attempt + 1}/{scraper.max_retries})")
+                            self.metrics.inc('retries', phase=kind, channel=name)
+                            track(name, 1)
+                            submit((kind, order, name, info, attempt + 1))
+                            continue
+                        if kind == "channel":
+                            print(f"{tag}   Lỗi khi xử lý kênh {name}: {e}")
+                        else:
+                            print(f"{tag}   Lỗi chi tiết: {e}")
+                        self.metrics.inc('failures', phase=kind, channel=name)
+                    finally:
+                        if kind == "video":
+                            track(name, -1)
+                        finish()
+            finally:
+                if scraper.page_stats:
+                    print(f"{tag} {scraper.page_summary()}")
+                scraper.quit()
+
+        for idx, name in enumerate(channel_names):
+            if checkpoint is not None and checkpoint.is_channel_done(name):
+                print(f"--- Bỏ qua kênh đã xong: {name} ---")
+                continue
+            submit(("channel", (idx,), name, None, 0))
+
+        threads = [
+            threading.Thread(target=worker, args=(i + 1,), daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        state_store = self.scraper_kwargs.get('state_store')
+        if state_store is not None:
+            print(state_store.summary())
+
+        # Giữ nguyên thứ tự kênh/video như khi chạy tuần tự
+        results.sort(key=lambda r: r[0])
+        return [detail for _, detail in results]
+
+class TikTokPipeline:
+    """Crawl theo dây chuyền: liệt kê kênh -> mở trang video -> ghi file, các tầng chạy chồng lên nhau.
+
+    - `listers` trình duyệt cuộn trang kênh, đẩy từng video vào hàng đợi ngay khi
+      liệt kê xong kênh rồi chuyển sang kênh tiếp theo.
+    - `extractors` trình duyệt (hoặc HTTP khi fetch_backend='http') lấy video từ
+      hàng đợi đó, bản ghi đi vào hàng đợi thứ hai.
+    - Một thread ghi nhận bản ghi, ghi vào sink/checkpoint và chuyển tiếp cho
+      `uploader` (vd. IncrementalSheetsUploader) nếu có.
+    Hàng đợi giữa các tầng có giới hạn `queue_size`: tầng sau chậm thì tầng
+    trước phải chờ (backpressure), bộ nhớ không tăng theo số video.
+    """
+
+    def __init__(self, cookies, listers=1, extractors=2, queue_size=200, **scraper_kwargs):
+        self.cookies = cookies
+        self.listers = max(1, int(listers))
+        self.extractors = max(1, int(extractors))
+        self.queue_size = max(1, int(queue_size))
+        self.scraper_kwargs = scraper_kwargs
+        self.metrics = scraper_kwargs.setdefault('metrics', Metrics())
+        slots = self.listers + controller_slots(
+            self.extractors, scraper_kwargs.get('fetch_backend', 'selenium'), scraper_kwargs.get('http_concurrency', 8)
+        )
+        self.controller = scraper_kwargs.setdefault(
+            'controller', AdaptiveController(max_concurrency=slots, metrics=self.metrics)
+        )
+
+    def _put(self, q, item, stage, abort):
+        # Hàng đợi đầy: đo thời gian tầng `stage` bị chặn; dừng chờ nếu pipeline bị hủy
+        try:
+            q.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        with self.metrics.timer('backpressure', stage=stage):
+            while not abort.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+        return False
+
+    def _start_scraper(self, tag, profile_name):
+        try:
+            scraper = TikTokScraper(self.cookies, **dict(self.scraper_kwargs, profile_name=profile_name))
+        except Exception as e:
+            print(f"{tag} Không khởi tạo được trình duyệt: {e}")
+            return None
+        try:
+            scraper.set_cookies()
+        except Exception as e:
+            print(f"{tag} Lỗi nạp cookie: {e}")
+            scraper.quit()
+            return None
+        return scraper
+
+    def scrape_channels(self, channel_names, sink=None, checkpoint=None, uploader=None):
+        channels = queue.Queue()
+        videos = queue.Queue(maxsize=self.queue_size)
+        retries = queue.Queue()  # không giới hạn: extractor không tự chặn chính mình khi thử lại
+        records = queue.Queue(maxsize=self.queue_size)
+        listing_done = threading.Event()
+        abort = threading.Event()
+        lock = threading.Lock()
+        remaining = {}
+        pending = [0]
+        alive = [self.extractors]
+        results = []
+
+        def channel_progress(name, delta):
+            # Kênh xong khi đã liệt kê xong và mọi video đã xử lý; báo cho tầng ghi sau các bản ghi của kênh
+            with lock:
+                remaining[name] = remaining.get(name, 0) + delta
+                done = remaining[name] == 0
+            if done:
+                self._put(records, ("channel", name), 'extract', abort)
+
+        def lister(worker_id):
+            tag = f"[L{worker_id}]"
+            scraper = self._start_scraper(tag, f"lister-{worker_id}")
+            if scraper is None:
+                return
+            try:
+                while not abort.is_set():
+                    try:
+                        name = channels.get_nowait()
+                    except queue.Empty:
+                        return
+                    print(f"{tag} --- Đang liệt kê kênh: {name} ---")
+                    try:
+                        vids, prebuilt = scraper._list_channel(name)
+                    except Exception as e:
+                        print(f"{tag}   Lỗi khi xử lý kênh {name}: {e}")
+                        self.metrics.inc('failures', phase='channel', channel=name)
+                        continue
+                    if not vids and not prebuilt:
+                        print(f"{tag} No videos for {name}.")
+                        continue
+                    if checkpoint is not None:
+                        vids = checkpoint.pending_videos(name, vids)
+                        prebuilt = [r for r in prebuilt if not checkpoint.is_video_done(name, r.webVideoUrl)]
+                    self.metrics.inc('videos_listed', len(vids) + len(prebuilt), channel=name)
+                    vids, cached = scraper._skip_fresh(name, vids)
+                    # +1 giữ kênh mở cho tới khi mọi video của kênh đã vào hàng đợi
+                    channel_progress(name, len(vids) + 1)
+                    with lock:
+                        pending[0] += len(vids)
+                    for record in prebuilt + cached:
+                        self._put(records, ("record", record), 'list', abort)
+                    for info in vids:
+                        if not self._put(videos, (name, info, 0), 'list', abort):
+                            return
+                    channel_progress(name, -1)
+            finally:
+                if scraper.page_stats:
+                    print(f"{tag} {scraper.page_summary()}")
+                scraper.quit()
+
+        def next_tasks(limit):
+            # Ưu tiên video cần thử lại; HTTP lấy cả lô để tải song song
+            tasks = []
+            while len(tasks) < limit:
+                try:
+                    tasks.append(retries.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                try:
+                    tasks.append(videos.get(timeout=0.5) if not tasks else videos.get_nowait())
+                except queue.Empty:
+                    break
+            return tasks
+
+        def finish_video(name):
+            with lock:
+                pending[0] -= 1
+            channel_progress(name, -1)
+
+        def extractor(worker_id):
+            tag = f"[W{worker_id}]"
+            scraper = self._start_scraper(tag, f"worker-{worker_id}")
+            if scraper is None:
+                with lock:
+                    alive[0] -= 1
+                    if alive[0] == 0:
+                        print("Không còn trình duyệt nào để mở trang video, dừng pipeline.")
+                        abort.set()
+                return
+            batch_size = scraper.http_concurrency * 4 if scraper.fetch_backend == 'http' else 1
+            try:
+                while not abort.is_set():
+                    tasks = next_tasks(batch_size)
+                    if not tasks:
+                        with lock:
+                            if listing_done.is_set() and pending[0] == 0:
+                                return
+                        continue
+                    if scraper.fetch_backend == 'http':
+                        by_channel = {}
+                        for task in tasks:
+                            by_channel.setdefault(task[0], []).append(task)
+                        for name, group in by_channel.items():
+                            finished = len(group)
+                            try:
+                                for record in scraper.scrape_videos_http(name, [info for _, info, _ in group]):
+                                    self._put(records, ("record", record), 'extract', abort)
+                            except Exception as e:
+                                # Lỗi cả lô: đưa từng video về hàng thử lại, hết lượt thì tính là lỗi
+                                print(f"{tag}   Lỗi khi tải lô video của {name}: {e}")
+                                for _, info, attempt in group:
+                                    if attempt < scraper.max_retries:
+                                        self.metrics.inc('retries', phase='video', channel=name)
+                                        retries.put((name, info, attempt + 1))
+                                        finished -= 1
+                                    else:
+                                        self.metrics.inc('failures', phase='video', channel=name)
+                            finally:
+                                for _ in range(finished):
+                                    finish_video(name)
+                        continue
+                    name, info, attempt = tasks[0]
+                    print(f"{tag} Video: {info['url']}")
+                    try:
+                        record = scraper.scrape_video(name, info)
+                    except Exception as e:
+                        if attempt < scraper.max_retries:
+                            print(f"{tag}   Lỗi chi tiết: {e}; thử lại sau ({attempt + 1}/{scraper.max_retries})")
+                            self.metrics.inc('retries', phase='video', channel=name)
+                            retries.put((name, info, attempt + 1))
+                            continue
+                        print(f"{tag}   Lỗi chi tiết: {e}")
+                        self.metrics.inc('failures', phase='video', channel=name)
+                    else:
+                        self._put(records, ("record", record), 'extract', abort)
+                    finish_video(name)
+            finally:
+                if scraper.page_stats:
+                    print(f"{tag} {scraper.page_summary()}")
+                scraper.quit()
+
+        def writer():
+            first = True
+            while True:
+                item = records.get()
+                if item is None:
+                    return
+                kind, value = item
+                try:
+                    if kind == "channel":
+                        if checkpoint is not None:
+                            checkpoint.mark_channel(value)
+                        continue
+                    if first:
+                        self.metrics.observe('first_record', self.metrics.elapsed())
+                        first = False
+                    if sink is None:
+                        results.append(value)
+                    else:
+                        sink.write(value)
+                    self.metrics.inc('records', channel=value.channel)
+                    if checkpoint is not None:
+                        checkpoint.mark_video(value.channel, value.webVideoUrl)
+                    if uploader is not None:
+                        uploader.write(value)
+                except Exception as e:
+                    print(f"Lỗi khi ghi bản ghi, dừng pipeline: {e}")
+                    abort.set()
+                    # Tiếp tục rút hàng đợi để các tầng trước không bị treo
+                    while records.get() is not None:
+                        pass
+                    return
+
+        for name in channel_names:
+            if checkpoint is not None and checkpoint.is_channel_done(name):
+                print(f"--- Bỏ qua kênh đã xong: {name} ---")
+                continue
+            channels.put(name)
+
+        write_thread = threading.Thread(target=writer, daemon=True)
+        list_threads = [threading.Thread(target=lister, args=(i + 1,), daemon=True) for i in range(self.listers)]
+        extract_threads = [
+            threading.Thread(target=extractor, args=(i + 1,), daemon=True) for i in range(self.extractors)
+        ]
+        write_thread.start()
+        for t in list_threads + extract_threads:
+            t.start()
+        for t in list_threads:
+            t.join()
+        listing_done.set()
+        for t in extract_threads:
+            t.join()
+        records.put(None)
+        write_thread.join()
+
+        state_store = self.scraper_kwargs.get('state_store')
+        if state_store is not None:
+            print(state_store.summary())
+        return results
+
 class CSVExporter:
-    def __init__(self, filename='tiktok_data.csv'):
+    HEADER = CSV_COLUMNS
+
+    def __init__(self, filename='tiktok_data.csv', fsync_every=50, metrics=None):
         self.filename = filename
+        self.fsync_every = fsync_every
+        self.metrics = metrics or Metrics()
+        self.rows_written = 0
+        self._start_offset = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    # --- Ghi dạng stream: mỗi bản ghi được đẩy xuống file ngay khi có ---
+    def open(self, append=False):
+        has_header = append and os.path.exists(self.filename) and os.path.getsize(self.filename) > 0
+        self._file = open(self.filename, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._start_offset = self._file.tell()
+        if not has_header:
+            self._writer.writerow(self.HEADER)
+            self._file.flush()
+        return self
+
+    def write(self, record):
+        with self._lock, self.metrics.timer('export_write'):
+            self._writer.writerow(record.row())
+            self._file.flush()
+            self.rows_written += 1
+            if self.rows_written % self.fsync_every == 0:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.metrics.inc('output_bytes', self._file.tell() - self._start_offset)
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def export(self, data):
         if not data:
             print("Không có dữ liệu để xuất.")
             return
 
-        header = [
-            "Kênh","Author","Followers","Text","Likes","Shares","Comments","Collects",
-            "Duration(s)","Ngày tạo kênh","Ngày đăng","Hashtags","URL Video","Views",
-            "followerCount","heartCount","videoCount","isAd","isADVirtual"
-        ]
         try:
-            with open(self.filename, 'w', newline='', encoding='utf-8') as f:
+            with self.metrics.timer('export'), open(self.filename, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow(header)
-                for it in data:
-                    writer.writerow([
-                        it.get("channel",""), it.get("author",""), it.get("followers",0), it.get("text",""),
-                        it.get("diggCount",0), it.get("shareCount",0), it.get("commentCount",0),
-                        it.get("collectCount",0), it.get("duration",0),
-                        it.get("Ngày tạo kênh",""), it.get("Ngày đăng",""),
-                        ', '.join(it.get("hashtags",[])), it.get("webVideoUrl",""),
-                        it.get("playCount",0),
-                        it.get("followers",0), it.get("heartCount",0), it.get("videoCount",0),
-                        it.get("isAd",""), it.get("isADVirtual","")
-                    ])
+                writer.writerow(self.HEADER)
+                writer.writerows(it.row() for it in data)
+                self.metrics.inc('output_bytes', f.tell())
             print(f"Thành công! Dữ liệu đã được lưu vào file CSV: {self.filename}")
         except Exception as e:
             print(f"Lỗi khi ghi file CSV: {e}")
 
+class ParquetExporter(CSVExporter):
+    """Ghi dataset Parquet có kiểu cố định, phân vùng theo kênh và ngày cào.
+
+    Cấu trúc: <dataset_dir>/channel=<kênh>/scrape_date=<YYYY-MM-DD>/part-*.parquet.
+    Bản ghi được gom thành từng lô row group; lô chưa ghi được giữ tạm trong
+    _pending.jsonl để không mất khi chương trình dừng giữa chừng.
+    """
+
+    PENDING_FILE = '_pending.jsonl'
+
+    def __init__(self, dataset_dir, row_group_size=5000, metrics=None):
+        super().__init__(dataset_dir, metrics=metrics)
+        self.row_group_size = row_group_size
+        self.scrape_date = datetime.now().strftime('%Y-%m-%d')
+        self._run_id = uuid.uuid4().hex[:12]
+        self._batches = 0
+        self._buffers = {}
+        self._buffered = 0
+        self._append = False
+        self._touched = set()
+        self._pending_path = os.path.join(dataset_dir, self.PENDING_FILE)
+
+    def open(self, append=False):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa, self._pq = pa, pq
+        self._schema = ColumnConfig.arrow_schema(self.HEADER)
+        os.makedirs(self.filename, exist_ok=True)
+        if os.path.exists(self._pending_path):
+            self._recover_pending()
+        self._append = append
+        self._file = open(self._pending_path, 'a' if append else 'w', encoding='utf-8')
+        return self
+
+    def _recover_pending(self):
+        # File tạm dùng chung cho cả dataset, còn checkpoint thì theo danh sách kênh: lô chưa ghi
+        # của lần chạy trước (có thể với danh sách kênh khác) phải vào dataset trước khi file bị
+        # ghi đè, vì checkpoint của lần đó đã đánh dấu các video này là xong
+        self._file = open(self._pending_path, 'a+', encoding='utf-8')
+        self._file.seek(0)
+        for line in self._file:
+            try:
+                self._buffer(VideoRecord.from_dict(json.loads(line)))
+            except ValueError:
+                continue
+        if self._buffered:
+            print(f"Khôi phục {self._buffered} bản ghi chưa ghi của lần chạy trước vào dataset.")
+            # Ghi thêm, không thay phần dữ liệu đã có của kênh
+            self._append = True
+            self._flush()
+            self._touched.clear()
+        self._file.close()
+
+    def _buffer(self, record):
+        batch = self._buffers.get(record.channel)
+        if batch is None:
+            batch = self._buffers[record.channel] = RecordBatch(self.HEADER)
+        batch.append(record)
+        self._buffered += 1
+
+    def write(self, record):
+        with self._lock, self.metrics.timer('export_write'):
+            self._file.write(json.dumps(record.to_dict(), ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._buffer(record)
+            self.rows_written += 1
+            if self._buffered >= self.row_group_size:
+                self._flush()
+
+    def _partition_dir(self, channel):
+        safe = re.sub(r'[\\/:*?"<>|=]', '_', channel) or '_'
+        return os.path.join(self.filename, f"channel={safe}", f"scrape_date={self.scrape_date}")
+
+    def _flush(self):
+        self._batches += 1
+        for channel, batch in self._buffers.items():
+            table = batch.to_arrow(self._schema)
+            part_dir = self._partition_dir(channel)
+            os.makedirs(part_dir, exist_ok=True)
+            if not self._append and part_dir not in self._touched:
+                # Chạy mới: thay dữ liệu cũ của cùng kênh trong ngày
+                for name in os.listdir(part_dir):
+                    if name.startswith('part-'):
+                        os.remove(os.path.join(part_dir, name))
+            self._touched.add(part_dir)
+            path = os.path.join(part_dir, f"part-{self._run_id}-{self._batches:05d}.parquet")
+            with self.metrics.timer('export_flush'):
+                self._pq.write_table(table, path + '.tmp', row_group_size=self.row_group_size)
+                os.replace(path + '.tmp', path)
+            self.metrics.inc('output_bytes', os.path.getsize(path))
+        self._buffers = {}
+        self._buffered = 0
+        # Mọi bản ghi đã nằm trong file Parquet: xóa file tạm
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            if self._buffered:
+                self._flush()
+            self._file.close()
+            self._file = None
+            if os.path.exists(self._pending_path):
+                os.remove(self._pending_path)
+
+    def export(self, data):
+        if not data:
+            print("Không có dữ liệu để xuất.")
+            return
+        try:
+            with self.metrics.timer('export'):
+                self.open()
+                for it in data:
+                    self.write(it)
+                self.close()
+            print(f"Thành công! Dữ liệu đã được lưu vào dataset Parquet: {self.filename}")
+        except Exception as e:
+            print(f"Lỗi khi ghi Parquet: {e}")
+
+class CrawlCheckpoint:
+    """Nhật ký tiến độ (JSON lines) để chạy lại thì tiếp tục từ kênh/video chưa xong."""
+
+    def __init__(self, path, fsync_every=50):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.channels_done = set()
+        self.videos_done = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self.resumed = os.path.exists(path)
+        if self.resumed:
+            self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Dòng cuối có thể bị cắt dở khi chương trình dừng đột ngột
+                    continue
+                if 'video' in event:
+                    self.videos_done.setdefault(event['channel'], set()).add(event['video'])
+                else:
+                    self.channels_done.add(event['channel'])
+
+    def _append(self, event):
+        with self._lock:
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._events += 1
+            if self._events % self.fsync_every == 0:
+                os.fsync(self._file.fileno())
+
+    def is_channel_done(self, channel):
+        return channel in self.channels_done
+
+    def is_video_done(self, channel, url):
+        return url in self.videos_done.get(channel, set())
+
+    def pending_videos(self, channel, vids):
+        done = self.videos_done.get(channel, set())
+        if done:
+            print(f"  Bỏ qua {len(done)} video đã có trong checkpoint.")
+        return [info for info in vids if info['url'] not in done]
+
+    def mark_video(self, channel, url):
+        with self._lock:
+            self.videos_done.setdefault(channel, set()).add(url)
+        self._append({'channel': channel, 'video': url})
+
+    def mark_channel(self, channel):
+        with self._lock:
+            self.channels_done.add(channel)
+        self._append({'channel': channel, 'done': True})
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    def clear(self):
+        # Chạy xong toàn bộ: xóa checkpoint để lần sau bắt đầu lại từ đầu
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+COOKIE_FILE = 'tiktok_cookie.pkl'
+DATA_DIR    = './data'
+
+def scraper_options_from_env(workers=1, run_name='crawl'):
+    """Tùy chọn TikTokScraper/TikTokScraperPool đọc từ biến môi trường SCRAPER_*."""
+    options = {
+        'page_timeout':        float(os.getenv('SCRAPER_PAGE_TIMEOUT', '15')),
+        'scroll_idle_timeout': float(os.getenv('SCRAPER_SCROLL_IDLE', '4')),
+        'fetch_backend':       os.getenv('SCRAPER_FETCH', 'selenium'),
+        'http_concurrency':    int(os.getenv('SCRAPER_HTTP_CONCURRENCY', '8')),
+        'lean':                os.getenv('SCRAPER_LEAN') == '1',
+        'page_stats':          os.getenv('SCRAPER_PAGE_STATS') == '1',
+        'profile_only':        os.getenv('SCRAPER_PROFILE_ONLY') == '1',
+        'base_url':            os.getenv('SCRAPER_BASE_URL', 'https://www.tiktok.com'),
+        'metrics':             Metrics(run_name),
+        'profile_dir':         os.getenv('SCRAPER_PROFILE_DIR'),
+        'max_retries':         int(os.getenv('SCRAPER_MAX_RETRIES', '2')),
+        'max_videos':          int(os.getenv('SCRAPER_MAX_VIDEOS', '0')),
+        'since_date':          os.getenv('SCRAPER_SINCE_DATE'),
+        'trim_harvested':      os.getenv('SCRAPER_TRIM_DOM') == '1',
+        'archive_html':        os.getenv('SCRAPER_ARCHIVE_HTML') == '1',
+    }
+    options['controller'] = AdaptiveController(
+        max_concurrency=controller_slots(workers, options['fetch_backend'], options['http_concurrency']),
+        start_interval=float(os.getenv('SCRAPER_START_INTERVAL', '0.5')),
+        min_interval=float(os.getenv('SCRAPER_MIN_INTERVAL', '0')),
+        cooldown=float(os.getenv('SCRAPER_THROTTLE_COOLDOWN', '30')),
+        metrics=options['metrics']
+    )
+    # Crawl tăng dần: chỉ bật khi đặt SCRAPER_STATE_TTL_HOURS
+    state_ttl = os.getenv('SCRAPER_STATE_TTL_HOURS')
+    if state_ttl:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        options['state_store'] = CrawlStateStore(
+            os.path.join(DATA_DIR, 'crawl_state.db'), ttl_seconds=float(state_ttl) * 3600
+        )
+    # Lịch sử số liệu theo thời gian: chỉ bật khi đặt SNAPSHOT_DB (dùng chung với csv_to_ggsheet.py)
+    snapshot_db = os.getenv('SNAPSHOT_DB')
+    if snapshot_db:
+        from snapshot_store import SnapshotStore
+        options['snapshots'] = SnapshotStore(snapshot_db)
+    # Kho trang thô nén zstd: chỉ bật khi đặt SCRAPER_ARCHIVE_DIR
+    archive_dir = os.getenv('SCRAPER_ARCHIVE_DIR')
+    if archive_dir:
+        from page_archive import PageArchive
+        options['archive'] = PageArchive(archive_dir)
+    return options
+
+def load_valid_cookies(cookie_file=COOKIE_FILE):
+    # Kiểm tra cookie ngay từ đầu thay vì để phiên hết hạn làm hỏng giữa chừng
+    cookie_store = CookieStore(
+        cookie_file, required=[c for c in os.getenv('COOKIE_REQUIRED', 'sessionid').split(',') if c]
+    )
+    cookies = cookie_store.load()
+    if not cookies or not cookie_store.validate():
+        return None
+    return cookies
+
 def main():
-    COOKIE_FILE = 'tiktok_cookie.pkl'
-    DATA_DIR    = './data'
+    WORKERS     = int(os.getenv('SCRAPER_WORKERS', '1'))
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    # Dây chuyền: SCRAPER_LISTERS trình duyệt liệt kê kênh, SCRAPER_WORKERS trình duyệt mở video
+    PIPELINE    = os.getenv('SCRAPER_PIPELINE') == '1'
+    LISTERS     = int(os.getenv('SCRAPER_LISTERS', '1'))
 
     # Tạo thư mục lưu trữ nếu chưa tồn tại
     if not os.path.exists(DATA_DIR):
@@ -261,25 +1386,246 @@ def main():
     # Sinh tên file CSV: tiktok_<channel1>_<channel2>.csv trong ./data
     safe_names   = [c.replace('@', '').replace(' ', '_') for c in channels]
     csv_filename = os.path.join(DATA_DIR, f"tiktok_{'_'.join(safe_names)}.csv")
+    OUTPUT_FORMAT = os.getenv('SCRAPER_OUTPUT', 'csv')
+    if OUTPUT_FORMAT == 'parquet':
+        # Dataset Parquet dùng chung cho mọi lần chạy, phân vùng theo kênh/ngày
+        csv_filename = os.path.join(DATA_DIR, 'tiktok_parquet')
 
-    cookies = load_cookies_from_file(COOKIE_FILE)
+    cookies = load_valid_cookies()
     if not cookies:
         return
+    SCRAPER_OPTIONS = scraper_options_from_env(WORKERS + LISTERS if PIPELINE else WORKERS)
 
-    scraper = TikTokScraper(cookies)
+    if PIPELINE:
+        print(f"Chạy dây chuyền: {LISTERS} trình duyệt liệt kê kênh, {WORKERS} trình duyệt mở video.")
+        scraper = TikTokPipeline(
+            cookies, listers=LISTERS, extractors=WORKERS,
+            queue_size=int(os.getenv('SCRAPER_QUEUE_SIZE', '200')), **SCRAPER_OPTIONS
+        )
+    elif WORKERS > 1:
+        # Chế độ pool: mỗi worker tự mở trình duyệt và nạp cookie
+        print(f"Chạy song song với {WORKERS} trình duyệt.")
+        scraper = TikTokScraperPool(cookies, workers=WORKERS, **SCRAPER_OPTIONS)
+    else:
+        scraper = TikTokScraper(cookies, **SCRAPER_OPTIONS)
+    # Mỗi video được ghi ngay vào CSV; checkpoint cho phép chạy lại tiếp từ chỗ dừng
+    checkpoint = CrawlCheckpoint(os.path.join(DATA_DIR, f"tiktok_{'_'.join(safe_names)}.csv.checkpoint"))
+    if checkpoint.resumed:
+        print(f"Tiếp tục từ checkpoint: {len(checkpoint.channels_done)} kênh đã xong.")
+    exporter_cls = ParquetExporter if OUTPUT_FORMAT == 'parquet' else CSVExporter
+    metrics = SCRAPER_OPTIONS['metrics']
+    exporter = exporter_cls(csv_filename, metrics=metrics).open(append=checkpoint.resumed)
+    print(f"Xuất dữ liệu ra file: {csv_filename}")
+    progress = ProgressLine(metrics).start() if os.getenv('SCRAPER_PROGRESS') == '1' else None
+    uploader = None
     try:
-        scraper.set_cookies()
-        scraped_data = scraper.scrape_channels(channels)
-        if scraped_data:
-            print(f"Xuất dữ liệu ra file: {csv_filename}")
-            CSVExporter(csv_filename).export(scraped_data)
+        if isinstance(scraper, TikTokPipeline):
+            if os.getenv('SCRAPER_SHEETS_SYNC') == '1':
+                # Đẩy lên Google Sheets theo lô ngay trong lúc crawl (cấu hình như csv_to_ggsheet.py)
+                from csv_to_ggsheet import IncrementalSheetsUploader
+                uploader = IncrementalSheetsUploader(
+                    metrics=metrics,
+                    batch_rows=int(os.getenv('SHEETS_BATCH_ROWS', '500')),
+                    flush_seconds=float(os.getenv('SHEETS_FLUSH_SECONDS', '30'))
+                ).start()
+            scraper.scrape_channels(channels, sink=exporter, checkpoint=checkpoint, uploader=uploader)
+        else:
+            if isinstance(scraper, TikTokScraper):
+                scraper.set_cookies()
+            scraper.scrape_channels(channels, sink=exporter, checkpoint=checkpoint)
+        exporter.close()
+        checkpoint.clear()
+        if exporter.rows_written:
+            print(f"Thành công! Đã ghi {exporter.rows_written} video vào: {csv_filename}")
         else:
             print("Không thu thập được dữ liệu video nào.")
     except Exception as e:
         print(f"Lỗi khi chạy script: {e}")
     finally:
-        scraper.quit()
+        exporter.close()
+        checkpoint.close()
+        if uploader is not None:
+            uploader.close()
+        if isinstance(scraper, TikTokScraper):
+            scraper.quit()
+        if progress is not None:
+            progress.stop()
+        if SCRAPER_OPTIONS.get('snapshots') is not None:
+            print(SCRAPER_OPTIONS['snapshots'].summary())
+            SCRAPER_OPTIONS['snapshots'].close()
+        print(metrics.report())
+        if METRICS_DIR:
+            print(f"Đã lưu thống kê: {metrics.save(METRICS_DIR)}")
         print("Kết thúc chương trình.")
 
+def run_worker(queue_path, shard_dir, worker_id=None, lease_seconds=600, poll_interval=10, wait=False):
+    """Worker phân tán: nhận từng kênh từ CrawlQueue, ghi vào file shard riêng của worker.
+
+    Dừng khi hàng đợi hết việc (không còn job pending/leased), trừ khi wait=True.
+    """
+    worker_id = worker_id or default_worker_id()
+    cookies = load_valid_cookies()
+    if not cookies:
+        return
+    safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', worker_id)
+    options = scraper_options_from_env(1, run_name='worker')
+    options['profile_name'] = safe_id  # nhiều worker trên cùng máy không dùng chung profile Chrome
+    metrics = options['metrics']
+    queue_ = CrawlQueue(queue_path, lease_seconds=lease_seconds)
+    os.makedirs(shard_dir, exist_ok=True)
+    shard = os.path.join(shard_dir, f"shard-{safe_id}.csv")
+    exporter = CSVExporter(shard, metrics=metrics).open(append=True)
+    print(f"Worker {worker_id}: hàng đợi {queue_path}, ghi vào {shard}")
+    scraper = TikTokScraper(cookies, **options)
+    channel = None
+    try:
+        scraper.set_cookies()
+        while True:
+            channel = queue_.claim(worker_id)
+            if channel is None:
+                stats = queue_.stats()
+                if not wait and stats['pending'] == 0 and stats['leased'] == 0:
+                    print(f"Hàng đợi đã hết việc: {stats}")
+                    break
+                time.sleep(poll_interval)
+                continue
+            before, failures = exporter.rows_written, metrics.total('failures')
+            with LeaseKeeper(queue_, channel, worker_id) as keeper:
+                try:
+                    scraper.scrape_channels([channel], sink=exporter)
+                except Exception as e:
+                    queue_.fail(channel, worker_id, e)
+                    channel = None
+                    continue
+            rows = exporter.rows_written - before
+            if keeper.lost.is_set():
+                # Kênh đã được giao lại; dữ liệu trùng sẽ bị loại khi gộp shard
+                channel = None
+                continue
+            # Kênh tải được nhưng không có video (hoặc bị max_videos/since_date loại hết) vẫn là xong;
+            # chỉ báo lỗi khi không có dòng nào và có lỗi khi liệt kê kênh/tải video
+            if rows or metrics.total('failures') == failures:
+                queue_.complete(channel, worker_id, rows)
+                print(f"Xong kênh {channel}: {rows} video. Hàng đợi: {queue_.stats()}")
+            else:
+                queue_.fail(channel, worker_id, "không thu thập được video nào")
+            channel = None
+    except KeyboardInterrupt:
+        print("Dừng worker theo yêu cầu.")
+    finally:
+        if channel is not None:
+            queue_.release(channel, worker_id)
+        exporter.close()
+        scraper.quit()
+        queue_.close()
+        if options.get('snapshots') is not None:
+            options['snapshots'].close()
+        print(metrics.report())
+        if os.getenv('METRICS_DIR'):
+            print(f"Đã lưu thống kê: {metrics.save(os.getenv('METRICS_DIR'))}")
+
+def consolidate_shards(shard_dir, output):
+    """Gộp các file shard thành một CSV, mỗi URL video giữ bản ghi mới nhất."""
+    shards = sorted(glob.glob(os.path.join(shard_dir, 'shard-*.csv')), key=os.path.getmtime)
+    if not shards:
+        print(f"Không có file shard nào trong {shard_dir}.")
+        return 0
+    url_idx = CSVExporter.HEADER.index("URL Video")
+    rows, total = {}, 0
+    for path in shards:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            if next(reader, None) != CSVExporter.HEADER:
+                print(f"Bỏ qua {path}: tiêu đề không khớp.")
+                continue
+            for row in reader:
+                total += 1
+                # Xóa rồi thêm lại để thứ tự theo lần xuất hiện cuối cùng
+                rows.pop(row[url_idx], None)
+                rows[row[url_idx]] = row
+    tmp = output + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSVExporter.HEADER)
+        writer.writerows(rows.values())
+    os.replace(tmp, output)
+    print(f"Đã gộp {len(shards)} shard ({total} dòng) thành {len(rows)} video: {output}")
+    return len(rows)
+
+def replay_archive(archive_dir, output, workers=None, include_all=False):
+    """Trích xuất lại mọi trang trong kho (không trình duyệt, không mạng) và ghi ra CSV."""
+    from page_archive import replay
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    rows = failed = 0
+    start = time.monotonic()
+    with CSVExporter(output).open() as exporter:
+        for records, bad in replay(archive_dir, workers=workers, latest_only=not include_all):
+            for record in records:
+                exporter.write(record)
+            rows += len(records)
+            failed += bad
+    print(f"Replay xong {rows} bản ghi ({failed} trang lỗi) trong {time.monotonic() - start:.1f}s -> '{output}'.")
+    return rows
+
+def _read_channel_file(path):
+    # Mỗi dòng một kênh (hoặc nhiều kênh cách nhau bởi dấu phẩy); '#' là chú thích
+    channels = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            channels.extend(c.strip() for c in line.split(',') if c.strip())
+    return channels
+
+def cli(argv):
+    parser = argparse.ArgumentParser(description="Crawl TikTok phân tán qua hàng đợi dùng chung.")
+    parser.add_argument('--queue', default=os.path.join(DATA_DIR, 'crawl_queue.db'), help="file SQLite của hàng đợi")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('enqueue', help="thêm kênh từ file vào hàng đợi")
+    p.add_argument('file', help="file danh sách kênh")
+    p.add_argument('--requeue', action='store_true', help="chạy lại cả kênh đã xong/lỗi")
+
+    p = sub.add_parser('worker', help="nhận và cào kênh từ hàng đợi")
+    p.add_argument('--shard-dir', default=os.path.join(DATA_DIR, 'shards'))
+    p.add_argument('--worker-id', default=None)
+    p.add_argument('--lease', type=float, default=600, help="thời hạn lease (giây)")
+    p.add_argument('--poll', type=float, default=10, help="giây chờ khi chưa có việc")
+    p.add_argument('--wait', action='store_true', help="không thoát khi hàng đợi trống")
+
+    p = sub.add_parser('consolidate', help="gộp các shard thành một CSV cho csv_to_ggsheet.py")
+    p.add_argument('--shard-dir', default=os.path.join(DATA_DIR, 'shards'))
+    p.add_argument('--output', default=os.path.join(DATA_DIR, 'tiktok_consolidated.csv'))
+
+    sub.add_parser('status', help="số job theo trạng thái")
+
+    p = sub.add_parser('replay', help="trích xuất lại từ kho trang đã lưu, không cần trình duyệt")
+    p.add_argument('--archive', default=os.getenv('SCRAPER_ARCHIVE_DIR', os.path.join(DATA_DIR, 'page_archive')))
+    p.add_argument('--output', default=os.path.join(DATA_DIR, 'tiktok_replay.csv'))
+    p.add_argument('--workers', type=int, default=None, help="số tiến trình (mặc định: số CPU)")
+    p.add_argument('--all', action='store_true', help="đọc mọi lần tải thay vì chỉ bản mới nhất mỗi URL")
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.queue)), exist_ok=True)
+    if args.command == 'enqueue':
+        queue_ = CrawlQueue(args.queue)
+        added = queue_.enqueue(_read_channel_file(args.file), requeue=args.requeue)
+        print(f"Đã thêm/đặt lại {added} kênh. Hàng đợi: {queue_.stats()}")
+        queue_.close()
+    elif args.command == 'worker':
+        run_worker(args.queue, args.shard_dir, args.worker_id, args.lease, args.poll, args.wait)
+    elif args.command == 'consolidate':
+        consolidate_shards(args.shard_dir, args.output)
+    elif args.command == 'status':
+        queue_ = CrawlQueue(args.queue)
+        print(f"Hàng đợi: {queue_.stats()}")
+        for channel, attempts, error in queue_.failed_jobs():
+            print(f"  Lỗi: {channel} ({attempts} lần): {error}")
+        queue_.close()
+    elif args.command == 'replay':
+        replay_archive(args.archive, args.output, args.workers, args.all)
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        main()
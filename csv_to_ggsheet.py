@@ -1,55 +1,69 @@
+import glob
 import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 import tkinter as tk
 from tkinter import filedialog
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from typing import List, Optional
-
-class ColumnConfig:
-    """Cấu hình cột và kiểu dữ liệu."""
-    COLUMNS = [
-        'Kênh', 'Author', 'Followers', 'Text', 'Likes', 'Shares', 'Comments',
-        'Collects', 'Duration(s)', 'Ngày tạo kênh', 'Ngày đăng', 'Hashtags',
-        'URL Video', 'Views', 'followerCount', 'isAd'
-    ]
-    DTYPES = {
-        'Kênh': str,
-        'Author': str,
-        'Followers': int,
-        'Text': str,
-        'Likes': int,
-        'Shares': int,
-        'Comments': int,
-        'Collects': int,
-        'Duration(s)': int,
-        'Ngày tạo kênh': str,
-        'Ngày đăng': str,
-        'Hashtags': str,
-        'URL Video': str,
-        'Views': int,
-        'followerCount': str,
-        'isAd': str
-    }
+from typing import Iterator, List, Optional
+
+from column_config import ColumnConfig
+from metrics import Metrics
+from sheets_sync import SheetsApiError, SheetsUpsertSync
+from video_record import RecordBatch
 
 class CsvToGoogleSheetsApp:
+    # Kích thước khối khi đọc CSV lớn: theo byte với pyarrow, theo dòng khi phải đọc lại không ép kiểu
+    CSV_BLOCK_BYTES = 64 * 2**20
+    FALLBACK_CHUNK_ROWS = 200_000
+
     def __init__(
         self,
         credentials_file: str = './credentials.json',
         spreadsheet_id: Optional[str] = None,
-        sheet_name: Optional[str] = None
+        sheet_name: Optional[str] = None,
+        scrape_date_from: Optional[str] = None
     ):
         self._credentials_file = credentials_file
         self._spreadsheet_id = spreadsheet_id or os.getenv(
             'SPREADSHEET_ID', '17cnmrpZLq5f5nAzg_L9zC6ivpaG2CohavSDwC-PBLX8'
         )
         self._sheet_name = sheet_name or os.getenv('SHEET_NAME', 'tiktok_tháng7')
+        # Chỉ đọc các phân vùng scrape_date >= giá trị này (YYYY-MM-DD) của dataset Parquet
+        self._scrape_date_from = scrape_date_from or os.getenv('SCRAPE_DATE_FROM')
         self._scopes = [
             'https://www.googleapis.com/auth/spreadsheets',
             'https://www.googleapis.com/auth/drive'
         ]
+        # 'upsert' (mặc định): chỉ gửi dòng mới/thay đổi; 'replace': xóa sheet và ghi lại toàn bộ
+        self._sync_mode = os.getenv('SHEETS_SYNC_MODE', 'upsert')
+        self._sync_workers = int(os.getenv('SHEETS_SYNC_WORKERS', '4'))
+        self._api_root = os.getenv('SHEETS_API_ROOT')
+        # Gộp file: số luồng đọc song song, file lớn hơn ngưỡng thì đọc theo từng khối
+        self._read_workers = int(os.getenv('MERGE_WORKERS', str(min(8, os.cpu_count() or 1))))
+        self._stream_bytes = int(os.getenv('MERGE_STREAM_MB', '256')) * 2**20
+        self._compact_rows = int(os.getenv('MERGE_COMPACT_ROWS', '1000000'))
+        # Có SNAPSHOT_DB: đẩy các bảng tổng hợp nhỏ (xu hướng video/kênh, top tăng view) thay cho dòng thô;
+        # SHEETS_PUSH_ROWS=1 để đẩy cả dòng thô như trước
+        self._snapshot_db = os.getenv('SNAPSHOT_DB')
+        self._push_rows = not self._snapshot_db or os.getenv('SHEETS_PUSH_ROWS') == '1'
+        self._trend_days = int(os.getenv('TREND_DAYS', '90'))
+        self._top_movers = int(os.getenv('TOP_MOVERS', '50'))
+        self._creds = None
         self._service = None
+        self.metrics = Metrics('csv_to_ggsheet')
+        self._metrics_dir = os.getenv('METRICS_DIR')
 
     @property
     def service(self):
@@ -61,10 +75,10 @@ class CsvToGoogleSheetsApp:
     def _init_service(self) -> None:
         """Khởi tạo Google Sheets API service."""
         try:
-            creds = Credentials.from_service_account_file(
+            self._creds = Credentials.from_service_account_file(
                 self._credentials_file, scopes=self._scopes
             )
-            self._service = build('sheets', 'v4', credentials=creds)
+            self._service = build('sheets', 'v4', credentials=self._creds)
         except FileNotFoundError:
             raise FileNotFoundError(f"Không tìm thấy file credentials: {self._credentials_file}")
         except Exception as e:
@@ -77,7 +91,7 @@ class CsvToGoogleSheetsApp:
             root.withdraw()
             file_paths = filedialog.askopenfilenames(
                 title='Chọn các file CSV để gộp',
-                filetypes=[('CSV files', '*.csv')]
+                filetypes=[('CSV files', '*.csv'), ('Parquet files', '*.parquet')]
             )
             return list(file_paths)
         except Exception as e:
@@ -90,60 +104,238 @@ class CsvToGoogleSheetsApp:
             return value.replace('"', "'").replace('\n', ' ').replace('\r', ' ')
         return value
 
+    def _resolve_inputs(self, inputs: List[str]) -> List[str]:
+        """Mở rộng thư mục/glob thành danh sách file CSV/Parquet.
+
+        Thư mục có file CSV thì lấy các file *.csv bên trong; thư mục không có CSV
+        được coi là một dataset Parquet.
+        """
+        paths = []
+        for item in inputs:
+            if any(ch in item for ch in '*?['):
+                paths.extend(sorted(glob.glob(item, recursive=True)))
+            elif os.path.isdir(item):
+                csv_files = sorted(glob.glob(os.path.join(item, '*.csv')))
+                paths.extend(csv_files or [item])
+            else:
+                paths.append(item)
+        return paths
+
+    def _read_parquet(self, path: str) -> pd.DataFrame:
+        """Đọc file/dataset Parquet, chỉ lấy các cột và phân vùng cần dùng."""
+        if not os.path.isdir(path):
+            return pd.read_parquet(path, columns=ColumnConfig.COLUMNS)
+        filters = None
+        if self._scrape_date_from:
+            filters = [('scrape_date', '>=', self._scrape_date_from)]
+        df = pd.read_parquet(path, columns=ColumnConfig.COLUMNS + ['scrape_date'], filters=filters)
+        # Sắp theo ngày cào để khi loại trùng giữ lại bản mới nhất
+        df = df.sort_values('scrape_date', kind='stable').drop(columns='scrape_date')
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def _csv_convert_options(fp: str):
+        header = pd.read_csv(fp, nrows=0).columns
+        types = {
+            col: pa.int64() if ColumnConfig.dtype_of(col) is int else pa.string()
+            for col in header
+        }
+        return pa_csv.ConvertOptions(column_types=types, strings_can_be_null=True)
+
+    @staticmethod
+    def _arrow_to_pandas(table) -> pd.DataFrame:
+        return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+    def _iter_csv_frames(self, fp: str) -> Iterator[pd.DataFrame]:
+        """Đọc CSV bằng pyarrow theo kiểu của ColumnConfig; file lớn được đọc theo từng khối."""
+        options = self._csv_convert_options(fp)
+        # Cột Text có thể xuống dòng trong ô; thiếu tùy chọn này pyarrow lệch khối khi đọc theo luồng
+        parse = pa_csv.ParseOptions(newlines_in_values=True)
+        done = 0  # số dòng đã trả ra
+        try:
+            if os.path.getsize(fp) <= self._stream_bytes:
+                yield self._arrow_to_pandas(pa_csv.read_csv(fp, parse_options=parse, convert_options=options))
+                return
+            reader = pa_csv.open_csv(
+                fp, parse_options=parse, convert_options=options,
+                read_options=pa_csv.ReadOptions(block_size=self.CSV_BLOCK_BYTES)
+            )
+            for batch in reader:
+                done += batch.num_rows
+                yield self._arrow_to_pandas(pa.Table.from_batches([batch]))
+        except pa.ArrowInvalid as e:
+            # Dữ liệu không khớp kiểu (vd. chữ trong cột số): đọc tiếp phần còn lại không ép kiểu,
+            # bỏ qua các dòng đã trả ra để không trùng dòng; file lớn vẫn đọc theo khối
+            print(f"Không đọc được '{fp}' theo kiểu cố định từ dòng {done + 1} ({e}); đọc tiếp không ép kiểu.")
+            rest = pd.read_csv(fp, skiprows=range(1, done + 1), chunksize=self.FALLBACK_CHUNK_ROWS)
+            for df in rest:
+                yield df
+
+    def _load_file(self, fp: str):
+        """Đọc một đầu vào; file nhỏ được đọc hết trong luồng, file lớn trả về iterator."""
+        if os.path.isfile(fp):
+            self.metrics.inc('bytes_read', os.path.getsize(fp))
+        if fp.endswith('.parquet') or os.path.isdir(fp):
+            return [self._read_parquet(fp)]
+        if os.path.getsize(fp) > self._stream_bytes:
+            return self._iter_csv_frames(fp)
+        return list(self._iter_csv_frames(fp))
+
+    @staticmethod
+    def _drop_duplicate_videos(df: pd.DataFrame) -> pd.DataFrame:
+        """Loại video trùng theo 'URL Video', giữ dòng xuất hiện sau cùng (bản mới nhất)."""
+        if 'URL Video' not in df.columns:
+            return df
+        key = df['URL Video']
+        dup = key.notna() & key.duplicated(keep='last')
+        return df[~dup].reset_index(drop=True)
+
     def _read_and_merge_csv(self, file_paths: List[str]) -> pd.DataFrame:
-        """Đọc và gộp các file CSV."""
-        dfs = []
-        for fp in file_paths:
-            try:
-                df = pd.read_csv(fp)
-                dfs.append(df)
-            except Exception as e:
-                print(f"Lỗi khi đọc '{fp}': {e}")
-        
-        if not dfs:
+        """Đọc song song và gộp các file CSV/Parquet, loại video trùng (giữ lần cào mới nhất).
+
+        File được gộp theo thứ tự thời gian sửa đổi để "sau cùng" là "mới nhất".
+        Bộ nhớ được giới hạn: tối đa `_read_workers` file đọc trước, và phần đã gộp
+        được nén (loại trùng) mỗi khi vượt `_compact_rows` dòng.
+        """
+        file_paths = sorted(file_paths, key=lambda fp: os.path.getmtime(fp) if os.path.exists(fp) else 0)
+        merged, pending, pending_rows, total_rows = None, [], 0, 0
+
+        def compact():
+            nonlocal merged, pending, pending_rows
+            frames = ([merged] if merged is not None else []) + pending
+            merged = self._drop_duplicate_videos(pd.concat(frames, ignore_index=True))
+            pending, pending_rows = [], 0
+
+        with ThreadPoolExecutor(max_workers=max(1, self._read_workers)) as pool:
+            window = max(1, self._read_workers)
+            futures = [pool.submit(self._load_file, fp) for fp in file_paths[:window]]
+            for idx, fp in enumerate(file_paths):
+                try:
+                    frames = futures[idx].result()
+                    for df in frames:
+                        pending.append(df)
+                        pending_rows += len(df)
+                        total_rows += len(df)
+                        if pending_rows >= self._compact_rows:
+                            compact()
+                    self.metrics.inc('files_read')
+                except Exception as e:
+                    print(f"Lỗi khi đọc '{fp}': {e}")
+                    self.metrics.inc('failures', phase='read')
+                futures[idx] = None
+                if idx + window < len(file_paths):
+                    futures.append(pool.submit(self._load_file, file_paths[idx + window]))
+
+        if merged is None and not pending:
             print("Không có file CSV nào được đọc.")
             return pd.DataFrame()
-        
-        # Gộp DataFrame
-        merged = pd.concat(dfs, ignore_index=True)
-        
-        # Thêm các cột thiếu
-        for col in ColumnConfig.COLUMNS:
-            if col not in merged.columns:
-                merged[col] = None
-        
-        return merged
+        compact()
+        self.metrics.inc('rows_read', total_rows)
+        self.metrics.inc('rows_duplicate', total_rows - len(merged))
+        print(f"Đã đọc {total_rows} dòng, loại {total_rows - len(merged)} dòng video trùng.")
+
+        # Đúng bộ cột và thứ tự cố định của sheet (thêm cột thiếu, bỏ cột lạ), dù file nào được đọc trước
+        return merged.reindex(columns=ColumnConfig.COLUMNS)
+
+    # Bảng thay ký tự tương đương _clean_value, dùng với str.translate
+    _CLEAN_TABLE = str.maketrans({'"': "'", '\n': ' ', '\r': ' '})
+
+    @classmethod
+    def _clean_series(cls, s: pd.Series) -> pd.Series:
+        """Chuyển cột sang chuỗi đã làm sạch, ô trống/'nan' thành 'NULL'.
+
+        Tương đương astype(str) + _clean_value nhưng mỗi giá trị khác nhau chỉ
+        được xử lý một lần.
+        """
+        codes, uniques = pd.factorize(s)
+        text = pd.Series(uniques).astype(str).replace("nan", "NULL").to_numpy(dtype=object)
+        # Tìm giá trị cần sửa bằng pyarrow (C++), chỉ các giá trị đó mới đi qua Python
+        dirty = pc.match_substring_regex(pa.array(text, type=pa.string()), '["\n\r]')
+        for i in np.flatnonzero(dirty.to_numpy(zero_copy_only=False)):
+            text[i] = text[i].translate(cls._CLEAN_TABLE)
+        # Mã -1 (ô trống) trỏ tới phần tử cuối là "NULL"
+        text = np.append(text, "NULL")
+        return pd.Series(text[codes], index=s.index, name=s.name)
+
+    @staticmethod
+    def _to_int_series(s: pd.Series) -> pd.Series:
+        """Ép cột sang Int64 (nullable); ném ValueError nếu có giá trị mà int() của cách cũ không nhận.
+
+        Giống hệt cách cũ (apply int(x) từng ô): chuỗi phải là số nguyên đúng cú pháp
+        của int() ("12", " +5 ", "1_000"); chuỗi "1.0"/"1.5"/"1e3" là lỗi và cả cột
+        thành NULL; số thực (không phải chuỗi) bị cắt phần lẻ như int(1.5) == 1.
+        """
+        missing = s.isna()
+        numeric = pd.to_numeric(s, errors='coerce')
+        if s.dtype == object:
+            # Ô "NULL" sẵn có được cách cũ giữ nguyên như ô trống
+            missing |= s.eq("NULL")
+            is_text = s.map(type).eq(str) & ~missing
+            if is_text.any():
+                text = s[is_text]
+                ok = text.str.fullmatch(r'\s*[+-]?\d+(?:_\d+)*\s*')
+                numeric = numeric.copy()
+                numeric[is_text] = pd.to_numeric(text.str.replace('_', '', regex=False), errors='coerce')
+                numeric[is_text & ~ok.reindex(s.index, fill_value=True)] = np.nan
+        invalid = numeric.isna() & ~missing
+        if invalid.any():
+            raise ValueError(f"giá trị không phải số nguyên: {s[invalid].iloc[0]!r}")
+        if numeric.dtype.kind == 'f':
+            numeric = np.trunc(numeric)
+        return numeric.astype('Int64')
 
     def _cast_and_handle_null(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Ép kiểu dữ liệu và thay giá trị trống bằng 'NULL'."""
-        # Thay NaN/None bằng "NULL"
-        df = df.fillna("NULL")
-        
-        # Ép kiểu dữ liệu
+        """Ép kiểu dữ liệu theo ColumnConfig (vector hóa, giữ ô trống là NA).
+
+        Cột số dùng Int64, cột chuỗi được làm sạch và chuyển 'nan' thành 'NULL',
+        cột trong CATEGORY_COLUMNS dùng category. Gọi _fill_null trước khi xuất
+        để có đúng dạng dữ liệu gửi lên Sheets.
+        """
+        df = df.copy()
         for col, dtype in ColumnConfig.DTYPES.items():
             try:
                 if dtype == str:
-                    df[col] = df[col].astype(str).replace("nan", "NULL")
-                    df[col] = df[col].apply(self._clean_value)
+                    s = self._clean_series(df[col])
+                    if col in ColumnConfig.CATEGORY_COLUMNS:
+                        s = s.astype('category')
+                    df[col] = s
                 elif dtype == int:
-                    df[col] = df[col].apply(lambda x: int(x) if x != "NULL" else "NULL")
+                    df[col] = self._to_int_series(df[col])
             except Exception as e:
                 print(f"Lỗi khi ép kiểu cột {col}: {e}")
-                df[col] = "NULL"
-        
+                df[col] = pd.Series(pd.NA, index=df.index, dtype='Int64' if dtype == int else object)
+
         return df
 
-    def _create_sheet_if_not_exists(self) -> None:
+    @staticmethod
+    def _fill_null(df: pd.DataFrame) -> pd.DataFrame:
+        """Chuyển DataFrame đã ép kiểu sang giá trị gửi lên Sheets, ô trống thành 'NULL'.
+
+        Đổi từng cột để không tạo hai bản sao object của cả bảng; cột số không có ô
+        trống giữ dạng int64 như kết quả của cách ép kiểu cũ.
+        """
+        out = {}
+        for col in df.columns:
+            s = df[col]
+            missing = s.isna()
+            if isinstance(s.dtype, pd.Int64Dtype) and not missing.any():
+                out[col] = s.astype('int64')
+            else:
+                out[col] = s.astype(object).where(~missing, "NULL")
+        return pd.DataFrame(out, index=df.index)
+
+    def _create_sheet_if_not_exists(self, sheet_name: Optional[str] = None) -> None:
         """Tạo sheet mới nếu chưa tồn tại."""
+        sheet_name = sheet_name or self._sheet_name
         try:
             sheet_metadata = self.service.spreadsheets().get(spreadsheetId=self._spreadsheet_id).execute()
             sheets = [sheet['properties']['title'] for sheet in sheet_metadata.get('sheets', [])]
-            if self._sheet_name not in sheets:
+            if sheet_name not in sheets:
                 body = {
                     'requests': [{
                         'addSheet': {
                             'properties': {
-                                'title': self._sheet_name
+                                'title': sheet_name
                             }
                         }
                     }]
@@ -152,60 +344,222 @@ class CsvToGoogleSheetsApp:
                     spreadsheetId=self._spreadsheet_id,
                     body=body
                 ).execute()
-                print(f"Tạo sheet mới: {self._sheet_name}")
+                print(f"Tạo sheet mới: {sheet_name}")
         except HttpError as err:
             print(f"Lỗi khi kiểm tra/tạo sheet: {err}")
 
+    def _make_syncer(self) -> SheetsUpsertSync:
+        """Tạo sheet nếu cần và trả về bộ upsert theo 'URL Video'."""
+        self._create_sheet_if_not_exists()
+        return SheetsUpsertSync(
+            AuthorizedSession(self._creds),
+            self._spreadsheet_id,
+            self._sheet_name,
+            max_workers=self._sync_workers,
+            api_root=self._api_root,
+            metrics=self.metrics
+        )
+
+    def _sync_to_google_sheets(self, df: pd.DataFrame) -> None:
+        """Upsert dữ liệu lên Google Sheets theo 'URL Video'."""
+        if df.empty:
+            print("Không có dữ liệu để xuất lên Google Sheets.")
+            return
+
+        syncer = self._make_syncer()
+        try:
+            stats = syncer.sync(df)
+            for action, count in stats.items():
+                self.metrics.inc('records', count, action=action)
+            print(
+                f"Đồng bộ xong: {stats['updated']} dòng cập nhật, {stats['appended']} dòng mới, "
+                f"{stats['unchanged']} dòng không đổi."
+            )
+            print(f"Thành công: dữ liệu đã được lưu vào https://docs.google.com/spreadsheets/d/{self._spreadsheet_id}")
+        except SheetsApiError as err:
+            print(f"Lỗi API Google Sheets: {err}")
+
     def _export_to_google_sheets(self, df: pd.DataFrame) -> None:
         """Xuất dữ liệu lên Google Sheets."""
         if df.empty:
             print("Không có dữ liệu để xuất lên Google Sheets.")
             return
-        
-        self._create_sheet_if_not_exists()
+
+        if self._sync_mode == 'upsert':
+            self._sync_to_google_sheets(df)
+            return
+        if self._replace_sheet(df, self._sheet_name):
+            print(f"Thành công: dữ liệu đã được lưu vào https://docs.google.com/spreadsheets/d/{self._spreadsheet_id}")
+
+    def _replace_sheet(self, df: pd.DataFrame, sheet_name: str) -> bool:
+        """Xóa sheet rồi ghi lại toàn bộ DataFrame; trả về True nếu thành công."""
+        self._create_sheet_if_not_exists(sheet_name)
         sheet = self.service.spreadsheets()
         values = [df.columns.tolist()] + df.values.tolist()
         body = {'values': values}
-        
+
         try:
             sheet.values().clear(
                 spreadsheetId=self._spreadsheet_id,
-                range=self._sheet_name
+                range=sheet_name
             ).execute()
             sheet.values().update(
                 spreadsheetId=self._spreadsheet_id,
-                range=f"{self._sheet_name}!A1",
+                range=f"{sheet_name}!A1",
                 valueInputOption='RAW',
                 body=body
             ).execute()
-            print(f"Thành công: dữ liệu đã được lưu vào https://docs.google.com/spreadsheets/d/{self._spreadsheet_id}")
+            self.metrics.inc('records', len(df), action='replaced')
+            return True
         except HttpError as err:
+            self.metrics.inc('failures', phase='sheets')
             print(f"Lỗi API Google Sheets: {err}")
             print("Dữ liệu gửi đi (5 dòng đầu):", values[:5])
         except Exception as e:
             print(f"Lỗi không xác định khi xuất dữ liệu: {e}")
+        return False
+
+    def _aggregate_tables(self) -> dict:
+        """Các bảng tổng hợp từ SnapshotStore: tên -> DataFrame."""
+        from snapshot_store import SnapshotStore
+        store = SnapshotStore(self._snapshot_db)
+        try:
+            print(store.summary())
+            tables = {
+                'video_trends': store.video_trends(),
+                'channel_daily': store.channel_daily(self._trend_days),
+                'top_movers': store.top_movers(self._top_movers),
+            }
+        finally:
+            store.close()
+        # convert_dtypes: cột số giữ kiểu số nguyên (Int64) dù có ô trống
+        return {
+            name: pd.DataFrame.from_records(rows, columns=columns).convert_dtypes()
+            for name, (columns, rows) in tables.items()
+        }
 
-    def run(self) -> None:
-        """Chạy ứng dụng."""
-        csv_paths = self._select_csv_files()
+    def _push_aggregates(self) -> None:
+        """Ghi đè mỗi bảng tổng hợp vào sheet <SHEET_NAME>_<bảng>; kích thước không tăng theo lịch sử."""
+        with self.metrics.timer('aggregate'):
+            tables = self._aggregate_tables()
+        for name, df in tables.items():
+            sheet_name = f"{self._sheet_name}_{name}"
+            with self.metrics.timer('upload', mode='aggregate', table=name):
+                if self._replace_sheet(self._fill_null(df), sheet_name):
+                    print(f"Đã cập nhật bảng {sheet_name}: {len(df)} dòng.")
+
+    def run(self, inputs: Optional[List[str]] = None) -> None:
+        """Chạy ứng dụng; `inputs` là file/thư mục/glob, bỏ trống thì mở hộp thoại chọn file."""
+        if self._snapshot_db:
+            self._push_aggregates()
+            if not self._push_rows:
+                print(self.metrics.report())
+                if self._metrics_dir:
+                    print(f"Đã lưu thống kê: {self.metrics.save(self._metrics_dir)}")
+                return
+        csv_paths = self._resolve_inputs(inputs) if inputs else self._select_csv_files()
         if not csv_paths:
             print("Bạn chưa chọn file CSV nào.")
             return
         
-        df = self._read_and_merge_csv(csv_paths)
+        with self.metrics.timer('read_merge'):
+            df = self._read_and_merge_csv(csv_paths)
         if df.empty:
             return
         
-        df = self._cast_and_handle_null(df)
+        with self.metrics.timer('cast'):
+            df = self._cast_and_handle_null(df)
         print(f"Gộp {len(csv_paths)} file thành DataFrame với {len(df)} dòng.")
         print("Các kiểu dữ liệu:\n", df.dtypes)
         print("Mẫu dữ liệu đầu tiên:\n", df.head())
         
-        self._export_to_google_sheets(df)
+        with self.metrics.timer('upload', mode=self._sync_mode):
+            self._export_to_google_sheets(self._fill_null(df))
+        print(self.metrics.report())
+        if self._metrics_dir:
+            print(f"Đã lưu thống kê: {self.metrics.save(self._metrics_dir)}")
+
+class IncrementalSheetsUploader:
+    """Đẩy bản ghi lên Google Sheets theo lô ngay trong lúc crawl (upsert theo 'URL Video').
+
+    `write` chỉ đưa dòng vào hàng đợi có giới hạn `max_pending`; một thread nền
+    gom đủ `batch_rows` dòng (hoặc sau `flush_seconds` giây) rồi ép kiểu như
+    CsvToGoogleSheetsApp và upsert. Hàng đợi đầy thì `write` phải chờ (backpressure).
+    Lô được gom dạng cột (RecordBatch) từ VideoRecord, không qua dòng CSV trung gian.
+    """
+
+    _STOP = object()
+
+    def __init__(self, app: Optional[CsvToGoogleSheetsApp] = None, batch_rows: int = 500,
+                 flush_seconds: float = 30.0, max_pending: int = 5000, metrics: Optional[Metrics] = None):
+        self._app = app or CsvToGoogleSheetsApp()
+        if metrics is not None:
+            self._app.metrics = metrics
+        self._batch_rows = max(1, batch_rows)
+        self._flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._syncer = None
+        self.rows_uploaded = 0
+
+    def start(self) -> 'IncrementalSheetsUploader':
+        self._syncer = self._app._make_syncer()
+        try:
+            # Đọc chỉ mục khóa -> dòng một lần; các lô sau chỉ cập nhật chỉ mục, không đọc lại sheet
+            self._syncer.load_index()
+        except SheetsApiError as err:
+            print(f"Chưa đọc được sheet ({err}); sẽ thử lại ở lô đầu tiên.")
+        self._thread.start()
+        return self
+
+    def write(self, record) -> None:
+        self._queue.put(record)
+
+    def _upload(self, batch: RecordBatch) -> None:
+        # to_pandas đã cho ô rỗng là NA như khi đọc lại từ CSV, để lần đồng bộ sau không thấy khác
+        df = self._app._fill_null(self._app._cast_and_handle_null(batch.to_pandas()))
+        try:
+            with self._app.metrics.timer('upload', mode='incremental'):
+                stats = self._syncer.sync(df)
+        except SheetsApiError as err:
+            print(f"Lỗi API Google Sheets (bỏ qua lô {len(batch)} dòng, dữ liệu vẫn có trong file): {err}")
+            return
+        self.rows_uploaded += stats['updated'] + stats['appended']
+        for action, count in stats.items():
+            self._app.metrics.inc('sheet_rows', count, action=action)
+
+    def _loop(self) -> None:
+        # Cùng bộ cột với đường gộp file để hai cách tải lên dùng chung một tiêu đề sheet
+        batch, deadline, stop = RecordBatch(ColumnConfig.COLUMNS), None, False
+        while not stop:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            if record is self._STOP:
+                stop = True
+            elif record is not None:
+                if not batch:
+                    deadline = time.monotonic() + self._flush_seconds
+                batch.append(record)
+            if batch and (stop or record is None or len(batch) >= self._batch_rows):
+                try:
+                    self._upload(batch)
+                except Exception as e:
+                    print(f"Lỗi khi đẩy lô lên Google Sheets: {e}")
+                batch.clear()
+
+    def close(self) -> None:
+        """Gửi nốt các dòng còn lại và chờ thread nền kết thúc."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+            print(f"Đã đẩy {self.rows_uploaded} dòng lên Google Sheets trong lúc crawl.")
 
 if __name__ == '__main__':
     try:
         app = CsvToGoogleSheetsApp()
-        app.run()
+        app.run(sys.argv[1:] or None)
     except Exception as e:
         print(f"Lỗi khi chạy ứng dụng: {e}")
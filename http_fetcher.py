@@ -0,0 +1,108 @@
+"""Tải trang chi tiết video qua HTTP (không cần Chrome) bằng asyncio + aiohttp."""
+import asyncio
+import time
+
+import aiohttp
+
+from hydration import block_reason, parse_video_html
+
+DEFAULT_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    ),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
+}
+
+
+class AsyncVideoFetcher:
+    """Tải nhiều trang video song song qua một connection pool dùng chung.
+
+    Cookie lấy từ file do save_cookie.py tạo (danh sách dict của Selenium).
+    Số request đồng thời bị giới hạn bởi `concurrency`. Có `archive` (PageArchive)
+    thì HTML tải về được lưu lại để replay. Có `controller` (AdaptiveController)
+    thì mỗi request giữ một lượt của controller (chờ nhịp và thời gian tạm dừng) và
+    báo lại kết quả: HTTP 429 hoặc trang captcha/xác minh được tính là bị chặn.
+    """
+
+    def __init__(self, cookies, concurrency=8, timeout=30, headers=None, archive=None, controller=None):
+        self.cookies = cookies or []
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.archive = archive
+        self.controller = controller
+
+    def _cookie_header(self):
+        return '; '.join(f"{c['name']}={c['value']}" for c in self.cookies if 'name' in c)
+
+    async def _fetch_one(self, session, semaphore, channel_name, video_info):
+        async with semaphore:
+            if self.controller is None:
+                record, _, _ = await self._load(session, channel_name, video_info)
+                return record
+            # acquire chặn theo threading.Condition nên chờ trong thread riêng, không chặn event loop
+            await asyncio.to_thread(self.controller.acquire)
+            outcome, latency = 'error', None
+            try:
+                record, outcome, latency = await self._load(session, channel_name, video_info)
+                return record
+            finally:
+                self.controller.release(outcome, latency)
+
+    async def _load(self, session, channel_name, video_info):
+        """Trả về (bản ghi hoặc None, 'ok'/'error'/'throttled', độ trễ tải trang)."""
+        # Mọi lỗi của một URL (mạng, charset hỏng, JSON lạ) chỉ làm URL đó trả về None
+        # để trình duyệt xử lý lại, không làm hỏng cả lô trong asyncio.gather
+        start = time.monotonic()
+        try:
+            async with session.get(video_info['url']) as resp:
+                if resp.status != 200:
+                    print(f"  HTTP {resp.status}: {video_info['url']}")
+                    return None, 'throttled' if resp.status == 429 else 'error', None
+                html = await resp.text()
+        except Exception as e:
+            print(f"  Lỗi HTTP {video_info['url']}: {e!r}")
+            return None, 'error', None
+        latency = time.monotonic() - start
+        if self.archive is not None:
+            try:
+                self.archive.put(video_info['url'], html, 'html', channel_name, video_info)
+            except Exception as e:
+                print(f"  Lỗi lưu trang vào kho: {e}")
+        try:
+            record = parse_video_html(html, video_info)
+        except Exception as e:
+            print(f"  Lỗi đọc JSON video {video_info['url']}: {e!r}")
+            return None, 'error', None
+        if record is None:
+            reason = block_reason(html)
+            if reason:
+                print(f"  Bị chặn ({reason}): {video_info['url']}")
+                return None, 'throttled', None
+            print(f"  Không tìm thấy JSON video trong trang: {video_info['url']}")
+            return None, 'error', None
+        record.channel = channel_name
+        return record, 'ok', latency
+
+    async def fetch_all(self, items):
+        """Tải danh sách (channel_name, video_info); kết quả giữ nguyên thứ tự, None nếu lỗi."""
+        headers = dict(self.headers)
+        cookie_header = self._cookie_header()
+        if cookie_header:
+            headers['Cookie'] = cookie_header
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            cookie_jar=aiohttp.DummyCookieJar()
+        ) as session:
+            return await asyncio.gather(*(
+                self._fetch_one(session, semaphore, name, info) for name, info in items
+            ))
+
+    def fetch(self, items):
+        return asyncio.run(self.fetch_all(list(items)))
@@ -0,0 +1,275 @@
+"""Đọc dữ liệu video từ JSON rehydration mà TikTok nhúng sẵn trong trang."""
+import json
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+
+from video_record import VideoRecord
+
+HYDRATION_SCRIPT_IDS = ['__UNIVERSAL_DATA_FOR_REHYDRATION__', 'SIGI_STATE']
+
+_SCRIPT_RE = re.compile(
+    r'<script[^>]*id="(__UNIVERSAL_DATA_FOR_REHYDRATION__|SIGI_STATE)"[^>]*>(.*?)</script>',
+    re.S
+)
+
+# Chạy trong trình duyệt: chỉ trả về phần JSON cần thiết thay vì cả page_source
+EXTRACT_JS = """
+var ids = arguments[0];
+for (var i = 0; i < ids.length; i++) {
+    var el = document.getElementById(ids[i]);
+    if (!el) { continue; }
+    try {
+        var data = JSON.parse(el.textContent);
+        if (data.__DEFAULT_SCOPE__) {
+            return JSON.stringify({__DEFAULT_SCOPE__: {
+                'webapp.video-detail': data.__DEFAULT_SCOPE__['webapp.video-detail']
+            }});
+        }
+        return JSON.stringify({ItemModule: data.ItemModule, UserModule: data.UserModule});
+    } catch (e) {}
+}
+return null;
+"""
+
+
+def parse_count(text):
+    """Đọc số hiển thị trên giao diện TikTok: '1.2K' -> 1200, '3M' -> 3000000."""
+    text = text.upper().strip()
+    if 'K' in text:
+        return int(float(text.replace('K', '')) * 1_000)
+    if 'M' in text:
+        return int(float(text.replace('M', '')) * 1_000_000)
+    if 'T' in text:
+        return int(float(text.replace('T', '')) * 1_000_000_000)
+    return int(text.replace(',', '').strip())
+
+
+def parse_duration(duration_str):
+    parts = duration_str.split(':')
+    if len(parts) == 2:
+        return int(parts[-1]) + int(parts[-2]) * 60
+    return int(parts[-1])
+
+
+def convert_timestamp_to_date(timestamp):
+    if not timestamp or timestamp == 0:
+        return ""
+    try:
+        return datetime.fromtimestamp(int(timestamp)).strftime('%d/%m/%Y')
+    except (ValueError, TypeError, OverflowError, OSError):
+        return ""
+
+
+def video_id_timestamp(url_or_id):
+    """Thời điểm đăng (unix) nằm trong 32 bit cao của id video; 0 nếu không đọc được."""
+    match = re.search(r'(\d{15,})', str(url_or_id))
+    return int(match.group(1)) >> 32 if match else 0
+
+
+# Dấu hiệu trang bị chặn trong HTML thô, cùng các lý do với TikTokScraper._BLOCK_JS
+_BLOCK_MARKERS = (
+    ('captcha', ('captcha-verify-container', 'captcha_verify_container', 'tiktok-verify-ele')),
+    ('rate_limit', ('too many requests', 'rate limit')),
+    ('verify', ('verify to continue', 'xác minh để tiếp tục')),
+)
+
+
+def block_reason(html):
+    """Trả về 'captcha', 'rate_limit' hoặc 'verify' nếu HTML là trang chặn/xác minh, ngược lại None."""
+    text = (html or '').lower()
+    for reason, markers in _BLOCK_MARKERS:
+        if any(marker in text for marker in markers):
+            return reason
+    return None
+
+
+def extract_payload_from_html(html):
+    """Tách JSON rehydration từ HTML thô; trả về None nếu không có."""
+    if not html:
+        return None
+    for match in _SCRIPT_RE.finditer(html):
+        try:
+            return json.loads(match.group(2))
+        except ValueError:
+            continue
+    return None
+
+
+def find_item_struct(payload):
+    """Tìm itemStruct của video trong payload (dạng mới hoặc SIGI_STATE cũ)."""
+    if not isinstance(payload, dict):
+        return None
+    scope = payload.get('__DEFAULT_SCOPE__')
+    if isinstance(scope, dict):
+        detail = scope.get('webapp.video-detail') or {}
+        item = (detail.get('itemInfo') or {}).get('itemStruct')
+        if item:
+            return item
+    items = payload.get('ItemModule')
+    if isinstance(items, dict) and items:
+        return next(iter(items.values()))
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _bool_text(item, key):
+    if key not in item:
+        return ""
+    return "true" if item[key] else "false"
+
+
+def _create_times(node, out):
+    # Tương đương regex "createTime" cũ nhưng duyệt trên JSON đã parse
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == 'createTime':
+                ts = _to_int(value)
+                if ts:
+                    out.append(ts)
+            else:
+                _create_times(value, out)
+    elif isinstance(node, list):
+        for value in node:
+            _create_times(value, out)
+    return out
+
+
+def record_from_item(item, video_info=None, payload=None):
+    """Dựng VideoRecord từ itemStruct."""
+    video_info = video_info or {}
+    author = item.get('author') or {}
+    if isinstance(author, str):
+        author = {'uniqueId': author}
+    stats = item.get('stats') or {}
+    author_stats = item.get('authorStats') or {}
+    video = item.get('video') or {}
+
+    url = video_info.get('url') or (
+        f"https://www.tiktok.com/@{author.get('uniqueId', '')}/video/{item.get('id', '')}"
+    )
+    hashtags = [t['hashtagName'] for t in item.get('textExtra') or [] if t.get('hashtagName')]
+    if not hashtags:
+        hashtags = [c['title'] for c in item.get('challenges') or [] if c.get('title')]
+
+    ts_list = sorted(_create_times(payload if payload is not None else item, []))
+    return VideoRecord(
+        webVideoUrl=url,
+        playCount=_to_int(stats.get('playCount', video_info.get('playCount', 0))),
+        followers=_to_int(author_stats.get('followerCount', video_info.get('followers', 0))),
+        heartCount=_to_int(author_stats.get('heartCount', video_info.get('heartCount', 0))),
+        videoCount=_to_int(author_stats.get('videoCount', video_info.get('videoCount', 0))),
+        author=author.get('uniqueId', ''),
+        text=(item.get('desc') or '').strip(),
+        diggCount=_to_int(stats.get('diggCount')),
+        shareCount=_to_int(stats.get('shareCount')),
+        commentCount=_to_int(stats.get('commentCount')),
+        collectCount=_to_int(stats.get('collectCount')),
+        duration=_to_int(video.get('duration')),
+        channelCreated=convert_timestamp_to_date(ts_list[0]) if ts_list else "",
+        postedDate=convert_timestamp_to_date(item.get('createTime')),
+        hashtags=hashtags,
+        isAd=_bool_text(item, 'isAd'),
+        isADVirtual=_bool_text(item, 'isADVirtual'),
+    )
+
+
+def parse_video_payload(payload, video_info=None):
+    """Trả về bản ghi video từ payload JSON, hoặc None nếu không tìm thấy video."""
+    item = find_item_struct(payload)
+    if not item:
+        return None
+    return record_from_item(item, video_info, payload)
+
+
+def parse_video_html(html, video_info=None):
+    """Trả về bản ghi video từ HTML thô của trang video."""
+    return parse_video_payload(extract_payload_from_html(html), video_info)
+
+
+class _DomText(HTMLParser):
+    """Gom text của các phần tử có data-e2e (và ô thời lượng) từ HTML tĩnh, không cần trình duyệt."""
+
+    _VOID = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts = {}
+        self._stack = []
+        self._tags = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._VOID:
+            return
+        attrs = dict(attrs)
+        keys = []
+        if attrs.get('data-e2e'):
+            keys.append(attrs['data-e2e'])
+        if 'DivSeekBarTimeContainer' in (attrs.get('class') or ''):
+            keys.append('seek-bar-time')
+        if tag == 'strong' and any('browse-video-desc' in k for _, ks in self._stack for k in ks):
+            self._tags += 1
+            keys.append(f'hashtag:{self._tags:05d}')
+        self._stack.append((tag, keys))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+
+    def handle_data(self, data):
+        for _, keys in self._stack:
+            for key in keys:
+                self.texts.setdefault(key, []).append(data)
+
+    def text(self, key):
+        return ' '.join(''.join(self.texts.get(key, [])).split())
+
+
+def parse_video_dom(html, video_info=None):
+    """Đọc bản ghi từ HTML theo data-e2e như _extract_video_details_dom; None nếu không phải trang video."""
+    video_info = video_info or {}
+    dom = _DomText()
+    dom.feed(html or '')
+    if 'browse-username' not in dom.texts:
+        return None
+
+    def count(key):
+        try:
+            return parse_count(dom.text(key))
+        except ValueError:
+            return 0
+
+    try:
+        duration = parse_duration(dom.text('seek-bar-time').split('/')[-1].strip())
+    except ValueError:
+        duration = 0
+    ts_list = sorted(int(x) for x in re.findall(r'"createTime":\s*"(\d+)"', html) if int(x) != 0)
+    m1 = re.search(r'"isAd":(true|false)', html)
+    m2 = re.search(r'"isADVirtual":(true|false)', html)
+    return VideoRecord(
+        webVideoUrl=video_info.get('url', ''),
+        playCount=video_info.get('playCount', 0),
+        followers=video_info.get('followers', 0),
+        heartCount=video_info.get('heartCount', 0),
+        videoCount=video_info.get('videoCount', 0),
+        author=dom.text('browse-username'),
+        text=dom.text('browse-video-desc'),
+        diggCount=count('like-count'),
+        shareCount=count('share-count'),
+        commentCount=count('comment-count'),
+        collectCount=count('undefined-count'),
+        duration=duration,
+        channelCreated=convert_timestamp_to_date(ts_list[0]) if ts_list else "",
+        postedDate=convert_timestamp_to_date(ts_list[-1]) if ts_list else "",
+        hashtags=[dom.text(k).strip('# ') for k in sorted(dom.texts) if k.startswith('hashtag:')],
+        isAd=m1.group(1) if m1 else "",
+        isADVirtual=m2.group(1) if m2 else "",
+    )
@@ -0,0 +1,205 @@
+"""Đo thời gian và đếm theo giai đoạn/kênh cho toàn bộ pipeline, xuất JSON và Prometheus."""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _prom_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _prom_labels(key):
+    if not key:
+        return ''
+    parts = []
+    for k, v in key:
+        v = v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{_prom_name(k)}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+    """Counter và timer có nhãn (vd. phase, channel); an toàn khi nhiều worker dùng chung.
+
+    Timer chỉ giữ count/tổng/max nên bộ nhớ không tăng theo số lần đo.
+    """
+
+    def __init__(self, run_name='crawl', namespace='tiktok'):
+        self.run_name = run_name
+        self.namespace = namespace
+        self.started_at = datetime.now()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            stat = self._timers.get(key)
+            if stat is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] = max(stat[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def total(self, name):
+        """Tổng một counter trên mọi nhãn."""
+        with self._lock:
+            return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def elapsed(self):
+        return time.monotonic() - self._start
+
+    def summary(self):
+        with self._lock:
+            counters = [
+                {'name': n, 'labels': dict(k), 'value': v}
+                for (n, k), v in sorted(self._counters.items())
+            ]
+            timers = [
+                {'name': n, 'labels': dict(k), 'count': c, 'total_s': round(t, 4),
+                 'avg_s': round(t / c, 4), 'max_s': round(m, 4)}
+                for (n, k), (c, t, m) in sorted(self._timers.items())
+            ]
+        return {
+            'run': self.run_name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'elapsed_s': round(self.elapsed(), 3),
+            'counters': counters,
+            'timers': timers,
+        }
+
+    def to_prometheus(self):
+        """Định dạng text exposition của Prometheus (counter *_total, timer dạng summary)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = sorted(self._timers.items())
+        seen = set()
+        for (name, key), value in counters:
+            metric = f"{self.namespace}_{_prom_name(name)}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_prom_labels(key)} {value}")
+        # Mỗi họ metric phải nằm liền nhau: summary (count/sum) rồi mới tới gauge _max
+        by_name = {}
+        for (name, key), stat in timers:
+            by_name.setdefault(name, []).append((key, stat))
+        for name, series in by_name.items():
+            metric = f"{self.namespace}_{_prom_name(name)}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for key, (count, total, _) in series:
+                lines.append(f"{metric}_count{_prom_labels(key)} {count}")
+                lines.append(f"{metric}_sum{_prom_labels(key)} {total:.6f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            for key, (_, _, peak) in series:
+                lines.append(f"{metric}_max{_prom_labels(key)} {peak:.6f}")
+        metric = f"{self.namespace}_run_elapsed_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f'{metric}{{run="{self.run_name}"}} {self.elapsed():.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        """Tóm tắt ngắn theo từng timer/counter (gộp mọi nhãn) để in ra cuối lần chạy."""
+        timers, counters = {}, {}
+        with self._lock:
+            for (name, _), (count, total, peak) in self._timers.items():
+                stat = timers.setdefault(name, [0, 0.0, 0.0])
+                stat[0] += count
+                stat[1] += total
+                stat[2] = max(stat[2], peak)
+            for (name, _), value in self._counters.items():
+                counters[name] = counters.get(name, 0) + value
+        lines = [f"Thống kê ({self.run_name}, {self.elapsed():.1f}s):"]
+        for name, (count, total, peak) in sorted(timers.items(), key=lambda t: -t[1][1]):
+            lines.append(f"  {name:<16} {count:>6} lần  tổng {total:8.2f}s  "
+                         f"tb {total / count:6.3f}s  max {peak:6.2f}s")
+        for name, value in sorted(counters.items()):
+            lines.append(f"  {name:<16} {value}")
+        return '\n'.join(lines)
+
+    def save(self, directory):
+        """Ghi <run>-<thời gian>.json và .prom vào `directory`; trả về đường dẫn file JSON."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.run_name}-{self.started_at:%Y%m%d-%H%M%S}")
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        with open(base + '.prom', 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        return base + '.json'
+
+
+class ProgressLine:
+    """Dòng tiến độ cập nhật tại chỗ: số bản ghi, tốc độ và ETA.
+
+    `done` và `total` là tên counter trong Metrics; total tăng dần khi từng kênh
+    được liệt kê nên ETA chỉ tính trên phần việc đã biết.
+    """
+
+    def __init__(self, metrics, done='records', total='videos_listed', interval=1.0, stream=None):
+        self.metrics = metrics
+        self.done = done
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self._stop = threading.Event()
+        self._thread = None
+
+    def render(self):
+        done = self.metrics.total(self.done)
+        total = self.metrics.total(self.total)
+        elapsed = self.metrics.elapsed()
+        rate = done / elapsed if elapsed else 0.0
+        line = f"[{done}/{total} video | {rate:.2f} video/s"
+        if rate and total > done:
+            eta = int((total - done) / rate)
+            line += f" | ETA {eta // 60:02d}:{eta % 60:02d}"
+        return line + "]"
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.stream.write('\r' + self.render())
+            self.stream.flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.stream.write('\r' + self.render() + '\n')
+            self.stream.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,160 @@
+"""Kho lưu trang đã tải (HTML/JSON), nén zstd, định địa chỉ theo nội dung, kèm chỉ mục SQLite.
+
+Dùng để đọc lại (replay) toàn bộ trang bằng code trích xuất mới mà không cần
+trình duyệt hay mạng, và làm dữ liệu mẫu cho việc kiểm thử bộ đọc.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from hydration import parse_video_dom, parse_video_html, parse_video_payload
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Cần cài 'zstandard' để dùng kho trang (pip install zstandard).")
+    return zstandard
+
+
+class PageArchive:
+    """<root>/objects/<2 ký tự>/<sha256>.zst và <root>/index.db (url, thời điểm tải, digest).
+
+    Nội dung giống nhau chỉ lưu một lần. An toàn khi nhiều worker dùng chung.
+    """
+
+    def __init__(self, root='./data/page_archive', level=10):
+        self.root = root
+        self.level = level
+        self._objects = os.path.join(root, 'objects')
+        os.makedirs(self._objects, exist_ok=True)
+        self._lock = threading.Lock()
+        self._compressor = None
+        self._conn = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                id         INTEGER PRIMARY KEY,
+                url        TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                kind       TEXT NOT NULL,
+                digest     TEXT NOT NULL,
+                size       INTEGER,
+                channel    TEXT,
+                video_info TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at)")
+        self._conn.commit()
+
+    def _path(self, digest):
+        return os.path.join(self._objects, digest[:2], digest + '.zst')
+
+    def put(self, url, content, kind='html', channel='', video_info=None):
+        """Lưu nội dung trang (kind: 'html' hoặc 'json'); trả về digest sha256."""
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                if self._compressor is None:
+                    self._compressor = _zstd().ZstdCompressor(level=self.level)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(self._compressor.compress(data))
+                os.replace(tmp, path)
+            self._conn.execute(
+                "INSERT INTO pages (url, fetched_at, kind, digest, size, channel, video_info) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, time.time(), kind, digest, len(data), channel,
+                 json.dumps(video_info or {}, ensure_ascii=False))
+            )
+            self._conn.commit()
+        return digest
+
+    def get(self, digest):
+        with open(self._path(digest), 'rb') as f:
+            return _zstd().ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+    def pages(self, latest_only=True, since=None):
+        """Danh sách dict các trang trong chỉ mục; latest_only: mỗi URL chỉ lấy lần tải mới nhất."""
+        query = "SELECT url, fetched_at, kind, digest, channel, video_info FROM pages"
+        params = []
+        if since is not None:
+            query += " WHERE fetched_at >= ?"
+            params.append(since)
+        if latest_only:
+            query = (f"SELECT url, MAX(fetched_at), kind, digest, channel, video_info "
+                     f"FROM ({query}) GROUP BY url")
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY 2", params).fetchall()
+        return [
+            {'url': url, 'fetched_at': fetched_at, 'kind': kind, 'digest': digest,
+             'channel': channel, 'video_info': json.loads(video_info or '{}')}
+            for url, fetched_at, kind, digest, channel, video_info in rows
+        ]
+
+    def stats(self):
+        with self._lock:
+            pages, urls, raw = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        stored = 0
+        for dirpath, _, files in os.walk(self._objects):
+            stored += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files if f.endswith('.zst'))
+        return {'pages': pages, 'urls': urls, 'raw_bytes': raw, 'stored_bytes': stored}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def extract_record(kind, content, video_info=None):
+    """Chạy lại bước trích xuất trên nội dung đã lưu; None nếu không đọc được."""
+    if kind == 'json':
+        return parse_video_payload(json.loads(content), video_info)
+    return parse_video_html(content, video_info) or parse_video_dom(content, video_info)
+
+
+def _replay_chunk(args):
+    # Chạy trong tiến trình con: mỗi tiến trình tự mở file blob, không dùng chung kết nối SQLite
+    root, pages = args
+    archive_objects = os.path.join(root, 'objects')
+    decompressor = _zstd().ZstdDecompressor()
+    records, failed = [], 0
+    for page in pages:
+        digest = page['digest']
+        try:
+            with open(os.path.join(archive_objects, digest[:2], digest + '.zst'), 'rb') as f:
+                content = decompressor.decompress(f.read()).decode('utf-8')
+            info = dict(page['video_info'], url=page['video_info'].get('url') or page['url'])
+            record = extract_record(page['kind'], content, info)
+        except Exception:
+            record = None
+        if record is None:
+            failed += 1
+            continue
+        record.channel = page['channel'] or record.author
+        records.append(record)
+    return records, failed
+
+
+def replay(root, workers=None, chunk_size=500, latest_only=True, since=None):
+    """Đọc lại mọi trang trong kho bằng nhiều tiến trình; sinh ra (danh sách bản ghi, số trang lỗi)."""
+    archive = PageArchive(root)
+    pages = archive.pages(latest_only=latest_only, since=since)
+    archive.close()
+    chunks = [(root, pages[i:i + chunk_size]) for i in range(0, len(pages), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield _replay_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_replay_chunk, chunks)
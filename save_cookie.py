@@ -1,5 +1,4 @@
 import os
-import pickle
 from time import sleep
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -7,6 +6,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from dotenv import load_dotenv
 from selenium.webdriver.common.keys import Keys
+from cookie_store import CookieStore
 
 # Tải các biến môi trường từ file .env
 dotenv_path = os.path.join(os.path.dirname(__file__), "information.env")
@@ -63,8 +63,10 @@ try:
 
     # Sau khi đăng nhập thành công, lưu lại cookie
     print("Đang lưu cookie vào file 'tiktok_cookie.pkl'...")
-    pickle.dump(browser.get_cookies(), open("tiktok_cookie.pkl", "wb"))
+    store = CookieStore("tiktok_cookie.pkl")
+    store.save(browser.get_cookies())
     print("=> Đã lưu cookie thành công!")
+    store.validate()
 
 except Exception as e:
     print(f"Đã xảy ra lỗi: {e}")
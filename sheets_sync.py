@@ -0,0 +1,294 @@
+"""Đồng bộ dữ liệu lên Google Sheets theo kiểu upsert: chỉ gửi dòng mới hoặc đã thay đổi."""
+import json
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import pandas as pd
+
+from metrics import Metrics
+
+
+class SheetsApiError(RuntimeError):
+    """Lỗi từ Sheets API sau khi đã thử lại hết số lần cho phép."""
+
+
+def column_letter(index: int) -> str:
+    """Chuyển chỉ số cột (bắt đầu từ 1) sang ký hiệu A1: 1 -> A, 27 -> AA."""
+    letters = ''
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _to_cell(value):
+    """Đưa giá trị về kiểu JSON thuần (bỏ kiểu numpy, NaN -> chuỗi rỗng)."""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if value is None or (isinstance(value, float) and value != value) or value is pd.NA:
+        return ''
+    return value
+
+
+def _normalize(value) -> str:
+    # So sánh theo chuỗi: Sheets trả 123 (số) cho ô mà ta gửi 123 hoặc "123"
+    value = _to_cell(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+_ROW_RE = re.compile(r'![A-Z]*(\d+)')
+
+
+class SheetsUpsertSync:
+    """Upsert một DataFrame vào một sheet, khóa theo cột `key_column`.
+
+    Chỉ đọc dòng tiêu đề và cột khóa để lập chỉ mục khóa -> số dòng; chỉ mục được
+    giữ lại và cập nhật sau mỗi lần ghi, nên các lần `sync` sau không đọc lại sheet.
+    Với dòng trùng khóa, chỉ các dòng đó được đọc để so sánh: không đổi thì bỏ qua,
+    khác thì ghi đè bằng values:batchUpdate; dòng mới thì values:append. Mỗi request
+    bị giới hạn số ô, các request batchUpdate chạy song song có giới hạn, lỗi 429/5xx
+    được thử lại với exponential backoff.
+    """
+
+    API_ROOT = 'https://sheets.googleapis.com/v4/spreadsheets'
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        session,
+        spreadsheet_id: str,
+        sheet_name: str,
+        key_column: str = 'URL Video',
+        max_cells_per_request: int = 40_000,
+        max_workers: int = 4,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_max: float = 64.0,
+        api_root: Optional[str] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        self._session = session
+        self._spreadsheet_id = spreadsheet_id
+        self._sheet_name = sheet_name
+        self._key_column = key_column
+        self._max_cells = max_cells_per_request
+        self._max_workers = max(1, max_workers)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._api_root = (api_root or self.API_ROOT).rstrip('/')
+        self._metrics = metrics or Metrics('sheets')
+        self._header = None
+        self._positions = {}
+
+    def _range(self, a1: str = '') -> str:
+        name = "'" + self._sheet_name.replace("'", "''") + "'"
+        return f"{name}!{a1}" if a1 else name
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        """Gửi request, thử lại với exponential backoff khi gặp 429/5xx hoặc lỗi mạng."""
+        url = f"{self._api_root}/{self._spreadsheet_id}{path}"
+        for attempt in range(self._max_retries + 1):
+            retry_after = None
+            try:
+                with self._metrics.timer('sheets_request', method=method):
+                    resp = self._session.request(method, url, **kwargs)
+            except OSError as e:
+                error = e
+            else:
+                if resp.status_code < 400:
+                    return resp.json() if resp.content else {}
+                if resp.status_code not in self.RETRY_STATUSES:
+                    self._metrics.inc('failures', phase='sheets')
+                    raise SheetsApiError(f"{method} {path}: HTTP {resp.status_code} {resp.text[:300]}")
+                error = f"HTTP {resp.status_code}"
+                retry_after = resp.headers.get('Retry-After')
+            if attempt == self._max_retries:
+                break
+            delay = min(self._backoff_base * 2 ** attempt, self._backoff_max)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            delay += random.uniform(0, self._backoff_base)
+            self._metrics.inc('retries', phase='sheets')
+            print(f"  Sheets API lỗi ({error}), thử lại sau {delay:.1f}s...")
+            time.sleep(delay)
+        self._metrics.inc('failures', phase='sheets')
+        raise SheetsApiError(f"{method} {path}: hết số lần thử lại ({error})")
+
+    def _get_values(self, a1: str) -> List[List]:
+        data = self._request(
+            'GET', f"/values/{quote(self._range(a1))}",
+            params={'valueRenderOption': 'UNFORMATTED_VALUE'}
+        )
+        return data.get('values', [])
+
+    def load_index(self) -> None:
+        """Đọc dòng tiêu đề và cột khóa (không đọc cả sheet) để lập chỉ mục khóa -> số dòng."""
+        header = self._get_values('1:1')
+        self._header = [str(c) for c in header[0]] if header else []
+        self._positions = {}
+        if self._key_column not in self._header:
+            return
+        letter = column_letter(self._header.index(self._key_column) + 1)
+        for offset, values in enumerate(self._get_values(f"{letter}2:{letter}"), start=2):
+            if values and values[0] != '':
+                self._positions[_normalize(values[0])] = offset
+
+    def _read_rows(self, row_numbers: List[int], width: int) -> Dict[int, List]:
+        """Đọc giá trị hiện tại của các dòng cần so sánh; dòng liền nhau gộp chung một range."""
+        last_col = column_letter(width)
+        blocks = []
+        for row_number in sorted(row_numbers):
+            if blocks and row_number == blocks[-1][1] + 1:
+                blocks[-1][1] = row_number
+            else:
+                blocks.append([row_number, row_number])
+        rows = {}
+        # Nhiều range trong một values:batchGet, giới hạn để URL không quá dài
+        for i in range(0, len(blocks), 100):
+            part = blocks[i:i + 100]
+            data = self._request(
+                'GET', '/values:batchGet',
+                params={'ranges': [self._range(f"A{a}:{last_col}{b}") for a, b in part],
+                        'valueRenderOption': 'UNFORMATTED_VALUE'}
+            )
+            for (start, end), value_range in zip(part, data.get('valueRanges', [])):
+                values = value_range.get('values', [])
+                for offset in range(end - start + 1):
+                    rows[start + offset] = values[offset] if offset < len(values) else []
+        return rows
+
+    def _chunks(self, rows: List, width: int) -> List[List]:
+        size = max(1, self._max_cells // max(1, width))
+        return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+    def _append(self, rows: List[List]) -> List[Optional[int]]:
+        """Thêm dòng vào cuối sheet; trả về số dòng trên sheet của từng dòng (None nếu không rõ)."""
+        positions = []
+        for chunk in self._chunks(rows, len(rows[0]) if rows else 1):
+            self._metrics.inc('sheet_cells', len(chunk) * len(chunk[0]), action='append')
+            data = self._request(
+                'POST', f"/values/{quote(self._range('A1'))}:append",
+                params={'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS'},
+                data=json.dumps({'values': chunk}),
+                headers={'Content-Type': 'application/json'}
+            )
+            match = _ROW_RE.search(data.get('updates', {}).get('updatedRange', ''))
+            start = int(match.group(1)) if match else None
+            positions.extend(start + i if start else None for i in range(len(chunk)))
+        return positions
+
+    def _batch_update(self, updates: List[tuple], width: int) -> None:
+        """Ghi đè các dòng (row_number, values); dòng liền nhau được gộp chung một range."""
+        last_col = column_letter(width)
+        ranges, start, block = [], None, []
+        for row_number, values in sorted(updates, key=lambda u: u[0]):
+            if block and row_number != start + len(block):
+                ranges.append((start, block))
+                block = []
+            if not block:
+                start = row_number
+            block.append(values)
+        if block:
+            ranges.append((start, block))
+
+        # Gom các range thành từng request không vượt quá giới hạn số ô
+        bodies, current, cells = [], [], 0
+        for start, block in ranges:
+            for part in self._chunks(block, width):
+                part_cells = len(part) * width
+                if current and cells + part_cells > self._max_cells:
+                    bodies.append(current)
+                    current, cells = [], 0
+                current.append({
+                    'range': self._range(f"A{start}:{last_col}{start + len(part) - 1}"),
+                    'values': part
+                })
+                cells += part_cells
+                start += len(part)
+        if current:
+            bodies.append(current)
+
+        self._metrics.inc('sheet_cells', len(updates) * width, action='update')
+
+        def send(data):
+            return self._request(
+                'POST', '/values:batchUpdate',
+                data=json.dumps({'valueInputOption': 'RAW', 'data': data}),
+                headers={'Content-Type': 'application/json'}
+            )
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            # list() để lỗi của từng request được ném ra ở đây
+            list(pool.map(send, bodies))
+
+    def sync(self, df: pd.DataFrame) -> Dict[str, int]:
+        """Upsert DataFrame lên sheet; trả về số dòng cập nhật/thêm mới/giữ nguyên."""
+        try:
+            return self._sync(df)
+        except Exception:
+            # Có thể đã ghi một phần: lần sau đọc lại chỉ mục
+            self._header = None
+            raise
+
+    def _sync(self, df: pd.DataFrame) -> Dict[str, int]:
+        header = [str(c) for c in df.columns]
+        width = len(header)
+        key_idx = header.index(self._key_column)
+        rows = [[_to_cell(v) for v in row] for row in df.itertuples(index=False, name=None)]
+
+        if self._header is None:
+            self.load_index()
+        if not self._header:
+            self._remember(header, [header] + rows, self._append([header] + rows), key_idx)
+            return {'updated': 0, 'appended': len(rows), 'unchanged': 0}
+        old_header = self._header
+        if old_header != header[:len(old_header)] and old_header[:width] != header:
+            raise SheetsApiError(
+                f"Tiêu đề sheet '{self._sheet_name}' khác với dữ liệu; hãy dùng chế độ ghi đè toàn bộ."
+            )
+        if len(old_header) < width:
+            # Dữ liệu có thêm cột mới ở cuối: mở rộng dòng tiêu đề, các dòng cũ được cập nhật dần
+            self._batch_update([(1, header)], width)
+            self._header = list(header)
+
+        # Khóa trùng trong dữ liệu mới: giữ dòng cuối cùng
+        updates, appends = {}, {}
+        for row in rows:
+            key = _normalize(row[key_idx])
+            row_number = self._positions.get(key)
+            if row_number is None:
+                appends[key] = row
+            else:
+                updates[row_number] = row
+
+        unchanged = 0
+        if updates:
+            current_rows = self._read_rows(list(updates), width)
+            for row_number, row in list(updates.items()):
+                current = list(current_rows.get(row_number, [])) + [''] * width
+                if [_normalize(v) for v in current[:width]] == [_normalize(v) for v in row]:
+                    del updates[row_number]
+                    unchanged += 1
+        if updates:
+            self._batch_update(list(updates.items()), width)
+        if appends:
+            self._remember(header, list(appends.values()), self._append(list(appends.values())), key_idx)
+        return {'updated': len(updates), 'appended': len(appends), 'unchanged': unchanged}
+
+    def _remember(self, header: List[str], rows: List[List], positions: List[Optional[int]], key_idx: int) -> None:
+        """Cập nhật chỉ mục sau khi thêm dòng, không cần đọc lại sheet."""
+        if any(p is None for p in positions):
+            self._header = None
+            return
+        for row, row_number in zip(rows, positions):
+            if row_number == 1:
+                self._header = list(header)
+                continue
+            self._positions[_normalize(row[key_idx])] = row_number
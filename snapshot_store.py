@@ -0,0 +1,353 @@
+"""Lịch sử số liệu video theo thời gian (chỉ ghi thêm) kèm bảng tổng hợp cho dashboard.
+
+Mỗi lần cào, số view/like/share/comment của video được ghi thành một snapshot có
+mốc thời gian. Các bảng tổng hợp theo ngày (video, kênh) và bảng mới nhất của
+từng video được cập nhật dần theo những video vừa ghi, nên dashboard chỉ cần đọc
+vài bảng nhỏ thay vì toàn bộ lịch sử.
+
+Nhập lịch sử từ các file CSV cũ: python snapshot_store.py <file.csv|thư mục> [--db ...] [--date YYYY-MM-DD]
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from hydration import video_id_timestamp
+from video_record import VideoRecord
+
+_VIDEO_ID_RE = re.compile(r'/video/(\d+)')
+
+# Số liệu cấp kênh: (thuộc tính VideoRecord, cột CSV)
+CHANNEL_FIELDS = (('followers', 'Followers'), ('heartCount', 'heartCount'), ('videoCount', 'videoCount'))
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+
+
+class SnapshotStore:
+    """Snapshot số liệu từng video (SQLite, khóa (video_id, ts), không rowid) và bảng tổng hợp.
+
+    - `video_daily`: số liệu cuối mỗi ngày của video và lượng view tăng so với ngày trước.
+    - `video_latest`: số liệu mới nhất, view tăng 1/7 ngày, tỉ lệ tương tác.
+    - `channel_daily`: tổng theo kênh mỗi ngày (follower, view, tương tác).
+    `add` chỉ đưa bản ghi vào bộ đệm; cứ `batch_size` bản ghi (và khi `flush`/`close`)
+    thì ghi snapshot và cập nhật bảng tổng hợp cho đúng các video/kênh vừa thay đổi.
+    An toàn khi nhiều worker dùng chung.
+    """
+
+    def __init__(self, db_path='./data/snapshots.db', batch_size=200):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id  INTEGER PRIMARY KEY,
+                channel   TEXT,
+                url       TEXT,
+                posted_at INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS videos_channel ON videos (channel);
+            CREATE TABLE IF NOT EXISTS snapshots (
+                video_id INTEGER,
+                ts       INTEGER,
+                plays    INTEGER,
+                likes    INTEGER,
+                shares   INTEGER,
+                comments INTEGER,
+                collects INTEGER,
+                PRIMARY KEY (video_id, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS channel_snapshots (
+                channel     TEXT,
+                ts          INTEGER,
+                followers   INTEGER,
+                hearts      INTEGER,
+                video_count INTEGER,
+                PRIMARY KEY (channel, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS video_daily (
+                video_id   INTEGER,
+                day        TEXT,
+                ts         INTEGER,
+                plays      INTEGER,
+                likes      INTEGER,
+                shares     INTEGER,
+                comments   INTEGER,
+                collects   INTEGER,
+                play_delta INTEGER,
+                PRIMARY KEY (video_id, day)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS video_latest (
+                video_id   INTEGER PRIMARY KEY,
+                day        TEXT,
+                plays      INTEGER,
+                likes      INTEGER,
+                shares     INTEGER,
+                comments   INTEGER,
+                collects   INTEGER,
+                views_1d   INTEGER,
+                views_7d   INTEGER,
+                engagement REAL
+            );
+            CREATE TABLE IF NOT EXISTS channel_daily (
+                channel        TEXT,
+                day            TEXT,
+                followers      INTEGER,
+                follower_delta INTEGER,
+                video_count    INTEGER,
+                tracked        INTEGER,
+                plays          INTEGER,
+                play_delta     INTEGER,
+                likes          INTEGER,
+                shares         INTEGER,
+                comments       INTEGER,
+                engagement     REAL,
+                PRIMARY KEY (channel, day)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def add(self, record, ts=None):
+        """Ghi nhận số liệu của một bản ghi video (mặc định tại thời điểm hiện tại)."""
+        with self._lock:
+            self._buffer.append((record, int(ts if ts is not None else time.time())))
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        conn = self._conn
+        videos, days, channels = {}, set(), {}
+        for record, ts in batch:
+            match = _VIDEO_ID_RE.search(record.webVideoUrl)
+            if not match:
+                self.skipped += 1
+                continue
+            video_id = int(match.group(1))
+            channel = record.channel
+            stats = (record.playCount, record.diggCount, record.shareCount,
+                     record.commentCount, record.collectCount)
+            conn.execute(
+                "INSERT INTO videos (video_id, channel, url, posted_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET channel = excluded.channel, url = excluded.url",
+                (video_id, channel, record.webVideoUrl, video_id_timestamp(video_id))
+            )
+            conn.execute("INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)", (video_id, ts) + stats)
+            day = _day(ts)
+            conn.execute(
+                "INSERT INTO video_daily (video_id, day, ts, plays, likes, shares, comments, collects) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id, day) DO UPDATE SET ts = excluded.ts, plays = excluded.plays, "
+                "likes = excluded.likes, shares = excluded.shares, comments = excluded.comments, "
+                "collects = excluded.collects WHERE excluded.ts >= video_daily.ts",
+                (video_id, day, ts) + stats
+            )
+            videos.setdefault(video_id, set()).add(day)
+            days.add((channel, day))
+            values = tuple(getattr(record, attr) for attr, _ in CHANNEL_FIELDS)
+            if any(value is not None for value in values):
+                channels[(channel, ts)] = values
+        conn.executemany(
+            "INSERT OR IGNORE INTO channel_snapshots VALUES (?, ?, ?, ?, ?)",
+            [key + values for key, values in channels.items()]
+        )
+        for video_id, touched in videos.items():
+            for day in touched:
+                self._update_delta(video_id, day)
+            self._update_latest(video_id)
+        for channel, day in sorted(days):
+            self._update_channel_day(channel, day)
+        conn.commit()
+
+    def _update_delta(self, video_id, day):
+        # View tăng so với ngày gần nhất trước đó; sửa cả ngày sau (khi nhập lịch sử không theo thứ tự)
+        conn = self._conn
+        for target in (day, conn.execute(
+                "SELECT MIN(day) FROM video_daily WHERE video_id = ? AND day > ?", (video_id, day)
+        ).fetchone()[0]):
+            if target is None:
+                continue
+            prev = conn.execute(
+                "SELECT plays FROM video_daily WHERE video_id = ? AND day < ? ORDER BY day DESC LIMIT 1",
+                (video_id, target)
+            ).fetchone()
+            conn.execute(
+                "UPDATE video_daily SET play_delta = plays - ? WHERE video_id = ? AND day = ?",
+                (prev[0] if prev else None, video_id, target)
+            )
+
+    def _plays_before(self, video_id, day, days_back):
+        row = self._conn.execute(
+            "SELECT plays FROM video_daily WHERE video_id = ? AND day <= date(?, ?) ORDER BY day DESC LIMIT 1",
+            (video_id, day, f"-{days_back} day")
+        ).fetchone()
+        return row[0] if row else None
+
+    def _update_latest(self, video_id):
+        conn = self._conn
+        day, plays, likes, shares, comments, collects = conn.execute(
+            "SELECT day, plays, likes, shares, comments, collects FROM video_daily "
+            "WHERE video_id = ? ORDER BY day DESC LIMIT 1", (video_id,)
+        ).fetchone()
+        base_1d = self._plays_before(video_id, day, 1)
+        base_7d = self._plays_before(video_id, day, 7)
+        conn.execute(
+            "INSERT OR REPLACE INTO video_latest VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (video_id, day, plays, likes, shares, comments, collects,
+             plays - base_1d if base_1d is not None else None,
+             plays - base_7d if base_7d is not None else None,
+             round((likes + comments + shares) / plays, 6) if plays else None)
+        )
+
+    def _update_channel_day(self, channel, day):
+        self._write_channel_day(channel, day)
+        # Ngày kế tiếp tính mức tăng so với ngày này (khi nhập lịch sử không theo thứ tự)
+        later = self._conn.execute(
+            "SELECT MIN(day) FROM channel_daily WHERE channel = ? AND day > ?", (channel, day)
+        ).fetchone()[0]
+        if later is not None:
+            self._write_channel_day(channel, later)
+
+    def _write_channel_day(self, channel, day):
+        # Tổng kênh trong ngày = tổng số liệu mới nhất (tính đến hết ngày đó) của từng video
+        conn = self._conn
+        tracked, plays, likes, shares, comments = conn.execute(
+            """SELECT COUNT(*), SUM(d.plays), SUM(d.likes), SUM(d.shares), SUM(d.comments)
+               FROM videos v JOIN video_daily d ON d.video_id = v.video_id
+               WHERE v.channel = ? AND d.day = (
+                   SELECT MAX(day) FROM video_daily WHERE video_id = v.video_id AND day <= ?)""",
+            (channel, day)
+        ).fetchone()
+        if not tracked:
+            return
+        profile = conn.execute(
+            "SELECT followers, video_count FROM channel_snapshots WHERE channel = ? AND ts < ? "
+            "AND followers IS NOT NULL ORDER BY ts DESC LIMIT 1",
+            (channel, datetime.strptime(day, '%Y-%m-%d').timestamp() + 86400)
+        ).fetchone()
+        followers, video_count = profile or (None, None)
+        prev = conn.execute(
+            "SELECT followers, plays FROM channel_daily WHERE channel = ? AND day < ? ORDER BY day DESC LIMIT 1",
+            (channel, day)
+        ).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO channel_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (channel, day, followers,
+             followers - prev[0] if prev and prev[0] is not None and followers is not None else None,
+             video_count, tracked, plays, plays - prev[1] if prev else None, likes, shares, comments,
+             round((likes + comments + shares) / plays, 6) if plays else None)
+        )
+
+    # --- Bảng nhỏ cho dashboard: (tên cột, danh sách dòng) ---
+    VIDEO_COLUMNS = ['Kênh', 'URL Video', 'Ngày đăng', 'Ngày cập nhật', 'Views', 'Likes', 'Shares',
+                     'Comments', 'Collects', 'Views tăng 1 ngày', 'Views tăng 7 ngày', 'Tỉ lệ tương tác']
+    CHANNEL_COLUMNS = ['Kênh', 'Ngày', 'Followers', 'Followers tăng', 'Số video (kênh)', 'Số video theo dõi',
+                       'Views', 'Views tăng', 'Likes', 'Shares', 'Comments', 'Tỉ lệ tương tác']
+
+    _VIDEO_SELECT = (
+        "SELECT v.channel, v.url, date(v.posted_at, 'unixepoch', 'localtime'), l.day, l.plays, l.likes, "
+        "l.shares, l.comments, l.collects, l.views_1d, l.views_7d, l.engagement "
+        "FROM video_latest l JOIN videos v ON v.video_id = l.video_id"
+    )
+
+    def video_trends(self):
+        """Mỗi video một dòng: số liệu mới nhất, view tăng 1/7 ngày, tỉ lệ tương tác."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(self._VIDEO_SELECT + " ORDER BY v.channel, l.plays DESC").fetchall()
+        return self.VIDEO_COLUMNS, rows
+
+    def top_movers(self, limit=50):
+        """Video tăng view nhiều nhất trong 7 ngày, chỉ xét video được cào trong 7 ngày gần nhất."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                self._VIDEO_SELECT + " WHERE l.views_7d IS NOT NULL AND "
+                "l.day > date((SELECT MAX(day) FROM video_latest), '-7 day') "
+                "ORDER BY l.views_7d DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return self.VIDEO_COLUMNS, rows
+
+    def channel_daily(self, days=90):
+        """Tổng theo kênh từng ngày trong `days` ngày gần nhất."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM channel_daily WHERE day > date((SELECT MAX(day) FROM channel_daily), ?) "
+                "ORDER BY channel, day", (f"-{days} day",)
+            ).fetchall()
+        return self.CHANNEL_COLUMNS, rows
+
+    def import_csv(self, path, ts=None):
+        """Nhập một file CSV của crawl_tiktok.py như một lần cào (mặc định ở thời điểm sửa file)."""
+        ts = ts if ts is not None else os.path.getmtime(path)
+        count = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                record = VideoRecord.from_row(row)
+                for attr, column in CHANNEL_FIELDS:
+                    # Cột không có hoặc ô trống (vd. CSV cũ) lưu NULL thay vì 0
+                    if not row.get(column):
+                        setattr(record, attr, None)
+                self.add(record, ts)
+                count += 1
+        self.flush()
+        return count
+
+    def summary(self):
+        self.flush()
+        with self._lock:
+            videos, snapshots, days = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM videos), (SELECT COUNT(*) FROM snapshots), "
+                "(SELECT COUNT(DISTINCT day) FROM video_daily)"
+            ).fetchone()
+        return f"Lịch sử số liệu: {videos} video, {snapshots} snapshot trong {days} ngày."
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhập các file CSV đã cào vào lịch sử số liệu.")
+    parser.add_argument('inputs', nargs='+', help="file CSV, thư mục hoặc glob")
+    parser.add_argument('--db', default=os.getenv('SNAPSHOT_DB', './data/snapshots.db'))
+    parser.add_argument('--date', help="ngày cào (YYYY-MM-DD); mặc định theo thời điểm sửa file")
+    args = parser.parse_args()
+
+    paths = []
+    for item in args.inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, '*.csv'))))
+        else:
+            paths.extend(sorted(glob.glob(item)))
+    ts = datetime.strptime(args.date, '%Y-%m-%d').timestamp() if args.date else None
+    store = SnapshotStore(args.db)
+    # Nhập file cũ trước để view tăng theo ngày được tính theo đúng thứ tự
+    for path in sorted(paths, key=os.path.getmtime):
+        print(f"{path}: {store.import_csv(path, ts)} dòng")
+    print(store.summary())
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
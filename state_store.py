@@ -0,0 +1,100 @@
+"""Lưu trạng thái crawl trong SQLite để các lần chạy sau chỉ cào video mới hoặc đã cũ."""
+import json
+import sqlite3
+import threading
+import time
+
+from video_record import VideoRecord
+
+
+class CrawlStateStore:
+    """Theo dõi từng URL video: lần cào gần nhất và số liệu gần nhất.
+
+    Video có dữ liệu mới hơn `ttl_seconds` được coi là "hit" và không cần mở lại.
+    An toàn khi dùng chung giữa các worker của TikTokScraperPool.
+    """
+
+    # Các trường lấy lại từ trang kênh, kể cả khi dùng bản ghi cũ: số liệu cấp kênh
+    # và lượt xem hiện tại mà danh sách video đã hiển thị sẵn
+    LISTING_FIELDS = ('followers', 'heartCount', 'videoCount', 'playCount')
+
+    def __init__(self, db_path='./data/crawl_state.db', ttl_seconds=24 * 3600):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS videos (
+                url          TEXT PRIMARY KEY,
+                channel      TEXT,
+                first_seen   REAL,
+                last_scraped REAL,
+                record       TEXT
+            )"""
+        )
+        self._conn.commit()
+
+    def split(self, channel_name, vids):
+        """Chia danh sách video thành (cần cào, bản ghi còn hạn lấy từ store)."""
+        now = time.time()
+        urls = [info['url'] for info in vids]
+        with self._lock:
+            rows = {}
+            # Giới hạn số tham số của SQLite
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                rows.update(
+                    (url, (last, record)) for url, last, record in self._conn.execute(
+                        f"SELECT url, last_scraped, record FROM videos "
+                        f"WHERE url IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    )
+                )
+            new_urls = [(url, channel_name, now) for url in urls if url not in rows]
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO videos (url, channel, first_seen) VALUES (?, ?, ?)", new_urls
+            )
+            self._conn.commit()
+
+        todo, cached = [], []
+        for info in vids:
+            last, record = rows.get(info['url'], (None, None))
+            if record and last and now - last < self.ttl_seconds:
+                data = VideoRecord.from_dict(json.loads(record))
+                for key in self.LISTING_FIELDS:
+                    if key in info:
+                        setattr(data, key, info[key])
+                data.channel = channel_name
+                cached.append(data)
+            else:
+                todo.append(info)
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(todo)
+        return todo, cached
+
+    def save(self, record):
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO videos (url, channel, first_seen, last_scraped, record)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       channel = excluded.channel,
+                       last_scraped = excluded.last_scraped,
+                       record = excluded.record""",
+                (record.webVideoUrl, record.channel, time.time(), time.time(),
+                 json.dumps(record.to_dict(), ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def summary(self):
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        return f"Bỏ qua {self.hits}/{total} video còn hạn (hit {ratio:.1%}), cào lại {self.misses} video."
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
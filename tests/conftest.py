@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Các module của dự án nằm ở thư mục gốc, không phải package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,168 @@
+"""Server HTTP cục bộ giả lập phần values của Google Sheets API v4 để kiểm thử sheets_sync.py.
+
+Hỗ trợ values.get, values:batchGet, values:append và values:batchUpdate trên các
+sheet lưu trong bộ nhớ. Dùng với SHEETS_API_ROOT=<api_root> hoặc tham số api_root.
+"""
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+_CELL_RE = re.compile(r'^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$')
+_INF = 10 ** 9
+
+
+def _column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index
+
+
+def parse_range(a1):
+    """"'Sheet'!A2:C5" -> (tên sheet, dòng đầu, dòng cuối, cột đầu, cột cuối), đánh số từ 1."""
+    name, _, cells = a1.rpartition('!') if '!' in a1 else (a1, '', '')
+    if name.startswith("'"):
+        name = name[1:-1].replace("''", "'")
+    if not cells:
+        return name, 1, _INF, 1, _INF
+    c1, r1, c2, r2 = _CELL_RE.match(cells).groups()
+    if c2 is None and r2 is None:
+        c2, r2 = c1, r1
+    return (name, int(r1) if r1 else 1, int(r2) if r2 else _INF,
+            _column_index(c1) if c1 else 1, _column_index(c2) if c2 else _INF)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeSheets/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        # /v4/spreadsheets/<id>/values/<range>[:append] hoặc /v4/spreadsheets/<id>/values:<lệnh>
+        path = unquote(url.path).split('/values', 1)[1]
+        query = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        fake.log(method, path, query)
+        status = fake.next_failure()
+        if status:
+            return self._send(status, {'error': {'code': status}})
+        with fake.lock:
+            if method == 'GET' and path == ':batchGet':
+                ranges = query.get('ranges', [])
+                return self._send(200, {'valueRanges': [
+                    {'range': r, 'values': fake.read(r)} for r in ranges
+                ]})
+            if method == 'GET':
+                return self._send(200, {'values': fake.read(path[1:])})
+            if method == 'POST' and path.endswith(':append'):
+                return self._send(200, {'updates': fake.append(path[1:-len(':append')], body['values'])})
+            if method == 'POST' and path == ':batchUpdate':
+                for item in body['data']:
+                    fake.write(item['range'], item['values'])
+                return self._send(200, {})
+        self._send(404, {'error': {'code': 404}})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+class FakeSheetsServer:
+    """Chạy server trên 127.0.0.1 trong thread nền; dùng như context manager.
+
+    `sheets` là dict tên sheet -> danh sách dòng; `requests` ghi lại (method, path, query)
+    của mọi request; `fail_with` là danh sách mã lỗi trả về cho các request kế tiếp.
+    """
+
+    def __init__(self, sheets=None, host='127.0.0.1', port=0):
+        self.sheets = {name: [list(row) for row in rows] for name, rows in (sheets or {}).items()}
+        self.requests = []
+        self.fail_with = []
+        self.lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def api_root(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v4/spreadsheets"
+
+    def log(self, method, path, query):
+        with self.lock:
+            self.requests.append((method, path, query))
+
+    def next_failure(self):
+        with self.lock:
+            return self.fail_with.pop(0) if self.fail_with else None
+
+    def read(self, a1):
+        name, r1, r2, c1, c2 = parse_range(a1)
+        rows = self.sheets.get(name, [])[r1 - 1:r2]
+        values = [row[c1 - 1:c2] for row in rows]
+        # Như API thật: bỏ ô trống ở cuối dòng và dòng trống ở cuối range
+        values = [row[:max([i + 1 for i, v in enumerate(row) if v != ''] or [0])] for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def write(self, a1, values):
+        name, r1, _, c1, _ = parse_range(a1)
+        sheet = self.sheets.setdefault(name, [])
+        for offset, row in enumerate(values):
+            while len(sheet) < r1 + offset:
+                sheet.append([])
+            target = sheet[r1 + offset - 1]
+            target.extend([''] * (c1 - 1 + len(row) - len(target)))
+            target[c1 - 1:c1 - 1 + len(row)] = row
+
+    def append(self, a1, values):
+        name = parse_range(a1)[0]
+        sheet = self.sheets.setdefault(name, [])
+        while sheet and not any(v != '' for v in sheet[-1]):
+            sheet.pop()
+        start = len(sheet) + 1
+        sheet.extend(list(row) for row in values)
+        width = max(len(row) for row in values)
+        return {'updatedRange': f"'{name}'!A{start}:{_letters(width)}{start + len(values) - 1}",
+                'updatedRows': len(values)}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _letters(index):
+    letters = ''
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
@@ -0,0 +1,28 @@
+"""Kiểm thử chọn cookie cần nạp khi dùng lại profile Chrome."""
+from cookie_store import CookieStore
+
+NOW = 1_750_000_000
+
+
+def cookie(name, value, expiry=None):
+    c = {'name': name, 'value': value, 'domain': '.tiktok.com', 'path': '/'}
+    if expiry is not None:
+        c['expiry'] = expiry
+    return c
+
+
+def browser_cookie(name, value, expires=-1):
+    return {'name': name, 'value': value, 'domain': '.tiktok.com', 'path': '/',
+            'expires': expires, 'session': expires <= 0}
+
+
+def test_fresher_browser_cookies_are_not_overwritten():
+    saved = [cookie('sessionid', 'cu', NOW + 1000), cookie('msToken', 'cu'), cookie('ttwid', 'cu', NOW + 1000),
+             cookie('tt_csrf_token', 'cu', NOW + 1000), cookie('het_han', 'cu', NOW - 1)]
+    current = [browser_cookie('sessionid', 'moi', NOW + 5000), browser_cookie('msToken', 'moi'),
+               browser_cookie('ttwid', 'moi', NOW - 10)]
+
+    missing = CookieStore.missing_from(saved, current, now=NOW)
+
+    # Chỉ nạp cookie trình duyệt chưa có hoặc đã hết hạn; bỏ cookie đã hết hạn trong file
+    assert [c['name'] for c in missing] == ['ttwid', 'tt_csrf_token']
@@ -0,0 +1,139 @@
+"""Kiểm thử CrawlQueue/LeaseKeeper trên file SQLite tạm và vòng lặp run_worker với scraper giả."""
+import threading
+
+import crawl_tiktok
+from crawl_queue import CrawlQueue, LeaseKeeper
+from video_record import VideoRecord
+
+
+def make_queue(tmp_path, **kwargs):
+    return CrawlQueue(str(tmp_path / 'queue.db'), **kwargs)
+
+
+def job(queue, channel):
+    with queue._lock:
+        return queue._conn.execute(
+            "SELECT state, attempts, lease_owner, last_error FROM jobs WHERE channel = ?", (channel,)
+        ).fetchone()
+
+
+def test_each_job_is_claimed_by_one_worker(tmp_path):
+    make_queue(tmp_path).enqueue([f'kenh{i}' for i in range(20)])
+    claimed = []
+
+    def worker(n):
+        # Mỗi worker một kết nối riêng tới cùng file, như nhiều tiến trình/máy
+        queue = make_queue(tmp_path)
+        while True:
+            channel = queue.claim(f'w{n}')
+            if channel is None:
+                break
+            claimed.append(channel)
+        queue.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claimed) == sorted(f'kenh{i}' for i in range(20))
+    assert make_queue(tmp_path).stats() == {'pending': 0, 'leased': 20, 'done': 0, 'failed': 0}
+
+
+def test_expired_lease_is_redelivered(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=600)
+    queue.enqueue(['a'])
+    assert queue.claim('w1') == 'a'
+    assert queue.claim('w2') is None
+
+    # Lease hết hạn (worker w1 treo): job được giao cho w2, w1 không còn ghi được
+    queue.lease_seconds = -1
+    assert queue.heartbeat('a', 'w1')
+    assert queue.claim('w2') == 'a'
+    assert not queue.heartbeat('a', 'w1')
+    assert not queue.complete('a', 'w1', rows=5)
+    assert queue.complete('a', 'w2', rows=5)
+    assert job(queue, 'a') == ('done', 2, None, None)
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=-1, max_attempts=2)
+    queue.enqueue(['chet'])
+    # Lease hết hạn liên tục (worker chết giữa chừng): lần nhận thứ ba chuyển job sang 'failed'
+    assert queue.claim('w1') == 'chet'
+    assert queue.claim('w2') == 'chet'
+    assert queue.claim('w3') is None
+    assert job(queue, 'chet') == ('failed', 2, None, 'lease hết hạn')
+
+    # Worker báo lỗi: job quay lại hàng đợi đến khi đủ max_attempts lần
+    queue.lease_seconds = 600
+    queue.enqueue(['loi'])
+    assert queue.claim('w1') == 'loi'
+    assert queue.fail('loi', 'w1', 'trang lỗi')
+    assert job(queue, 'loi')[0] == 'pending'
+    assert queue.claim('w2') == 'loi'
+    assert queue.fail('loi', 'w2', 'trang lỗi')
+    assert queue.claim('w3') is None
+    assert queue.failed_jobs() == [('chet', 2, 'lease hết hạn'), ('loi', 2, 'trang lỗi')]
+
+
+def test_release_returns_job_without_counting_an_attempt(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue(['a'])
+    assert queue.claim('w1') == 'a'
+    assert not queue.release('a', 'w2')
+    assert queue.release('a', 'w1')
+    assert job(queue, 'a') == ('pending', 0, None, None)
+
+    assert queue.claim('w2') == 'a'
+    assert queue.fail('a', 'w2', 'lỗi mạng')
+    assert job(queue, 'a') == ('pending', 1, None, 'lỗi mạng')
+
+
+def test_lease_keeper_reports_lost_lease(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=600)
+    queue.enqueue(['a'])
+    queue.claim('w1')
+    with LeaseKeeper(queue, 'a', 'w1', interval=0.01) as keeper:
+        assert not keeper.lost.wait(0.1)
+        # Job bị giao lại cho worker khác: heartbeat kế tiếp thất bại
+        queue.lease_seconds = -1
+        queue.heartbeat('a', 'w1')
+        queue.claim('w2')
+        assert keeper.lost.wait(2)
+
+
+class FakeScraper:
+    """Kênh 'trong' tải được nhưng không có video, 'loi' hỏng khi liệt kê, còn lại có một video."""
+
+    def __init__(self, cookies, metrics=None, **options):
+        self.metrics = metrics
+
+    def set_cookies(self):
+        pass
+
+    def scrape_channels(self, channel_names, sink=None, checkpoint=None):
+        for name in channel_names:
+            if name == 'loi':
+                self.metrics.inc('failures', phase='channel', channel=name)
+            elif name != 'trong':
+                sink.write(VideoRecord(webVideoUrl=f'{name}/video/1', channel=name))
+        return []
+
+    def quit(self):
+        pass
+
+
+def test_worker_marks_empty_profile_done(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_tiktok, 'TikTokScraper', FakeScraper)
+    monkeypatch.setattr(crawl_tiktok, 'load_valid_cookies', lambda: [{'name': 'sessionid', 'value': 'x'}])
+    queue_path = str(tmp_path / 'queue.db')
+    CrawlQueue(queue_path).enqueue(['trong', 'loi', 'co'])
+
+    crawl_tiktok.run_worker(queue_path, str(tmp_path / 'shards'), worker_id='w1', poll_interval=0)
+
+    queue = CrawlQueue(queue_path)
+    assert job(queue, 'trong')[0] == 'done'
+    assert job(queue, 'co')[0] == 'done'
+    assert job(queue, 'loi')[:2] == ('failed', 3)
@@ -0,0 +1,100 @@
+"""Kiểm thử các bước xử lý dữ liệu của csv_to_ggsheet.py (không cần tài khoản Google)."""
+import pandas as pd
+import pytest
+import requests
+
+from column_config import ColumnConfig
+from csv_to_ggsheet import CsvToGoogleSheetsApp, IncrementalSheetsUploader
+from fake_sheets_server import FakeSheetsServer
+from metrics import Metrics
+from sheets_sync import SheetsUpsertSync
+from video_record import VideoRecord
+
+
+def make_app(**attrs):
+    # Bỏ qua __init__ (đọc credentials và gọi API thật)
+    app = CsvToGoogleSheetsApp.__new__(CsvToGoogleSheetsApp)
+    app.metrics = Metrics()
+    for name, value in attrs.items():
+        setattr(app, name, value)
+    return app
+
+
+def test_incremental_upload_reads_sheet_index_once():
+    with FakeSheetsServer() as server:
+        app = make_app()
+        app._make_syncer = lambda: SheetsUpsertSync(
+            requests.Session(), 'sid', 'Data', backoff_base=0, api_root=server.api_root, metrics=app.metrics
+        )
+        uploader = IncrementalSheetsUploader(app, batch_rows=3, flush_seconds=60).start()
+        for i in range(10):
+            uploader.write(VideoRecord(webVideoUrl=f'u{i}', channel='a', playCount=i))
+        uploader.write(VideoRecord(webVideoUrl='u0', channel='a', playCount=100))
+        uploader.close()
+
+        sheet = server.sheets['Data']
+        assert sheet[0] == ColumnConfig.COLUMNS
+        assert len(sheet) == 11
+        views = ColumnConfig.COLUMNS.index('Views')
+        assert sheet[1][views] == 100
+        index_reads = [path for method, path, _ in server.requests if path == "/'Data'!1:1"]
+        assert len(index_reads) == 1
+
+
+def test_type_error_mid_stream_reads_rest_without_duplicates(tmp_path):
+    path = tmp_path / 'lon.csv'
+    rows = ['URL Video,Views,Text'] + [f'u{i},{i},"dòng\nhai"' for i in range(3000)]
+    rows[2500] = 'u2499,khong-phai-so,x'
+    path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+
+    app = make_app(_stream_bytes=0, CSV_BLOCK_BYTES=4096, FALLBACK_CHUNK_ROWS=100)
+    frames = list(app._iter_csv_frames(str(path)))
+
+    assert len(frames) > 2
+    urls = [u for df in frames for u in df['URL Video']]
+    assert urls == [f'u{i}' for i in range(3000)]
+    assert max(len(df) for df in frames) <= 1000
+    # Chỉ chuyển sang đọc không ép kiểu từ khối chứa dòng lỗi
+    typed = sum(len(df) for df in frames if df['Views'].dtype == 'Int64')
+    assert typed >= 2000
+
+
+def test_multiline_text_streams_typed_without_fallback(tmp_path, capsys):
+    path = tmp_path / 'lon.csv'
+    rows = ['URL Video,Views,Text'] + [f'u{i},{i},"dòng {i}\nhai\r\nba"' for i in range(3000)]
+    path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+
+    app = make_app(_stream_bytes=0, CSV_BLOCK_BYTES=4096, FALLBACK_CHUNK_ROWS=100)
+    frames = list(app._iter_csv_frames(str(path)))
+
+    assert len(frames) > 2
+    assert all(df['Views'].dtype == 'Int64' for df in frames)
+    assert [v for df in frames for v in df['Views']] == list(range(3000))
+    assert frames[0]['Text'][0] == 'dòng 0\nhai\r\nba'
+    assert 'không ép kiểu' not in capsys.readouterr().out
+
+
+def legacy_int_column(values):
+    # Cách cũ: fillna("NULL") rồi int(x) từng ô; lỗi ở bất kỳ ô nào thì cả cột thành NULL
+    try:
+        return [int(x) if x != "NULL" else "NULL" for x in pd.Series(values, dtype=object).fillna("NULL")]
+    except (TypeError, ValueError):
+        return ["NULL"] * len(values)
+
+
+@pytest.mark.parametrize('values', [
+    ['12', ' +5 ', '-3', None],
+    ['1_000', '7', 'NULL'],
+    ['1.0', '2'],
+    ['1.5', '2'],
+    ['1e3', '2'],
+    ['abc', '2'],
+    [1.5, 2.0, None],
+    [3, None, 4],
+])
+def test_int_cast_matches_legacy(values):
+    app = make_app()
+    df = pd.DataFrame({col: [None] * len(values) for col in ColumnConfig.COLUMNS})
+    df['Views'] = pd.Series(values, dtype=object)
+    out = app._fill_null(app._cast_and_handle_null(df))
+    assert out['Views'].tolist() == legacy_int_column(values)
@@ -0,0 +1,99 @@
+"""Kiểm thử AsyncVideoFetcher với một server HTTP cục bộ trả về trang tốt lẫn trang hỏng."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_fetcher import AsyncVideoFetcher
+from metrics import Metrics
+from throttle import AdaptiveController
+
+
+def _page(item):
+    payload = {'__DEFAULT_SCOPE__': {'webapp.video-detail': {'itemInfo': {'itemStruct': item}}}}
+    return ('<html><head><script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+            f'{json.dumps(payload)}</script></head><body></body></html>')
+
+
+GOOD_ITEM = {
+    'id': '7516192768000000000', 'desc': 'video #fyp', 'createTime': '1750000000',
+    'author': {'uniqueId': 'kenh'}, 'authorStats': {'followerCount': 10},
+    'stats': {'playCount': 1234, 'diggCount': 5, 'shareCount': 1, 'commentCount': 2, 'collectCount': 3},
+    'video': {'duration': 15}, 'textExtra': [{'hashtagName': 'fyp'}],
+}
+
+# đường dẫn -> (Content-Type, nội dung)
+PAGES = {
+    '/good': ('text/html; charset=utf-8', _page(GOOD_ITEM).encode('utf-8')),
+    '/bad-charset': ('text/html; charset=khong-ton-tai', _page(GOOD_ITEM).encode('utf-8')),
+    '/bad-bytes': ('text/html; charset=utf-8', b'<html>\xff\xfe\xfa</html>'),
+    '/bad-json': ('text/html; charset=utf-8', _page(dict(GOOD_ITEM, stats='x')).encode('utf-8')),
+    '/no-json': ('text/html; charset=utf-8', b'<html><body>captcha</body></html>'),
+    '/verify': ('text/html; charset=utf-8', b'<html><body><div id="tiktok-verify-ele"></div></body></html>'),
+    '/too-many': ('text/plain', b'Too Many Requests'),
+}
+STATUS = {'/too-many': 429}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path not in PAGES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content_type, body = PAGES[self.path]
+        self.send_response(STATUS.get(self.path, 200))
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def base_url():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address[:2]
+    yield f"http://{host}:{port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_bad_pages_do_not_abort_the_batch(base_url):
+    paths = ['/good', '/bad-charset', '/bad-bytes', '/bad-json', '/no-json', '/missing', '/good']
+    items = [('kenh', {'url': base_url + path}) for path in paths]
+    results = AsyncVideoFetcher([], concurrency=3, timeout=5).fetch(items)
+
+    # Charset lạ: tùy phiên bản aiohttp là đoán được mã hóa hoặc lỗi, miễn không làm hỏng cả lô
+    ok = [r is not None for r in results]
+    assert ok[:1] + ok[2:] == [True, False, False, False, False, True]
+    assert results[0].channel == 'kenh'
+    assert results[0].playCount == 1234
+    assert results[0].webVideoUrl == base_url + '/good'
+
+
+def test_throttled_pages_reach_the_controller(base_url):
+    metrics = Metrics()
+    controller = AdaptiveController(max_concurrency=4, start_interval=0.0, cooldown=0.3, metrics=metrics)
+    fetcher = AsyncVideoFetcher([], concurrency=4, timeout=5, controller=controller)
+    paths = ['/good', '/too-many', '/verify', '/no-json']
+    results = fetcher.fetch([('kenh', {'url': base_url + path}) for path in paths])
+
+    assert [r is not None for r in results] == [True, False, False, False]
+    assert controller._active == 0
+    # 429 và trang xác minh là bị chặn: giảm nhân hai lần và đặt thời gian tạm dừng
+    assert metrics.total('backoffs') == 2
+    assert controller.state()['concurrency'] == 1
+
+    # Lô sau chỉ bắt đầu tải khi hết thời gian tạm dừng
+    resume_at = controller._resume_at
+    assert resume_at > time.monotonic()
+    assert fetcher.fetch([('kenh', {'url': base_url + '/good'})])[0] is not None
+    assert time.monotonic() >= resume_at
@@ -0,0 +1,43 @@
+"""Kiểm thử ParquetExporter: khôi phục lô chưa ghi khi lần chạy trước bị dừng giữa chừng."""
+import pyarrow.dataset as ds
+
+from crawl_tiktok import ParquetExporter
+from video_record import VideoRecord
+
+
+def read_urls(path):
+    table = ds.dataset(str(path), partitioning='hive').to_table(columns=['URL Video'])
+    return sorted(table.column('URL Video').to_pylist())
+
+
+def crash(exporter):
+    # Dừng đột ngột: file tạm còn nguyên, lô trong bộ nhớ chưa ghi ra Parquet
+    exporter._file.close()
+    exporter._file = None
+
+
+def test_pending_rows_survive_a_run_with_other_channels(tmp_path):
+    first = ParquetExporter(str(tmp_path), row_group_size=100).open()
+    for i in range(3):
+        first.write(VideoRecord(webVideoUrl=f'a{i}', channel='a'))
+    crash(first)
+
+    # Lần chạy sau với danh sách kênh khác mở dataset ở chế độ ghi mới
+    second = ParquetExporter(str(tmp_path), row_group_size=100).open()
+    second.write(VideoRecord(webVideoUrl='b0', channel='b'))
+    second.close()
+
+    assert read_urls(tmp_path) == ['a0', 'a1', 'a2', 'b0']
+
+
+def test_resumed_run_keeps_pending_rows_once(tmp_path):
+    first = ParquetExporter(str(tmp_path), row_group_size=2).open()
+    for i in range(3):
+        first.write(VideoRecord(webVideoUrl=f'a{i}', channel='a'))
+    crash(first)
+
+    resumed = ParquetExporter(str(tmp_path), row_group_size=2).open(append=True)
+    resumed.write(VideoRecord(webVideoUrl='a3', channel='a'))
+    resumed.close()
+
+    assert read_urls(tmp_path) == ['a0', 'a1', 'a2', 'a3']
@@ -0,0 +1,62 @@
+"""Kiểm thử điểm dừng khi cuộn trang kênh của TikTokScraper với driver giả (không cần Chrome)."""
+import crawl_tiktok
+from crawl_tiktok import TikTokScraper
+from metrics import Metrics
+
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeDriver:
+    """Trang kênh có `total` video, mỗi lượt cuộn hiện thêm `page` video."""
+
+    current_url = 'https://www.tiktok.com/@kenh'
+
+    def __init__(self, total, video_count_text, page=300):
+        self.total, self.page = total, page
+        self.rendered, self.harvested = min(page, total), 0
+        self.stats = {'followers-count': '10', 'heart-count': '20', 'video-count': video_count_text}
+
+    def find_element(self, by, selector):
+        name = selector.split('"')[1]
+        return FakeElement(self.stats[name])
+
+    def execute_script(self, js, *args):
+        if js is TikTokScraper._HARVEST_JS:
+            out = [[f'https://www.tiktok.com/@kenh/video/{i}', '1', False] for i in range(self.harvested, self.rendered)]
+            self.harvested = self.rendered
+            self.rendered = min(self.total, self.rendered + self.page)
+            return [out, self.harvested]
+        return self.rendered
+
+
+def make_scraper(driver):
+    # Bỏ qua __init__ (mở Chrome thật)
+    scraper = TikTokScraper.__new__(TikTokScraper)
+    scraper.driver, scraper.metrics, scraper.wait_log = driver, Metrics(), []
+    scraper._capturing, scraper.trim_harvested = False, True
+    scraper.poll_interval, scraper.scroll_idle_timeout = 0, 0
+    scraper.max_videos, scraper.since_ts = 0, None
+    scraper._open = lambda url: None
+    scraper._wait_for_page = lambda selectors: True
+    return scraper
+
+
+def test_rounded_video_count_does_not_stop_scrolling_early():
+    # '1.2K' đọc ra 1200 nhưng kênh thật có 1249 video
+    scraper = make_scraper(FakeDriver(1249, '1.2K'))
+    videos = scraper._get_video_urls('https://www.tiktok.com/@kenh')
+    assert len(videos) == 1249
+    assert videos[0]['videoCount'] == 1200
+
+
+def test_exact_video_count_stops_without_waiting(monkeypatch):
+    waits = []
+    monkeypatch.setattr(crawl_tiktok.time, 'sleep', waits.append)
+    scraper = make_scraper(FakeDriver(1249, '1,249'))
+    videos = scraper._get_video_urls('https://www.tiktok.com/@kenh')
+    assert len(videos) == 1249
+    # Đủ số video thì dừng ngay, không chờ thêm lượt cuộn
+    assert len(waits) == 4
@@ -0,0 +1,79 @@
+"""Kiểm thử SheetsUpsertSync với server Sheets giả (tests/fake_sheets_server.py)."""
+import pandas as pd
+import pytest
+import requests
+
+from fake_sheets_server import FakeSheetsServer
+from metrics import Metrics
+from sheets_sync import SheetsApiError, SheetsUpsertSync
+
+HEADER = ['URL Video', 'Views', 'Kênh']
+
+
+def make_syncer(server, metrics=None):
+    return SheetsUpsertSync(requests.Session(), 'sid', 'Data', backoff_base=0, max_workers=2,
+                            api_root=server.api_root, metrics=metrics or Metrics())
+
+
+def frame(rows, columns=HEADER):
+    return pd.DataFrame(rows, columns=columns)
+
+
+def test_append_to_empty_sheet():
+    with FakeSheetsServer() as server:
+        stats = make_syncer(server).sync(frame([['u1', 1, 'a'], ['u2', 2, 'b']]))
+        assert stats == {'updated': 0, 'appended': 2, 'unchanged': 0}
+        assert server.sheets['Data'] == [HEADER, ['u1', 1, 'a'], ['u2', 2, 'b']]
+
+
+def test_update_append_and_unchanged_without_reading_whole_sheet():
+    sheet = [HEADER, ['u1', 1, 'a'], ['u2', 2, 'b'], ['u3', 3, 'c']]
+    with FakeSheetsServer({'Data': sheet}) as server:
+        syncer = make_syncer(server)
+        stats = syncer.sync(frame([['u1', 1, 'a'], ['u3', 30, 'c'], ['u4', 4, 'd']]))
+        assert stats == {'updated': 1, 'appended': 1, 'unchanged': 1}
+        assert server.sheets['Data'] == [HEADER, ['u1', 1, 'a'], ['u2', 2, 'b'], ['u3', 30, 'c'], ['u4', 4, 'd']]
+        gets = [path for method, path, _ in server.requests if method == 'GET' and path != ':batchGet']
+        # Chỉ đọc dòng tiêu đề và cột khóa, không đọc cả sheet
+        assert gets == ["/'Data'!1:1", "/'Data'!A2:A"]
+        read_ranges = [query['ranges'] for method, path, query in server.requests if path == ':batchGet']
+        assert read_ranges == [["'Data'!A2:C2", "'Data'!A4:C4"]]
+
+        # Lần sync sau dùng lại chỉ mục đã cập nhật, kể cả dòng vừa thêm
+        server.requests.clear()
+        stats = syncer.sync(frame([['u4', 40, 'd'], ['u5', 5, 'e']]))
+        assert stats == {'updated': 1, 'appended': 1, 'unchanged': 0}
+        assert not [path for method, path, _ in server.requests if method == 'GET' and path != ':batchGet']
+        assert server.sheets['Data'][4:] == [['u4', 40, 'd'], ['u5', 5, 'e']]
+
+
+def test_retries_on_429():
+    with FakeSheetsServer({'Data': [HEADER, ['u1', 1, 'a']]}) as server:
+        server.fail_with = [429, 429]
+        metrics = Metrics()
+        stats = make_syncer(server, metrics).sync(frame([['u2', 2, 'b']]))
+        assert stats['appended'] == 1
+        assert metrics.total('retries') == 2
+        assert server.sheets['Data'][-1] == ['u2', 2, 'b']
+
+
+def test_gives_up_after_max_retries():
+    with FakeSheetsServer() as server:
+        server.fail_with = [503] * 10
+        syncer = make_syncer(server)
+        syncer._max_retries = 2
+        with pytest.raises(SheetsApiError):
+            syncer.sync(frame([['u1', 1, 'a']]))
+
+
+def test_header_extended_when_columns_appended():
+    with FakeSheetsServer({'Data': [HEADER[:2], ['u1', 1]]}) as server:
+        stats = make_syncer(server).sync(frame([['u1', 1, 'a'], ['u2', 2, 'b']]))
+        assert stats == {'updated': 1, 'appended': 1, 'unchanged': 0}
+        assert server.sheets['Data'] == [HEADER, ['u1', 1, 'a'], ['u2', 2, 'b']]
+
+
+def test_different_header_is_rejected():
+    with FakeSheetsServer({'Data': [['URL Video', 'Other'], ['u1', 1]]}) as server:
+        with pytest.raises(SheetsApiError):
+            make_syncer(server).sync(frame([['u1', 1, 'a']]))
@@ -0,0 +1,21 @@
+"""Kiểm thử CrawlStateStore: video còn hạn dùng lại bản ghi cũ với số liệu mới từ trang kênh."""
+from state_store import CrawlStateStore
+from video_record import VideoRecord
+
+
+def test_cached_records_take_current_listing_numbers(tmp_path):
+    store = CrawlStateStore(str(tmp_path / 'state.db'), ttl_seconds=3600)
+    store.save(VideoRecord(webVideoUrl='u1', channel='kenh', playCount=100, diggCount=7, followers=10))
+
+    vids = [
+        {'url': 'u1', 'playCount': 250, 'followers': 12, 'heartCount': 90, 'videoCount': 3},
+        {'url': 'u2', 'playCount': 5, 'followers': 12, 'heartCount': 90, 'videoCount': 3},
+    ]
+    todo, cached = store.split('kenh', vids)
+
+    assert [info['url'] for info in todo] == ['u2']
+    [record] = cached
+    assert (record.playCount, record.followers, record.heartCount, record.videoCount) == (250, 12, 90, 3)
+    # Số liệu chỉ có trên trang video giữ nguyên giá trị đã lưu
+    assert record.diggCount == 7
+    store.close()
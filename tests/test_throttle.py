@@ -0,0 +1,37 @@
+"""Kiểm thử AdaptiveController với độ trễ giả lập (gọi acquire/release trực tiếp)."""
+from throttle import AdaptiveController
+
+
+def run(controller, latency, listing=False):
+    controller.acquire(hold=not listing)
+    controller.release('ok', None if listing else latency, held=not listing)
+
+
+def test_long_listings_do_not_trigger_latency_backoff():
+    controller = AdaptiveController(max_concurrency=8, start_interval=0.0, window=5)
+    for i in range(60):
+        # Mỗi kênh cuộn vài chục giây, xen giữa các trang video khoảng 1 giây
+        if i % 6 == 0:
+            run(controller, 20.0 + i, listing=True)
+        else:
+            run(controller, 1.0)
+    assert controller.state()['concurrency'] == 8
+    assert controller._active == 0
+
+
+def test_slow_video_pages_still_back_off():
+    controller = AdaptiveController(max_concurrency=8, start_interval=0.0, window=5)
+    for _ in range(10):
+        run(controller, 1.0)
+    for _ in range(10):
+        run(controller, 10.0)
+    assert controller.state()['concurrency'] < 8
+
+
+def test_listing_does_not_hold_a_video_slot():
+    controller = AdaptiveController(max_concurrency=1, start_interval=0.0)
+    with controller.slot(listing=True):
+        # Lister đang cuộn nhưng worker vẫn lấy được lượt tải video
+        controller.acquire()
+        controller.release('ok', 1.0)
+    assert controller._active == 0
@@ -0,0 +1,45 @@
+"""Kiểm thử VideoRecord và lược đồ cột."""
+import csv
+import io
+
+import pytest
+
+from video_record import ATTRIBUTES, COLUMNS, CSV_COLUMNS, RecordBatch, VideoRecord
+
+
+def sample():
+    return VideoRecord(webVideoUrl='https://x/@a/video/1', channel='a', author='a', text='mô tả',
+                       playCount=10, diggCount=2, followers=7, heartCount=9, videoCount=3,
+                       postedDate='15/06/2025', hashtags=['fyp', 'xuhuong'], isAd='false')
+
+
+def test_schema_declared_once():
+    assert VideoRecord.__slots__ == tuple(attr for attr, _ in ATTRIBUTES)
+    assert len(set(VideoRecord.__slots__)) == len(ATTRIBUTES)
+    assert {attr for _, attr in COLUMNS} == set(VideoRecord.__slots__)
+    assert VideoRecord().to_dict() == {attr: list(d) if attr == 'hashtags' else d for attr, d in ATTRIBUTES}
+    with pytest.raises(TypeError):
+        VideoRecord(views=1)
+
+
+def test_csv_and_json_round_trip():
+    record = sample()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    writer.writerow(record.row())
+    buf.seek(0)
+    assert VideoRecord.from_row(next(csv.DictReader(buf))) == record
+
+    legacy = record.to_dict()
+    legacy['Ngày đăng'] = legacy.pop('postedDate')
+    assert VideoRecord.from_dict(legacy) == record
+
+
+def test_record_batch_types():
+    batch = RecordBatch()
+    batch.extend([sample(), VideoRecord(webVideoUrl='u2')])
+    table = batch.to_arrow()
+    assert table.column_names == CSV_COLUMNS
+    assert table.column('followerCount').to_pylist() == [7, 0]
+    assert table.column('Text').to_pylist() == ['mô tả', None]
@@ -0,0 +1,152 @@
+"""Điều tiết tốc độ tải trang kiểu AIMD: tăng dần khi ổn định, giảm mạnh khi bị chặn/chậm."""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class ThrottledError(RuntimeError):
+    """Trang trả về captcha/xác minh hoặc báo quá nhiều request."""
+
+    def __init__(self, reason, url=''):
+        super().__init__(f"bị chặn ({reason}) {url}".strip())
+        self.reason = reason
+        self.url = url
+
+
+class AdaptiveController:
+    """Giới hạn số trang tải đồng thời và khoảng cách giữa hai lần bắt đầu tải.
+
+    - Thành công: khoảng cách giảm `increase_step` giây (tăng cộng); sau mỗi
+      `window` lần thành công liên tiếp, số luồng được phép tăng thêm 1.
+    - Tỉ lệ thành công trong `window` lần gần nhất dưới `min_success_rate`, hoặc
+      độ trễ trung bình vượt `latency_factor` lần mức tốt nhất: khoảng cách nhân
+      đôi, số luồng chia đôi (giảm nhân).
+    - Bị chặn (ThrottledError): giảm nhân ngay và tạm dừng mọi worker trong
+      `cooldown` giây, gấp đôi mỗi lần bị chặn liên tiếp (tối đa `max_cooldown`).
+    Dùng chung một controller cho mọi worker của TikTokScraperPool.
+    Lượt liệt kê kênh (`slot(listing=True)`) chỉ chờ nhịp và thời gian tạm dừng,
+    không chiếm luồng và không đưa độ trễ vào mức tham chiếu: thời gian cuộn cả
+    trang kênh phụ thuộc số video chứ không phải tình trạng tải của máy chủ.
+    """
+
+    def __init__(self, max_concurrency=1, start_interval=0.5, min_interval=0.0, max_interval=30.0,
+                 increase_step=0.05, window=10, min_success_rate=0.7, latency_factor=3.0,
+                 cooldown=30.0, max_cooldown=600.0, metrics=None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency = self.max_concurrency
+        self.interval = max(min_interval, start_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.increase_step = increase_step
+        self.window = max(1, window)
+        self.min_success_rate = min_success_rate
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.metrics = metrics
+        self._cond = threading.Condition()
+        self._active = 0
+        self._next_start = 0.0
+        self._resume_at = 0.0
+        self._outcomes = deque(maxlen=self.window)
+        self._streak = 0
+        self._throttle_streak = 0
+        self._latency = None
+        self._best_latency = None
+
+    def acquire(self, hold=True):
+        """Chờ tới lượt tải; hold=False thì chỉ chờ nhịp, không chiếm một luồng."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = max(self._resume_at, self._next_start) - now
+                if wait <= 0 and (not hold or self._active < self.concurrency):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            if hold:
+                self._active += 1
+            self._next_start = now + self.interval
+
+    def release(self, outcome, latency, held=True):
+        """outcome: 'ok', 'error' hoặc 'throttled'; latency=None thì không tính vào độ trễ."""
+        with self._cond:
+            if held:
+                self._active -= 1
+            if outcome == 'throttled':
+                self._on_throttle()
+            else:
+                self._outcomes.append(outcome == 'ok')
+                if outcome == 'ok':
+                    self._on_success(latency)
+                else:
+                    self._streak = 0
+                if len(self._outcomes) == self.window:
+                    rate = sum(self._outcomes) / self.window
+                    if rate < self.min_success_rate:
+                        self._decrease(f"tỉ lệ thành công {rate:.0%}")
+            self._cond.notify_all()
+
+    def _on_success(self, latency):
+        self._throttle_streak = 0
+        self._streak += 1
+        if latency is None:
+            self._speed_up()
+            return
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+        if (len(self._outcomes) == self.window and self._best_latency
+                and self._latency > self._best_latency * self.latency_factor):
+            self._decrease(f"độ trễ {self._latency:.1f}s")
+            return
+        self._speed_up()
+
+    def _speed_up(self):
+        self.interval = max(self.min_interval, self.interval - self.increase_step)
+        if self._streak >= self.window and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self._streak = 0
+            print(f"  [AIMD] Tăng số luồng lên {self.concurrency}.")
+
+    def _decrease(self, why, reason='congestion'):
+        self.interval = min(self.max_interval, max(self.interval, 0.25) * 2)
+        self.concurrency = max(1, self.concurrency // 2)
+        self._outcomes.clear()
+        self._streak = 0
+        # Mức độ trễ tham chiếu đo lại từ đầu sau khi giảm tải
+        self._latency = self._best_latency = None
+        print(f"  [AIMD] Giảm tốc ({why}): cách {self.interval:.2f}s, {self.concurrency} luồng.")
+        if self.metrics is not None:
+            self.metrics.inc('backoffs', reason=reason)
+
+    def _on_throttle(self):
+        self._throttle_streak += 1
+        self._decrease("bị chặn", reason='throttled')
+        pause = min(self.max_cooldown, self.cooldown * 2 ** (self._throttle_streak - 1))
+        self._resume_at = max(self._resume_at, time.monotonic() + pause)
+        print(f"  [AIMD] Tạm dừng {pause:.1f}s trước khi tải tiếp.")
+
+    @contextmanager
+    def slot(self, listing=False):
+        """Giữ một lượt tải trang; kết quả và độ trễ của khối lệnh được dùng để điều tiết.
+
+        listing=True cho lượt liệt kê kênh: không giữ luồng, chỉ tính kết quả, bỏ qua độ trễ.
+        """
+        self.acquire(hold=not listing)
+        start = time.monotonic()
+        outcome = 'ok'
+        try:
+            yield
+        except ThrottledError:
+            outcome = 'throttled'
+            raise
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            self.release(outcome, None if listing else time.monotonic() - start, held=not listing)
+
+    def state(self):
+        with self._cond:
+            return {'interval': round(self.interval, 3), 'concurrency': self.concurrency}
@@ -0,0 +1,159 @@
+"""Bản ghi video và lược đồ cột dùng chung cho crawl_tiktok.py, exporter và csv_to_ggsheet.py."""
+
+# Thuộc tính của bản ghi và giá trị mặc định: nguồn duy nhất cho __slots__, hàm khởi tạo
+# và kiểu dữ liệu (mặc định là số thì cột kiểu int, còn lại là chuỗi)
+ATTRIBUTES = (
+    ('webVideoUrl', ''), ('channel', ''), ('author', ''), ('text', ''),
+    ('playCount', 0), ('diggCount', 0), ('shareCount', 0), ('commentCount', 0), ('collectCount', 0),
+    ('duration', 0), ('followers', 0), ('heartCount', 0), ('videoCount', 0),
+    ('channelCreated', ''), ('postedDate', ''), ('hashtags', ()), ('isAd', ''), ('isADVirtual', ''),
+)
+
+# (tên cột CSV/Sheets, thuộc tính) theo đúng thứ tự cột của file CSV;
+# 'followerCount' là cột thứ hai của `followers`, giữ để file CSV cũ không đổi định dạng
+COLUMNS = (
+    ('Kênh', 'channel'), ('Author', 'author'), ('Followers', 'followers'), ('Text', 'text'),
+    ('Likes', 'diggCount'), ('Shares', 'shareCount'), ('Comments', 'commentCount'),
+    ('Collects', 'collectCount'), ('Duration(s)', 'duration'), ('Ngày tạo kênh', 'channelCreated'),
+    ('Ngày đăng', 'postedDate'), ('Hashtags', 'hashtags'), ('URL Video', 'webVideoUrl'),
+    ('Views', 'playCount'), ('followerCount', 'followers'), ('heartCount', 'heartCount'),
+    ('videoCount', 'videoCount'), ('isAd', 'isAd'), ('isADVirtual', 'isADVirtual'),
+)
+
+_ATTR_TYPES = {attr: int if isinstance(default, int) else str for attr, default in ATTRIBUTES}
+CSV_COLUMNS = [column for column, _ in COLUMNS]
+COLUMN_TYPES = {column: _ATTR_TYPES[attr] for column, attr in COLUMNS}
+# Cột dùng khi đọc lại CSV: mỗi thuộc tính lấy từ cột đầu tiên của nó
+_COLUMN_ATTRS = {}
+for _column, _attr in COLUMNS:
+    if _attr not in _COLUMN_ATTRS.values():
+        _COLUMN_ATTRS[_column] = _attr
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+class VideoRecord:
+    """Một video đã cào; thuộc tính cố định (__slots__) thay cho dict có khóa lẫn Việt/Anh.
+
+    `row()` cho giá trị theo thứ tự CSV_COLUMNS; `to_dict`/`from_dict` để lưu JSON
+    (state store, file tạm của Parquet), đọc được cả khóa cũ "Ngày đăng"/"Ngày tạo kênh".
+    """
+
+    __slots__ = tuple(attr for attr, _ in ATTRIBUTES)
+    _INT_FIELDS = frozenset(attr for attr, dtype in _ATTR_TYPES.items() if dtype is int)
+    # Khóa của bản ghi dạng dict trước đây
+    _LEGACY_KEYS = {'Ngày tạo kênh': 'channelCreated', 'Ngày đăng': 'postedDate'}
+
+    def __init__(self, **fields):
+        for attr, default in ATTRIBUTES:
+            value = fields.pop(attr, default)
+            setattr(self, attr, list(value) if attr == 'hashtags' else value)
+        if fields:
+            raise TypeError(f"VideoRecord không có thuộc tính: {', '.join(fields)}")
+
+    @classmethod
+    def from_dict(cls, data):
+        """Dựng từ dict (JSON đã lưu); bỏ qua khóa lạ, ép kiểu số."""
+        fields = {}
+        for key, value in data.items():
+            attr = cls._LEGACY_KEYS.get(key, key)
+            if attr not in cls.__slots__:
+                continue
+            fields[attr] = _to_int(value) if attr in cls._INT_FIELDS else value
+        return cls(**fields)
+
+    @classmethod
+    def from_row(cls, row):
+        """Dựng từ một dòng CSV đọc bằng csv.DictReader (khóa là tên cột)."""
+        fields = {}
+        for column, value in row.items():
+            attr = _COLUMN_ATTRS.get(column)
+            if attr is None:
+                continue
+            if attr == 'hashtags':
+                value = [t.strip() for t in (value or '').split(',') if t.strip()]
+            elif attr in cls._INT_FIELDS:
+                value = _to_int(value)
+            else:
+                value = value or ''
+            fields[attr] = value
+        return cls(**fields)
+
+    def to_dict(self):
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+    def row(self):
+        return [getter(self) for getter in _GETTERS]
+
+    def __eq__(self, other):
+        if not isinstance(other, VideoRecord):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return f"VideoRecord({self.channel!r}, {self.webVideoUrl!r})"
+
+
+def _getter(attr):
+    if attr == 'hashtags':
+        return lambda record: ', '.join(record.hashtags)
+    return lambda record: getattr(record, attr)
+
+
+_COLUMN_GETTERS = {column: _getter(attr) for column, attr in COLUMNS}
+_GETTERS = [_COLUMN_GETTERS[column] for column in CSV_COLUMNS]
+
+
+class RecordBatch:
+    """Bộ đệm dạng cột: mỗi cột một list, chuyển thẳng sang Arrow hoặc pandas.
+
+    Không tạo list/dict trung gian cho từng dòng; `columns` chọn cột và thứ tự.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(columns or CSV_COLUMNS)
+        self._getters = [_COLUMN_GETTERS[column] for column in self.columns]
+        self._data = [[] for _ in self.columns]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, record):
+        for values, getter in zip(self._data, self._getters):
+            values.append(getter(record))
+        self._size += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def clear(self):
+        self._data = [[] for _ in self.columns]
+        self._size = 0
+
+    def to_arrow(self, schema=None):
+        """pyarrow.Table theo kiểu của COLUMN_TYPES; chuỗi rỗng thành null như khi đọc CSV."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        arrays = []
+        for column, values in zip(self.columns, self._data):
+            if COLUMN_TYPES[column] is int:
+                arrays.append(pa.array(values, type=pa.int64()))
+            else:
+                array = pa.array(values, type=pa.string())
+                arrays.append(pc.if_else(pc.equal(array, ''), pa.scalar(None, pa.string()), array))
+        if schema is not None:
+            return pa.Table.from_arrays(arrays, schema=schema)
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    def to_pandas(self):
+        """DataFrame với cột số kiểu Int64 và ô rỗng là NA, giống khi csv_to_ggsheet.py đọc file."""
+        import pandas as pd
+        import pyarrow as pa
+        return self.to_arrow().to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)